@@ -0,0 +1,119 @@
+"""
+Admission control for one worker.
+Calls are admitted at the incoming-call webhook — the last point where a
+call can still be turned away (busy or redirected) instead of joining an
+overloaded worker. An admitted call holds a reservation until its media
+stream connects, then an active slot until it hangs up. New calls are
+refused while the worker is full, its event loop is lagging, or it is
+draining for shutdown; calls already connected are never cut off.
+"""
+
+import time
+import asyncio
+from typing import Optional
+
+from loop_monitor import LoopMonitor
+from log import get_logger
+
+log = get_logger("admission")
+
+
+class AdmissionController:
+    """Concurrent-session limit plus an event-loop lag gate."""
+
+    def __init__(
+        self,
+        max_sessions: int = 50,
+        max_loop_lag_ms: float = 50.0,
+        loop_monitor: Optional[LoopMonitor] = None,
+        reservation_ttl: float = 30.0,
+    ):
+        self.max_sessions = max_sessions
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.loop_monitor = loop_monitor
+        # A webhook whose media stream never connects gives its slot back after this long
+        self.reservation_ttl = reservation_ttl
+        self.active = 0
+        self.draining = False
+        # Set while the worker warms up (see warmup.py): no calls yet, no spare capacity advertised
+        self.warming = False
+        self._reserved = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Stats
+        self.admitted = 0
+        self.rejected = {}
+
+    @property
+    def spare(self) -> int:
+        """Sessions this worker can still take."""
+        self._expire()
+        if self.warming:
+            return 0
+        return max(self.max_sessions - self.active - len(self._reserved), 0)
+
+    def rejection(self) -> Optional[str]:
+        """Why a new call would be refused right now (None = it would be admitted)."""
+        if self.draining:
+            return "draining"
+        if self.warming:
+            return "warming"
+        if self.spare <= 0:
+            return "capacity"
+        if self.loop_monitor and self.loop_monitor.lag_ms() > self.max_loop_lag_ms:
+            return "loop_lag"
+        return None
+
+    def admit(self, session_key: str) -> bool:
+        """Reserve a slot for a new call; False if it is refused (the reason is logged and counted)."""
+        reason = self.rejection()
+        if reason is not None:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            log.warning("call_refused", f"🚫 Call refused ({reason}): {self.active} active, {len(self._reserved)} connecting")
+            return False
+        self._reserved[session_key] = time.monotonic() + self.reservation_ttl
+        self.admitted += 1
+        return True
+
+    def session_started(self, session_key: Optional[str] = None):
+        """A media stream connected (always accepted; its reservation, if any, becomes active)."""
+        self._reserved.pop(session_key, None)
+        self.active += 1
+        self._idle.clear()
+
+    def session_ended(self):
+        self.active -= 1
+        if self.active <= 0:
+            self.active = 0
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting calls and wait (up to timeout) for active ones to hang up."""
+        self.draining = True
+        self._reserved.clear()
+        if self.active:
+            log.info("drain_started", f"⏳ Draining: waiting up to {timeout:.0f} s for {self.active} active call(s)")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            log.warning("drain_timeout", f"⚠️ Drain timed out with {self.active} call(s) still active")
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "reserved": len(self._reserved),
+            "spare": self.spare,
+            "max_sessions": self.max_sessions,
+            "draining": self.draining,
+            "warming": self.warming,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, expires in self._reserved.items() if expires <= now]:
+            del self._reserved[key]
@@ -0,0 +1,199 @@
+"""
+Vectorized audio conversion for telephony streams.
+G.711 mulaw/alaw ⇄ 16-bit PCM via lookup tables, and streaming polyphase
+resampling between 8, 16 and 24 kHz. Converters own preallocated buffers
+sized for the largest chunk seen, so steady-state per-frame calls don't
+allocate; results are views into those buffers, valid until the next call.
+"""
+
+import numpy as np
+from math import gcd
+from numpy.lib.stride_tricks import sliding_window_view
+
+SUPPORTED_RATES = (8000, 16000, 24000)
+
+
+def _mulaw_to_pcm_table() -> np.ndarray:
+    """G.711 mulaw byte → 16-bit linear PCM sample."""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((u & 0x0F) << 3) + 0x84) << ((u >> 4) & 0x07)
+    return np.where(u & 0x80, 0x84 - magnitude, magnitude - 0x84).astype(np.int16)
+
+
+def _alaw_to_pcm_table() -> np.ndarray:
+    """G.711 alaw byte → 16-bit linear PCM sample."""
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (a >> 4) & 0x07
+    mantissa = a & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0),
+    )
+    return np.where(a & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+def _encode_table(decode: np.ndarray) -> np.ndarray:
+    """PCM16 (indexed by its uint16 bit pattern) → nearest G.711 byte."""
+    order = np.argsort(decode, kind="stable")
+    levels = decode[order].astype(np.int32)
+    pcm = np.arange(65536, dtype=np.int32).astype(np.uint16).view(np.int16).astype(np.int32)
+    upper = np.clip(np.searchsorted(levels, pcm), 1, len(levels) - 1)
+    lower = upper - 1
+    nearest = np.where(pcm - levels[lower] <= levels[upper] - pcm, lower, upper)
+    return order[nearest].astype(np.uint8)
+
+
+MULAW_TO_PCM = _mulaw_to_pcm_table()
+ALAW_TO_PCM = _alaw_to_pcm_table()
+PCM_TO_MULAW = _encode_table(MULAW_TO_PCM)
+# Digital silence as 0xFF (positive zero), which is what providers send
+PCM_TO_MULAW[0] = 0xFF
+PCM_TO_ALAW = _encode_table(ALAW_TO_PCM)
+
+_TABLES = {
+    "mulaw": (MULAW_TO_PCM, PCM_TO_MULAW),
+    "alaw": (ALAW_TO_PCM, PCM_TO_ALAW),
+}
+
+
+class G711Codec:
+    """mulaw or alaw ⇄ PCM16 conversion into reusable buffers."""
+
+    def __init__(self, law: str = "mulaw", max_samples: int = 480):
+        if law not in _TABLES:
+            raise ValueError(f"Unknown G.711 law: {law}")
+        self.law = law
+        self._decode_table, self._encode_table = _TABLES[law]
+        self._allocate(max_samples)
+
+    def decode(self, data) -> np.ndarray:
+        """G.711 bytes → int16 samples."""
+        n = len(data)
+        self._ensure(n)
+        index = self._index[:n]
+        np.copyto(index, np.frombuffer(data, dtype=np.uint8, count=n))
+        return np.take(self._decode_table, index, out=self._pcm[:n])
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        """int16 samples → G.711 bytes (uint8 array; bytes(result) to send)."""
+        n = len(pcm)
+        self._ensure(n)
+        index = self._index[:n]
+        np.copyto(index, pcm.view(np.uint16))
+        return np.take(self._encode_table, index, out=self._bytes[:n])
+
+    def _ensure(self, n: int):
+        if n > len(self._index):
+            self._allocate(n)
+
+    def _allocate(self, n: int):
+        self._index = np.empty(n, dtype=np.intp)
+        self._pcm = np.empty(n, dtype=np.int16)
+        self._bytes = np.empty(n, dtype=np.uint8)
+
+
+def _lowpass(length: int, cutoff: float, gain: float) -> np.ndarray:
+    """Kaiser-windowed sinc; cutoff as a fraction of the sample rate."""
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    return taps * (gain / taps.sum())
+
+
+class Resampler:
+    """Streaming polyphase resampler for one int16 mono stream (e.g. 8k ⇄ 16k ⇄ 24k).
+
+    Filter state carries across calls, so chunks can be any size and the
+    output is the same as resampling the whole stream at once.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32, max_samples: int = 480):
+        if in_rate not in SUPPORTED_RATES or out_rate not in SUPPORTED_RATES:
+            raise ValueError(f"Unsupported rate conversion {in_rate} → {out_rate}")
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps = taps_per_phase
+
+        # Filter runs at the upsampled rate; cut below the lower of the two Nyquist limits
+        taps = _lowpass(
+            taps_per_phase * self.up,
+            0.45 / max(self.up, self.down),
+            self.up,
+        )
+        # phases[p] holds h[p], h[p + up], ... reversed to match oldest→newest windows
+        self._phases = np.ascontiguousarray(
+            taps.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32,
+        )
+
+        # Upsampled-time index of the next output, relative to the current chunk
+        self._t = 0
+        self._allocate(max_samples)
+        self._input[:taps_per_phase - 1] = 0
+
+    def output_length(self, n: int) -> int:
+        """Number of samples the next process() call returns for n input samples."""
+        return max(0, -(-(n * self.up - self._t) // self.down))
+
+    def process(self, pcm: np.ndarray) -> np.ndarray:
+        """Resample a chunk of int16 samples; returns an int16 view."""
+        n = len(pcm)
+        history = self.taps - 1
+        self._ensure(n)
+        count = self.output_length(n)
+
+        window = self._input[:history + n]
+        np.copyto(window[history:], pcm, casting="unsafe")
+        windows = self._windows
+        out = self._output[:count]
+        for c in range(min(self.up, count)):
+            t = self._t + c * self.down
+            first = t // self.up
+            rows = windows[first:first + (len(range(c, count, self.up)) - 1) * self.down + 1:self.down]
+            np.matmul(rows, self._phases[t % self.up], out=out[c::self.up])
+
+        self._t += count * self.down - n * self.up
+        # Keep the last taps-1 inputs as filter history for the next chunk
+        window[:history] = window[n:n + history]
+
+        np.rint(out, out=out)
+        np.clip(out, -32768, 32767, out=out)
+        result = self._pcm[:count]
+        np.copyto(result, out, casting="unsafe")
+        return result
+
+    def _ensure(self, n: int):
+        if n > len(self._input) - (self.taps - 1):
+            history = self._input[:self.taps - 1].copy()
+            self._allocate(n)
+            self._input[:self.taps - 1] = history
+
+    def _allocate(self, n: int):
+        outputs = n * self.up // self.down + 2
+        self._input = np.empty(n + self.taps - 1, dtype=np.float32)
+        # windows[i] = the taps inputs ending at chunk sample i (a view, built once)
+        self._windows = sliding_window_view(self._input, self.taps)
+        self._output = np.empty(outputs, dtype=np.float32)
+        self._pcm = np.empty(outputs, dtype=np.int16)
+
+
+class PCMToTelephony:
+    """Streaming linear16 (little-endian, any supported rate) → 8 kHz G.711 bytes."""
+
+    def __init__(self, in_rate: int, law: str = "mulaw"):
+        self.resampler = Resampler(in_rate, 8000) if in_rate != 8000 else None
+        self.codec = G711Codec(law)
+        self._carry = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        data = self._carry + chunk if self._carry else chunk
+        usable = len(data) & ~1
+        self._carry = data[usable:]
+        if not usable:
+            return b""
+        pcm = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        if self.resampler:
+            pcm = self.resampler.process(pcm)
+        return self.codec.encode(pcm).tobytes()
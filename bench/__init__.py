@@ -0,0 +1,5 @@
+"""
+Benchmarks and load-testing tools for the voice agent.
+Everything here runs against local stand-ins for Deepgram, Groq and the
+telephony provider, so no API calls (or credits) are needed.
+"""
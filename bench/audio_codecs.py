@@ -0,0 +1,69 @@
+"""
+Throughput of the audio module (audio.py) in samples per second per core:
+G.711 decode/encode and each supported resampling direction, fed the way
+the bot feeds them — one 20 ms chunk per call.
+
+Run: python -m bench.audio_codecs --seconds 60
+"""
+
+import time
+import argparse
+import numpy as np
+
+from audio import G711Codec, Resampler, SUPPORTED_RATES
+
+CHUNK_MS = 20
+
+
+def _measure(fn, chunks) -> float:
+    """Seconds spent converting every chunk once (after a warm-up pass over a few)."""
+    for chunk in chunks[:10]:
+        fn(chunk)
+    started = time.perf_counter()
+    for chunk in chunks:
+        fn(chunk)
+    return time.perf_counter() - started
+
+
+def _report(name: str, samples: int, elapsed: float, chunk_samples: int):
+    per_chunk_us = elapsed / (samples / chunk_samples) * 1e6
+    print(
+        f"{name:<22} {samples / elapsed / 1e6:>8.2f} M samples/s   "
+        f"{per_chunk_us:>7.2f} µs per {CHUNK_MS} ms chunk   "
+        f"(≈{samples / elapsed / (chunk_samples * 1000 / CHUNK_MS):,.0f} real-time streams/core)"
+    )
+
+
+def run(seconds: int):
+    rng = np.random.default_rng(0)
+    for law in ("mulaw", "alaw"):
+        codec = G711Codec(law)
+        chunk_samples = 8000 * CHUNK_MS // 1000
+        encoded = [rng.integers(0, 256, chunk_samples, dtype=np.uint8).tobytes() for _ in range(seconds * 50)]
+        _report(f"{law} → pcm16", chunk_samples * len(encoded), _measure(codec.decode, encoded), chunk_samples)
+        pcm = [codec.decode(chunk).copy() for chunk in encoded]
+        _report(f"pcm16 → {law}", chunk_samples * len(pcm), _measure(codec.encode, pcm), chunk_samples)
+
+    for in_rate in SUPPORTED_RATES:
+        for out_rate in SUPPORTED_RATES:
+            if in_rate == out_rate:
+                continue
+            resampler = Resampler(in_rate, out_rate)
+            chunk_samples = in_rate * CHUNK_MS // 1000
+            chunks = [
+                (rng.standard_normal(chunk_samples) * 3000).astype(np.int16)
+                for _ in range(seconds * 50)
+            ]
+            elapsed = _measure(resampler.process, chunks)
+            _report(f"resample {in_rate // 1000}k → {out_rate // 1000}k", chunk_samples * len(chunks), elapsed, chunk_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60, help="seconds of audio per measurement")
+    args = parser.parse_args()
+    run(args.seconds)
+
+
+if __name__ == "__main__":
+    main()
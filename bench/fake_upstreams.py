@@ -0,0 +1,217 @@
+"""
+Local stand-ins for Deepgram STT (WebSocket), Deepgram TTS (REST) and Groq
+(OpenAI-compatible streaming chat completions), with configurable latency
+and jitter. Point the bot at them with:
+
+    DEEPGRAM_STT_URL=ws://127.0.0.1:9100/v1/listen
+    DEEPGRAM_TTS_URL=http://127.0.0.1:9100/v1/speak
+    GROQ_BASE_URL=http://127.0.0.1:9100
+
+Run: python -m bench.fake_upstreams --port 9100 --llm-ttft-ms 250
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import uvicorn
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Latency profile (milliseconds) and relative jitter; overridden from the command line
+CONFIG = {
+    "stt_latency_ms": 150.0,     # speech end → final transcript
+    "llm_ttft_ms": 250.0,        # request → first token
+    "llm_large_ttft_ms": 450.0,  # request → first token for 70B models
+    "llm_token_ms": 8.0,         # per streamed token
+    "tts_latency_ms": 120.0,     # request → first audio byte
+    "tts_ms_per_char": 60.0,     # generated audio duration per character of text
+    "jitter": 0.2,               # ± fraction applied to every latency
+}
+
+QUESTIONS = [
+    "Where does Omkar work right now",
+    "What is his experience with Python",
+    "Tell me about his projects",
+    "What did he study",
+]
+
+ANSWER = (
+    "Omkar is a software engineer at Ford Motor Company in Long Beach. "
+    "He builds data visualization tools and FastAPI services, and he has more "
+    "than four years of full stack experience."
+)
+
+MULAW_SILENCE = 0xFF
+BYTES_PER_SECOND = 8000
+
+app = FastAPI()
+
+
+def _delay(ms: float) -> float:
+    jitter = CONFIG["jitter"]
+    return max(ms * (1 + random.uniform(-jitter, jitter)), 0.0) / 1000
+
+
+def _results(transcript: str, start: float, duration: float, is_final: bool) -> str:
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "start": start,
+        "duration": duration,
+        "is_final": is_final,
+        "speech_final": is_final,
+        "channel": {"alternatives": [{"transcript": transcript, "confidence": 0.99}]},
+    })
+
+
+# ── Deepgram STT ───────────────────────────────────────────────
+@app.websocket("/v1/listen")
+async def fake_listen(websocket: WebSocket):
+    """Detects speech (non-silence bytes) and answers each utterance with a canned question."""
+    await websocket.accept()
+    # Like Deepgram, speech_final waits for `endpointing` ms of silence (default 10)
+    endpointing_ms = float(websocket.query_params.get("endpointing", 10))
+    received = 0
+    speech_start = None
+    utterance = 0
+    last_interim = 0
+    pending = set()
+
+    async def finalize(question: str, start: float, end: float):
+        await asyncio.sleep(endpointing_ms / 1000 + _delay(CONFIG["stt_latency_ms"]))
+        await websocket.send_text(_results(question, start, end - start, True))
+        await websocket.send_text(json.dumps({"type": "UtteranceEnd", "last_word_end": end}))
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            chunk = message.get("bytes")
+            if not chunk:
+                continue  # KeepAlive / CloseStream text messages
+
+            is_speech = bool(chunk.strip(bytes([MULAW_SILENCE])))
+            question = QUESTIONS[utterance % len(QUESTIONS)]
+            if is_speech and speech_start is None:
+                speech_start = received
+                last_interim = received
+            elif is_speech and received - last_interim >= BYTES_PER_SECOND // 2:
+                # Interim hypothesis roughly every 500 ms of speech
+                last_interim = received
+                words = question.split()
+                heard = max(1, (received - speech_start) * len(words) // (3 * BYTES_PER_SECOND))
+                await websocket.send_text(_results(
+                    " ".join(words[:heard]), speech_start / BYTES_PER_SECOND,
+                    (received - speech_start) / BYTES_PER_SECOND, False,
+                ))
+            elif not is_speech and speech_start is not None:
+                task = asyncio.create_task(finalize(
+                    question, speech_start / BYTES_PER_SECOND, received / BYTES_PER_SECOND,
+                ))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                speech_start = None
+                utterance += 1
+            received += len(chunk)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# ── Deepgram TTS ───────────────────────────────────────────────
+@app.post("/v1/speak")
+async def fake_speak(request: Request):
+    body = await request.json()
+    total = int(len(body.get("text", "")) * CONFIG["tts_ms_per_char"] * BYTES_PER_SECOND / 1000)
+
+    async def audio():
+        await asyncio.sleep(_delay(CONFIG["tts_latency_ms"]))
+        # Deepgram streams faster than real time; ~4x here
+        for offset in range(0, total, 800):
+            yield bytes([0x7F]) * min(800, total - offset)
+            await asyncio.sleep(0.025)
+
+    return StreamingResponse(audio(), media_type="audio/basic")
+
+
+# ── Groq chat completions ──────────────────────────────────────
+@app.head("/")
+async def fake_root():
+    return JSONResponse({})
+
+
+@app.get("/openai/v1/models")
+async def fake_models():
+    return JSONResponse({
+        "object": "list",
+        "data": [
+            {"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+            for model in ("llama-3.1-8b-instant", "llama-3.3-70b-versatile")
+        ],
+    })
+
+
+@app.post("/openai/v1/chat/completions")
+async def fake_chat(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    ttft_ms = CONFIG["llm_large_ttft_ms"] if "70b" in model else CONFIG["llm_ttft_ms"]
+    tokens = re.findall(r"\S+\s*", ANSWER)[: body.get("max_tokens") or None]
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(_delay(ttft_ms + CONFIG["llm_token_ms"] * len(tokens)))
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        })
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        return "data: " + json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }) + "\n\n"
+
+    async def events():
+        await asyncio.sleep(_delay(ttft_ms))
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(_delay(CONFIG["llm_token_ms"]))
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    for key, value in CONFIG.items():
+        parser.add_argument("--" + key.replace("_", "-"), type=float, default=value)
+    args = parser.parse_args()
+    for key in CONFIG:
+        CONFIG[key] = getattr(args, key)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", ws_max_size=2 ** 20)
+
+
+if __name__ == "__main__":
+    main()
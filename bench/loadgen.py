@@ -0,0 +1,448 @@
+"""
+Concurrent-call load generator.
+
+Starts the fake upstreams and one voice agent worker as subprocesses, then
+runs N simulated calls speaking the real Twilio / Telnyx media-stream
+protocols. Each simulated caller talks (non-silent mulaw frames), waits for
+the agent's audio, echoes playback marks back like the provider would, and
+repeats. Reports turn latency percentiles, worker event-loop lag, CPU and
+RSS per call, and — in ramp mode — the highest concurrency a single worker
+sustains within the latency / lag SLOs.
+
+Examples:
+    python -m bench.loadgen --calls 50 --turns 3
+    python -m bench.loadgen --ramp 10,25,50,100,200 --provider telnyx --json out.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import base64
+import random
+import asyncio
+import argparse
+import subprocess
+import httpx
+import websockets
+
+FRAME_MS = 20
+FRAME_BYTES = 160
+SILENCE_FRAME = bytes([0xFF]) * FRAME_BYTES
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+# ── Telephony protocol messages ────────────────────────────────
+
+def _wire(message: dict) -> str:
+    """Compact JSON, as Twilio and Telnyx send it (and as the media fast path expects)."""
+    return json.dumps(message, separators=(",", ":"))
+
+
+class TwilioCaller:
+    name = "twilio"
+
+    def __init__(self):
+        self.stream_sid = "MZ" + uuid.uuid4().hex
+        self.call_sid = "CA" + uuid.uuid4().hex
+        self.seq = 0
+
+    def _next(self) -> str:
+        self.seq += 1
+        return str(self.seq)
+
+    def connected(self) -> str:
+        return _wire({"event": "connected", "protocol": "Call", "version": "1.0.0"})
+
+    def start(self) -> str:
+        return _wire({
+            "event": "start",
+            "sequenceNumber": self._next(),
+            "start": {
+                "accountSid": "AC" + "0" * 32,
+                "streamSid": self.stream_sid,
+                "callSid": self.call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+                "customParameters": {},
+            },
+            "streamSid": self.stream_sid,
+        })
+
+    def media(self, chunk: int, payload: str) -> str:
+        return _wire({
+            "event": "media",
+            "sequenceNumber": self._next(),
+            "media": {"track": "inbound", "chunk": str(chunk), "timestamp": str(chunk * FRAME_MS), "payload": payload},
+            "streamSid": self.stream_sid,
+        })
+
+    def mark(self, name: str) -> str:
+        return _wire({
+            "event": "mark", "sequenceNumber": self._next(),
+            "streamSid": self.stream_sid, "mark": {"name": name},
+        })
+
+    def stop(self) -> str:
+        return _wire({
+            "event": "stop", "sequenceNumber": self._next(), "streamSid": self.stream_sid,
+            "stop": {"accountSid": "AC" + "0" * 32, "callSid": self.call_sid},
+        })
+
+
+class TelnyxCaller(TwilioCaller):
+    name = "telnyx"
+
+    def connected(self) -> str:
+        return _wire({"event": "connected", "version": "1.0.0"})
+
+    def start(self) -> str:
+        return _wire({
+            "event": "start",
+            "sequence_number": self._next(),
+            "start": {
+                "user_id": str(uuid.uuid4()),
+                "call_control_id": "v3:" + self.call_sid,
+                "call_session_id": str(uuid.uuid4()),
+                "from": "+15550000001",
+                "to": "+15550000002",
+                "media_format": {"encoding": "PCMU", "sample_rate": 8000, "channels": 1},
+            },
+            "stream_id": self.stream_sid,
+        })
+
+    def media(self, chunk: int, payload: str) -> str:
+        return _wire({
+            "event": "media",
+            "sequence_number": self._next(),
+            "media": {"track": "inbound", "chunk": str(chunk), "timestamp": str(chunk * FRAME_MS), "payload": payload},
+            "stream_id": self.stream_sid,
+        })
+
+    def mark(self, name: str) -> str:
+        return _wire({
+            "event": "mark", "sequence_number": self._next(),
+            "stream_id": self.stream_sid, "mark": {"name": name},
+        })
+
+    def stop(self) -> str:
+        return _wire({
+            "event": "stop", "sequence_number": self._next(), "stream_id": self.stream_sid,
+            "stop": {"call_control_id": "v3:" + self.call_sid, "reason": "hangup"},
+        })
+
+
+CALLERS = {"twilio": TwilioCaller, "telnyx": TelnyxCaller}
+
+
+def speech_frame() -> bytes:
+    """A loud, noisy mulaw frame (anything but 0xFF/0x7F silence counts as speech)."""
+    return bytes(random.randint(0x00, 0x3F) for _ in range(FRAME_BYTES))
+
+
+# ── One simulated call ─────────────────────────────────────────
+
+class CallResult:
+    def __init__(self):
+        self.turn_latencies = []
+        self.turns_timed_out = 0
+        self.error = None
+
+
+async def stream_url_from_webhook(http: httpx.AsyncClient, base: str, provider: str, to: str = "") -> str:
+    """POST the incoming-call webhook like the provider does and pull the <Stream url>."""
+    response = await http.post(f"http://{base}/incoming-call/{provider}", headers={"host": base}, data={"To": to})
+    match = re.search(r'<Stream url="wss://([^"]+)"', response.text)
+    if not match:
+        raise RuntimeError(f"no <Stream> in webhook response: {response.text[:200]}")
+    return "ws://" + match.group(1)
+
+
+async def run_call(http: httpx.AsyncClient, base: str, provider: str, turns: int, speech_ms: int,
+                   pause_ms: int, turn_timeout: float, to: str = "") -> CallResult:
+    caller = CALLERS[provider]()
+    result = CallResult()
+    speech_payloads = [base64.b64encode(speech_frame()).decode() for _ in range(8)]
+    silence_payload = base64.b64encode(SILENCE_FRAME).decode()
+
+    state = {"speaking": False, "last_speech_sent": 0.0}
+    first_audio = asyncio.Event()
+    playback_done = asyncio.Event()
+
+    try:
+        url = await stream_url_from_webhook(http, base, provider, to)
+        async with websockets.connect(url, max_size=2 ** 22) as ws:
+            await ws.send(caller.connected())
+            await ws.send(caller.start())
+
+            async def send_frames():
+                # Continuous 20 ms frames, paced on an absolute clock like a real media stream
+                chunk = 0
+                next_at = time.monotonic()
+                while True:
+                    chunk += 1
+                    payload = speech_payloads[chunk % 8] if state["speaking"] else silence_payload
+                    await ws.send(caller.media(chunk, payload))
+                    if state["speaking"]:
+                        state["last_speech_sent"] = time.monotonic()
+                    next_at += FRAME_MS / 1000
+                    await asyncio.sleep(max(next_at - time.monotonic(), 0))
+
+            async def receive():
+                audio_ms = 0
+                audio_started = None
+                async for raw in ws:
+                    event = json.loads(raw)
+                    kind = event.get("event")
+                    if kind == "media":
+                        if not first_audio.is_set():
+                            first_audio.set()
+                            audio_started = time.monotonic()
+                            audio_ms = 0
+                        audio_ms += len(base64.b64decode(event["media"]["payload"])) * 1000 // 8000
+                    elif kind == "clear":
+                        audio_ms = 0
+                    elif kind == "mark":
+                        # Like the provider: acknowledge once the queued audio has "played"
+                        if audio_started is not None:
+                            remaining = audio_ms / 1000 - (time.monotonic() - audio_started)
+                            await asyncio.sleep(max(remaining, 0))
+                        await ws.send(caller.mark(event.get("mark", {}).get("name", "")))
+                        playback_done.set()
+
+            sender = asyncio.create_task(send_frames())
+            receiver = asyncio.create_task(receive())
+            try:
+                await asyncio.sleep(0.5)
+                for _ in range(turns):
+                    first_audio.clear()
+                    playback_done.clear()
+                    state["speaking"] = True
+                    await asyncio.sleep(speech_ms / 1000)
+                    state["speaking"] = False
+                    try:
+                        await asyncio.wait_for(first_audio.wait(), turn_timeout)
+                        result.turn_latencies.append(time.monotonic() - state["last_speech_sent"])
+                        await asyncio.wait_for(playback_done.wait(), turn_timeout)
+                    except asyncio.TimeoutError:
+                        result.turns_timed_out += 1
+                    await asyncio.sleep(pause_ms / 1000)
+                await ws.send(caller.stop())
+            finally:
+                sender.cancel()
+                receiver.cancel()
+    except Exception as e:
+        result.error = repr(e)
+    return result
+
+
+# ── Process metrics (Linux /proc) ──────────────────────────────
+
+def proc_cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLK_TCK
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def proc_rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+# ── Levels ─────────────────────────────────────────────────────
+
+async def run_level(args, worker_pid: int, calls: int) -> dict:
+    base = f"127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(timeout=30.0) as http:
+        await http.get(f"http://127.0.0.1:{args.port}/bench/loop-lag")  # reset window
+
+        rss_before = proc_rss_mb(worker_pid)
+        cpu_before = proc_cpu_seconds(worker_pid)
+        started = time.monotonic()
+        rss_peak = rss_before
+
+        async def sample_rss():
+            nonlocal rss_peak
+            while True:
+                rss_peak = max(rss_peak, proc_rss_mb(worker_pid))
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample_rss())
+        # Stagger call arrivals over ramp_s so connects don't all land in one tick
+        async def delayed_call(i):
+            await asyncio.sleep(args.ramp_s * i / max(calls, 1))
+            return await run_call(
+                http, base, args.provider, args.turns, args.speech_ms, args.pause_ms, args.turn_timeout, args.to,
+            )
+
+        results = await asyncio.gather(*(delayed_call(i) for i in range(calls)))
+        sampler.cancel()
+        elapsed = time.monotonic() - started
+        cpu = proc_cpu_seconds(worker_pid) - cpu_before
+        lag = (await http.get(f"http://127.0.0.1:{args.port}/bench/loop-lag")).json()
+
+    latencies = [l for r in results for l in r.turn_latencies]
+    failed = sum(1 for r in results if r.error)
+    timed_out = sum(r.turns_timed_out for r in results)
+    report = {
+        "calls": calls,
+        "failed_calls": failed,
+        "turns": len(latencies),
+        "turns_timed_out": timed_out,
+        "turn_latency_p50_ms": round(1000 * percentile(latencies, 0.50), 1),
+        "turn_latency_p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "turn_latency_p99_ms": round(1000 * percentile(latencies, 0.99), 1),
+        "loop_lag_p50_ms": lag.get("p50_ms", 0.0),
+        "loop_lag_p99_ms": lag.get("p99_ms", 0.0),
+        "loop_lag_max_ms": lag.get("max_ms", 0.0),
+        "cpu_ms_per_call_second": round(1000 * cpu / (calls * elapsed), 3) if calls else 0.0,
+        "rss_mb_per_call": round((rss_peak - rss_before) / calls, 3) if calls else 0.0,
+        "errors": sorted({r.error for r in results if r.error})[:3],
+    }
+    report["ok"] = (
+        failed == 0
+        and timed_out == 0
+        and report["turn_latency_p95_ms"] <= args.slo_p95_ms
+        and report["loop_lag_p99_ms"] <= args.slo_lag_ms
+    )
+    return report
+
+
+def bench_env(args) -> dict:
+    """Environment for a worker (and fake upstreams) that talk only to each other."""
+    env = dict(os.environ)
+    env.update({
+        "DEEPGRAM_API_KEY": env.get("DEEPGRAM_API_KEY") or "bench",
+        "GROQ_API_KEY": env.get("GROQ_API_KEY") or "bench",
+        "DEEPGRAM_STT_URL": f"ws://127.0.0.1:{args.fake_port}/v1/listen",
+        "DEEPGRAM_TTS_URL": f"http://127.0.0.1:{args.fake_port}/v1/speak",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "TTS_CACHE_DIR": "",
+        # The canned questions are all FAQ entries; keep the LLM path under load unless asked
+        "FAQ_ANSWERS": env.get("FAQ_ANSWERS", "0"),
+    })
+    return env
+
+
+def start_fake_upstreams(args, env: dict) -> subprocess.Popen:
+    quiet = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_upstreams", "--port", str(args.fake_port),
+         "--llm-ttft-ms", str(args.llm_ttft_ms), "--llm-large-ttft-ms", str(args.llm_large_ttft_ms),
+         "--stt-latency-ms", str(args.stt_latency_ms),
+         "--tts-latency-ms", str(args.tts_latency_ms), "--jitter", str(args.jitter)],
+        env=env, stdout=quiet, stderr=quiet,
+    )
+
+
+def start_processes(args):
+    env = bench_env(args)
+    quiet = None if args.verbose else subprocess.DEVNULL
+    fake = start_fake_upstreams(args, env)
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "bench.worker", "--port", str(args.port)],
+        env=env, stdout=quiet, stderr=quiet,
+    )
+    return fake, worker
+
+
+async def wait_ready(port: int, timeout: float = 30.0, path: str = "/", require_ok: bool = False):
+    """Poll until GET path answers (with 200 if require_ok: the worker's /ready waits for its warm-up)."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                response = await http.get(f"http://127.0.0.1:{port}{path}")
+                if response.status_code == 200 or not require_ok:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def print_report(report: dict):
+    status = "OK " if report["ok"] else "FAIL"
+    print(
+        f"{status} calls={report['calls']:>4}  turns={report['turns']:>5}  "
+        f"latency p50/p95/p99={report['turn_latency_p50_ms']:.0f}/{report['turn_latency_p95_ms']:.0f}/"
+        f"{report['turn_latency_p99_ms']:.0f} ms  "
+        f"lag p99/max={report['loop_lag_p99_ms']:.1f}/{report['loop_lag_max_ms']:.1f} ms  "
+        f"cpu={report['cpu_ms_per_call_second']:.2f} ms/call·s  rss={report['rss_mb_per_call']:.2f} MB/call  "
+        f"failed={report['failed_calls']} timeouts={report['turns_timed_out']}"
+    )
+    for error in report["errors"]:
+        print(f"     error: {error}")
+
+
+async def main_async(args):
+    levels = [int(n) for n in args.ramp.split(",")] if args.ramp else [args.calls]
+    fake, worker = start_processes(args)
+    try:
+        await wait_ready(args.fake_port)
+        await wait_ready(args.port, path="/ready", require_ok=True)
+        reports = []
+        for calls in levels:
+            report = await run_level(args, worker.pid, calls)
+            reports.append(report)
+            print_report(report)
+            if args.ramp and not report["ok"]:
+                break
+    finally:
+        for proc in (worker, fake):
+            proc.terminate()
+        for proc in (worker, fake):
+            proc.wait(timeout=10)
+
+    sustained = max((r["calls"] for r in reports if r["ok"]), default=0)
+    print(f"\nMax concurrent calls sustained by one worker: {sustained}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"levels": reports, "max_sustained_calls": sustained, "config": vars(args)}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", choices=sorted(CALLERS), default="twilio")
+    parser.add_argument("--calls", type=int, default=20, help="concurrent calls (single level)")
+    parser.add_argument("--ramp", default="", help="comma-separated concurrency levels, stops at first failure")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--to", default="+15550100000", help="dialed number sent to the webhook (selects the persona)")
+    parser.add_argument("--speech-ms", type=int, default=1500)
+    parser.add_argument("--pause-ms", type=int, default=500)
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="spread call arrivals over this many seconds")
+    parser.add_argument("--turn-timeout", type=float, default=15.0)
+    parser.add_argument("--slo-p95-ms", type=float, default=1500.0)
+    parser.add_argument("--slo-lag-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--llm-ttft-ms", type=float, default=250.0)
+    parser.add_argument("--llm-large-ttft-ms", type=float, default=450.0, help="first-token latency of 70B models")
+    parser.add_argument("--stt-latency-ms", type=float, default=150.0)
+    parser.add_argument("--tts-latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show server output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Microbenchmark of the inbound media path: frames per second per core for
+the per-frame path (parse_event + b64decode + one send per frame) versus the
+fast path (payload string scan + decode + copy into the batch buffer + one
+send per batch; the decode still allocates one bytes object per frame).
+
+Sends go to a no-op socket, so this measures our CPU cost only.
+
+Run: python -m bench.media_path --frames 200000 --batch-ms 40
+"""
+
+import json
+import time
+import base64
+import asyncio
+import argparse
+
+from providers.twilio import TwilioProvider
+from providers.telnyx import TelnyxProvider
+from stt_forwarder import STTForwarder
+
+FRAME_BYTES = 160
+
+
+class _NullSocket:
+    async def send(self, data):
+        pass
+
+
+def _media_message(provider_name: str, seq: int) -> str:
+    payload = base64.b64encode(bytes((seq + i) % 256 for i in range(FRAME_BYTES))).decode()
+    message = {
+        "event": "media",
+        "sequenceNumber": str(seq),
+        "media": {"track": "inbound", "chunk": str(seq), "timestamp": str(seq * 20), "payload": payload},
+    }
+    if provider_name == "twilio":
+        message["streamSid"] = "MZ" + "0" * 32
+    else:
+        message["stream_id"] = "0" * 36
+    return json.dumps(message, separators=(",", ":"))
+
+
+async def per_frame(provider, messages, ws) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        event_type, data = provider.parse_event(message)
+        if event_type == "media":
+            await ws.send(base64.b64decode(data["payload"]))
+    return time.perf_counter() - started
+
+
+async def fast_path(provider, messages, ws, batch_ms: int) -> float:
+    forwarder = STTForwarder(batch_ms=batch_ms, max_buffered_ms=batch_ms)
+    started = time.perf_counter()
+    for message in messages:
+        payload = provider.extract_media_payload(message)
+        if payload is None:
+            event_type, data = provider.parse_event(message)
+            payload = data["payload"]
+        forwarder.add(payload)
+        # Drain inline so the no-op sends are counted too
+        while not forwarder._queue.empty():
+            await ws.send(forwarder._queue.get_nowait())
+    return time.perf_counter() - started
+
+
+async def run(frames: int, batch_ms: int):
+    ws = _NullSocket()
+    for provider in (TwilioProvider(), TelnyxProvider()):
+        messages = [_media_message(provider.name.lower(), i) for i in range(1024)]
+        messages = (messages * (frames // len(messages) + 1))[:frames]
+
+        slow = await per_frame(provider, messages, ws)
+        fast = await fast_path(provider, messages, ws, batch_ms)
+        print(
+            f"{provider.name:<7} per-frame: {frames / slow:>10,.0f} frames/s   "
+            f"fast path ({batch_ms} ms batches): {frames / fast:>10,.0f} frames/s   "
+            f"×{slow / fast:.2f}   (≈{frames / fast / 50:,.0f} calls/core)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--batch-ms", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args.frames, args.batch_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Replays recorded calls through VoiceBot, offline and deterministic.
+
+Each .vbrec file (recorded with RECORD_DIR=..., see recorder.py) is played
+back into a VoiceBot running in this process: the caller's audio and
+telephony events through a fake telephony socket, Deepgram's STT messages
+through a fake STT socket, and Groq / Deepgram TTS responses through an
+httpx transport that answers each request with the recorded response
+(matched by the user's last message / the text to speak), chunk for chunk
+at the recorded pace. Nothing touches the network, so a corpus of real
+conversations can benchmark pipeline changes in CI.
+
+The caller waits for the replayed answer to finish playing before speaking
+again (never sooner than in the recording), so turns stay in order when the
+pipeline gets faster or slower. --speed N compresses the caller's timing and
+upstream latencies; the bot's own timers and audio pacing stay real-time,
+so compare runs made at the same speed. TTS requests for text that isn't in
+the recording (e.g. after a segmenter change) get generated 8 kHz mulaw.
+
+Reports per-turn latency (end of caller speech → first answer audio) and
+the CPU time spent since the previous turn.
+
+Examples:
+    python -m bench.replay recordings/*.vbrec
+    python -m bench.replay recordings/ --speed 4 --json replay.json --slo-p95-ms 1200
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import base64
+import asyncio
+import argparse
+from collections import defaultdict, deque
+
+import httpx
+
+# Before the bot's modules read their configuration: quiet, and never re-record
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["RECORD_DIR"] = ""
+os.environ.setdefault("GROQ_API_KEY", "replay")
+os.environ.setdefault("DEEPGRAM_API_KEY", "replay")
+
+from groq import AsyncGroq  # noqa: E402
+
+from bot import VoiceBot  # noqa: E402
+from faq import FAQIndex  # noqa: E402
+from system_prompt import FAQ_ENTRIES  # noqa: E402
+from providers.twilio import TwilioProvider  # noqa: E402
+from providers.telnyx import TelnyxProvider  # noqa: E402
+from recorder import (  # noqa: E402
+    read_recording, META, TELEPHONY, MEDIA, STT, HTTP_REQUEST, HTTP_RESPONSE, HTTP_BODY,
+)
+
+PROVIDERS = {"twilio": TwilioProvider, "telnyx": TelnyxProvider}
+
+# Extra real time the caller waits for the replayed answer's playback mark
+MARK_GRACE_S = 5.0
+# Stand-in TTS audio for text that isn't in the recording
+FALLBACK_TTS_MS = 120.0
+FALLBACK_TTS_MS_PER_CHAR = 60.0
+
+
+# ── Recording ──────────────────────────────────────────────────
+
+def _event(message: bytes) -> str:
+    try:
+        return json.loads(message).get("event", "")
+    except ValueError:
+        return ""
+
+
+def exchange_key(method: str, url: str, body: str) -> tuple:
+    """What identifies a request across runs: the user's last message, or the text to speak."""
+    path = httpx.URL(url).path
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        data = {}
+    if path.endswith("/chat/completions"):
+        user = [m.get("content") for m in data.get("messages", []) if m.get("role") == "user"]
+        return ("chat", user[-1] if user else "", bool(data.get("stream")))
+    if path.endswith("/speak"):
+        return ("speak", data.get("text", ""))
+    return (method, path)
+
+
+class Exchange:
+    """One recorded HTTP request and its response, timed from the request."""
+
+    def __init__(self, t_ms: int, request: dict):
+        self.t_ms = t_ms
+        self.key = exchange_key(request["method"], request["url"], request["body"])
+        self.status = None
+        self.headers = []
+        self.response_ms = 0
+        self.chunks = []
+
+
+class Recording:
+    def __init__(self, path: str):
+        self.path = path
+        self.meta = {}
+        # (t_ms, TELEPHONY | MEDIA, payload) in arrival order
+        self.inbound = []
+        self.stt = []
+        self.exchanges = []
+        channels = {}
+        for kind, channel, t_ms, payload in read_recording(path):
+            if kind == META:
+                self.meta = json.loads(payload)
+            elif kind in (TELEPHONY, MEDIA):
+                self.inbound.append((t_ms, kind, payload))
+            elif kind == STT:
+                self.stt.append((t_ms, payload.decode()))
+            elif kind == HTTP_REQUEST:
+                channels[channel] = Exchange(t_ms, json.loads(payload))
+                self.exchanges.append(channels[channel])
+            elif kind == HTTP_RESPONSE and channel in channels:
+                response = json.loads(payload)
+                exchange = channels[channel]
+                exchange.status = response["status"]
+                exchange.headers = response["headers"]
+                exchange.response_ms = t_ms - exchange.t_ms
+            elif kind == HTTP_BODY and channel in channels:
+                exchange = channels[channel]
+                exchange.chunks.append((t_ms - exchange.t_ms, payload))
+        # Playback marks: the caller's next words wait for the replayed answer here
+        self.marks = [t_ms for t_ms, kind, payload in self.inbound if kind == TELEPHONY and _event(payload) == "mark"]
+
+
+# ── Replay clock ───────────────────────────────────────────────
+
+class ReplayClock:
+    """Recording time → replay time at `speed`, re-anchored at every playback mark."""
+
+    def __init__(self, speed: float, barriers: list):
+        self.speed = speed
+        self._barriers = barriers
+        self._passed = 0
+        self._anchor_t = 0
+        self._anchor_at = asyncio.get_running_loop().time()
+        self._rebased = asyncio.Event()
+
+    @property
+    def anchor_t(self) -> int:
+        return self._anchor_t
+
+    async def wait_until(self, t_ms: int):
+        # Nothing recorded after a playback mark happens before the replayed answer's mark
+        while self._passed < len(self._barriers) and self._barriers[self._passed] < t_ms:
+            self._rebased.clear()
+            await self._rebased.wait()
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(self._anchor_at + (t_ms - self._anchor_t) / 1000 / self.speed - loop.time(), 0))
+
+    def rebase(self, t_ms: int):
+        self._anchor_t = t_ms
+        self._anchor_at = asyncio.get_running_loop().time()
+        self._passed += 1
+        self._rebased.set()
+
+
+# ── Fake telephony and STT sockets ─────────────────────────────
+
+class FakeTelephonySocket:
+    """The two methods VoiceBot uses on the provider's WebSocket."""
+
+    def __init__(self):
+        self._inbound = asyncio.Queue()
+        # Replay-loop times of the bot's playback marks, for the caller to wait on
+        self.marks = asyncio.Queue()
+
+    def push(self, message):
+        self._inbound.put_nowait(message)
+
+    async def iter_text(self):
+        while True:
+            message = await self._inbound.get()
+            if message is None:
+                return
+            yield message
+
+    async def send_text(self, message: str):
+        if '"mark"' in message and json.loads(message).get("event") == "mark":
+            # The bot paces its audio in real time, so its mark is already "played": echo it
+            self.push(message)
+            self.marks.put_nowait(asyncio.get_running_loop().time())
+
+
+class FakeSTTSocket:
+    """Deepgram STT socket that plays back the recorded messages on the replay clock."""
+
+    def __init__(self, messages: list, clock: ReplayClock):
+        self._messages = messages
+        self._clock = clock
+        self._closed = asyncio.Event()
+        self.bytes_received = 0
+
+    async def send(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            self.bytes_received += len(data)
+
+    async def close(self):
+        self._closed.set()
+
+    def __aiter__(self):
+        return self._play()
+
+    async def _play(self):
+        closed = asyncio.create_task(self._closed.wait())
+        try:
+            for t_ms, message in self._messages:
+                due = asyncio.create_task(self._clock.wait_until(t_ms))
+                await asyncio.wait({due, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if closed.done():
+                    due.cancel()
+                    return
+                yield message
+            await closed
+        finally:
+            closed.cancel()
+
+
+class _ReplaySTTPool:
+    def __init__(self, socket: FakeSTTSocket):
+        self.socket = socket
+
+    async def claim(self, session_key: str = None):
+        return self.socket
+
+
+async def feed_telephony(recording: Recording, clock: ReplayClock, socket: FakeTelephonySocket):
+    """Plays the caller's side: audio frames and telephony events at their recorded times."""
+    for t_ms, kind, payload in recording.inbound:
+        await clock.wait_until(t_ms)
+        if kind == MEDIA:
+            socket.push('{"event":"media","media":{"payload":"%s"}}' % base64.b64encode(payload).decode())
+            continue
+        if _event(payload) == "mark":
+            timeout = (t_ms - clock.anchor_t) / 1000 + MARK_GRACE_S
+            try:
+                await asyncio.wait_for(socket.marks.get(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            clock.rebase(t_ms)
+            continue
+        socket.push(payload.decode())
+    socket.push(None)
+
+
+# ── Upstream HTTP from the recording ───────────────────────────
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers Groq / Deepgram TTS requests with recorded responses, at the recorded pace."""
+
+    def __init__(self, recording: Recording, speed: float):
+        self.speed = speed
+        self._by_key = defaultdict(deque)
+        self._chat = []
+        self._used = set()
+        for exchange in recording.exchanges:
+            if exchange.status is None:
+                continue
+            self._by_key[exchange.key].append(exchange)
+            if exchange.key[0] == "chat":
+                self._chat.append(exchange)
+
+        # Stats
+        self.matched = 0
+        self.unmatched = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = asyncio.get_running_loop().time()
+        body = (await request.aread()).decode("utf-8", "replace")
+        key = exchange_key(request.method, str(request.url), body)
+        exchange = self._take(key)
+        if exchange is None:
+            self.unmatched += 1
+            if key[0] == "speak":
+                return await self._generated_audio(key[1])
+            return httpx.Response(404, json={"error": {"message": "not in the recording"}})
+        self.matched += 1
+        await asyncio.sleep(exchange.response_ms / 1000 / self.speed)
+        return httpx.Response(
+            exchange.status,
+            headers=exchange.headers,
+            stream=_ReplayStream(exchange.chunks, started, self.speed),
+        )
+
+    def _take(self, key: tuple):
+        candidates = self._by_key.get(key, ())
+        if not candidates and key[0] == "chat":
+            # Different wording (e.g. a speculative interim): the next unused completion of the same kind
+            candidates = [exchange for exchange in self._chat if exchange.key[2] == key[2]]
+        for exchange in candidates:
+            if id(exchange) not in self._used:
+                self._used.add(id(exchange))
+                return exchange
+        return None
+
+    async def _generated_audio(self, text: str) -> httpx.Response:
+        await asyncio.sleep(FALLBACK_TTS_MS / 1000 / self.speed)
+        audio = bytes([0x7F]) * int(len(text) * FALLBACK_TTS_MS_PER_CHAR * 8)
+        return httpx.Response(200, headers={"content-type": "audio/basic"}, content=audio)
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list, started: float, speed: float):
+        self._chunks = chunks
+        self._started = started
+        self._speed = speed
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        for offset_ms, chunk in self._chunks:
+            await asyncio.sleep(max(self._started + offset_ms / 1000 / self._speed - loop.time(), 0))
+            yield chunk
+
+
+class ReplayClients:
+    """The part of ClientPool VoiceBot uses, served from one recording."""
+
+    def __init__(self, transport: ReplayTransport):
+        self.http = httpx.AsyncClient(transport=transport, timeout=30.0)
+        self._groq_http = httpx.AsyncClient(transport=transport, timeout=30.0)
+        self.groq = AsyncGroq(api_key="replay", http_client=self._groq_http)
+
+    async def close(self):
+        await self.http.aclose()
+        await self._groq_http.aclose()
+
+
+# ── One replayed call ──────────────────────────────────────────
+
+class ReplayBot(VoiceBot):
+    """Stamps each finished turn with the process CPU time used since the previous one."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.turn_cpu_ms = {}
+        self._cpu_mark = time.process_time()
+
+    def _finish_trace(self, outcome: str = None):
+        trace = self._trace
+        super()._finish_trace(outcome)
+        if trace is not None:
+            now = time.process_time()
+            self.turn_cpu_ms[trace.turn] = 1000 * (now - self._cpu_mark)
+            self._cpu_mark = now
+
+
+async def replay_call(recording: Recording, speed: float, faq: bool) -> dict:
+    clock = ReplayClock(speed, recording.marks)
+    transport = ReplayTransport(recording, speed)
+    clients = ReplayClients(transport)
+    telephony = FakeTelephonySocket()
+    stt = FakeSTTSocket(recording.stt, clock)
+    provider = PROVIDERS[recording.meta.get("provider", "twilio").lower()]()
+    bot = ReplayBot(
+        provider,
+        clients=clients,
+        stt_pool=_ReplaySTTPool(stt),
+        faq=FAQIndex(FAQ_ENTRIES) if faq else None,
+    )
+    feeder = asyncio.create_task(feed_telephony(recording, clock, telephony))
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        await bot.start(telephony)
+    finally:
+        feeder.cancel()
+        await clients.close()
+
+    turns = []
+    for trace in bot._call_summary.traces:
+        durations = trace.durations()
+
+        def ms(stage):
+            return round(1000 * durations[stage], 1) if stage in durations else None
+
+        turns.append({
+            "turn": trace.turn,
+            "outcome": trace.outcome or "completed",
+            "latency_ms": ms("turn_latency"),
+            "llm_first_token_ms": ms("llm_first_token"),
+            "tts_first_byte_ms": ms("tts_first_byte"),
+            "prompt_tokens": trace.prompt_tokens,
+            "cpu_ms": round(bot.turn_cpu_ms.get(trace.turn, 0.0), 2),
+        })
+    return {
+        "recording": recording.path,
+        "turns": turns,
+        "wall_s": round(time.perf_counter() - started, 2),
+        "cpu_ms": round(1000 * (time.process_time() - cpu_started), 1),
+        "http_matched": transport.matched,
+        "http_unmatched": transport.unmatched,
+    }
+
+
+# ── Report ─────────────────────────────────────────────────────
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def print_call(report: dict):
+    print(
+        f"{os.path.basename(report['recording'])}: {len(report['turns'])} turns  wall={report['wall_s']:.1f} s  "
+        f"cpu={report['cpu_ms']:.0f} ms  http matched/unmatched={report['http_matched']}/{report['http_unmatched']}"
+    )
+    for turn in report["turns"]:
+        def fmt(value):
+            return "-" if value is None else f"{value:.0f}"
+
+        print(
+            f"  turn {turn['turn']:>2}  {turn['outcome']:<11} latency={fmt(turn['latency_ms'])} ms  "
+            f"llm_ttft={fmt(turn['llm_first_token_ms'])}  tts_ttfb={fmt(turn['tts_first_byte_ms'])}  "
+            f"prompt={fmt(turn['prompt_tokens'])} tok  cpu={turn['cpu_ms']:.1f} ms"
+        )
+
+
+def summarize(reports: list) -> dict:
+    turns = [turn for report in reports for turn in report["turns"]]
+    latencies = [turn["latency_ms"] for turn in turns if turn["latency_ms"] is not None]
+    cpu = [turn["cpu_ms"] for turn in turns]
+    return {
+        "calls": len(reports),
+        "turns": len(turns),
+        "latency_p50_ms": percentile(latencies, 0.50),
+        "latency_p95_ms": percentile(latencies, 0.95),
+        "cpu_ms_per_turn": round(sum(cpu) / len(cpu), 2) if cpu else 0.0,
+        "http_unmatched": sum(report["http_unmatched"] for report in reports),
+    }
+
+
+def recording_paths(patterns: list) -> list:
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, "*.vbrec"))))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+async def main_async(args) -> int:
+    reports = []
+    for path in recording_paths(args.recordings):
+        report = await replay_call(Recording(path), args.speed, args.faq)
+        reports.append(report)
+        print_call(report)
+
+    summary = summarize(reports)
+    print(
+        f"\n{summary['calls']} calls, {summary['turns']} turns  "
+        f"latency p50/p95={summary['latency_p50_ms']:.0f}/{summary['latency_p95_ms']:.0f} ms  "
+        f"cpu={summary['cpu_ms_per_turn']:.1f} ms/turn  unmatched requests={summary['http_unmatched']}"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "calls": reports, "config": vars(args)}, f, indent=2)
+    if args.slo_p95_ms and summary["latency_p95_ms"] > args.slo_p95_ms:
+        print(f"FAIL: p95 latency over {args.slo_p95_ms:.0f} ms")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+", help=".vbrec files, globs or directories")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay N times faster than recorded")
+    parser.add_argument("--faq", action="store_true", help="answer from the local FAQ index like main.py")
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--slo-p95-ms", type=float, default=0.0, help="exit 1 if p95 turn latency is above this")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Worker start-up benchmark.
+
+How long a freshly started worker takes to be useful, as an autoscaler sees
+it: cold import of the app, time until it accepts connections, time until
+/ready says 200 (warm-up done), and the turn latencies of the very first
+call it takes. Each run starts a new worker process against the fake
+upstreams; --compare repeats it with WARMUP=0 to show what the warm-up buys.
+
+Examples:
+    python -m bench.startup
+    python -m bench.startup --runs 5 --compare --json startup.json
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+import httpx
+
+from bench.loadgen import bench_env, start_fake_upstreams, wait_ready, run_call
+
+COLD_IMPORT = (
+    "import time; started = time.perf_counter(); import main, bot; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def cold_import_ms(env: dict) -> tuple:
+    """(app import ms, whole process ms including the interpreter) for one fresh process."""
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT], env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1]), (time.perf_counter() - started) * 1000
+
+
+async def wait_for(http: httpx.AsyncClient, url: str, timeout: float, ok=lambda response: True) -> float:
+    """Seconds (monotonic) at which url first answered (and satisfied ok)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if ok(await http.get(url)):
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.005)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f} s")
+
+
+async def start_worker(args, env: dict, warmup: bool) -> dict:
+    """Start one worker, time it to listening / ready, then place its first call."""
+    env = {**env, "WARMUP": "1" if warmup else "0"}
+    quiet = None if args.verbose else subprocess.DEVNULL
+    base = f"127.0.0.1:{args.port}"
+    started = time.monotonic()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "bench.worker", "--port", str(args.port)],
+        env=env, stdout=quiet, stderr=quiet,
+    )
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as http:
+            listening = await wait_for(http, f"http://{base}/", args.timeout)
+            ready = await wait_for(http, f"http://{base}/ready", args.timeout, lambda r: r.status_code == 200)
+            startup = (await http.get(f"http://{base}/stats")).json()["startup"]
+            call = await run_call(
+                http, base, args.provider, args.turns, args.speech_ms, args.pause_ms, args.turn_timeout, args.to,
+            )
+    finally:
+        worker.terminate()
+        worker.wait(timeout=10)
+    if call.error:
+        raise RuntimeError(f"first call failed: {call.error}")
+    return {
+        "listening_ms": round((listening - started) * 1000, 1),
+        "ready_ms": round((ready - started) * 1000, 1),
+        "warmup_ms": startup["warmup"]["duration_ms"],
+        "warmup_steps_ms": startup["warmup"]["steps_ms"],
+        "app_import_ms": startup["import_ms"],
+        "first_call_turn_ms": [round(latency * 1000, 1) for latency in call.turn_latencies],
+    }
+
+
+def summarize(runs: list) -> dict:
+    def median(key):
+        return round(statistics.median(run[key] for run in runs), 1)
+
+    turns = max(len(run["first_call_turn_ms"]) for run in runs)
+    steps = sorted({name for run in runs for name in run["warmup_steps_ms"]})
+    return {
+        "runs": len(runs),
+        "listening_ms": median("listening_ms"),
+        "ready_ms": median("ready_ms"),
+        "warmup_ms": median("warmup_ms"),
+        "warmup_steps_ms": {
+            name: round(statistics.median(run["warmup_steps_ms"].get(name, 0.0) for run in runs), 1)
+            for name in steps
+        },
+        # Median latency of turn 1, 2, ... of the first call
+        "first_call_turn_ms": [
+            round(statistics.median(run["first_call_turn_ms"][i] for run in runs if len(run["first_call_turn_ms"]) > i), 1)
+            for i in range(turns)
+        ],
+    }
+
+
+def print_summary(label: str, summary: dict):
+    steps = ", ".join(f"{name} {ms:.0f}" for name, ms in summary["warmup_steps_ms"].items())
+    turns = "/".join(f"{ms:.0f}" for ms in summary["first_call_turn_ms"])
+    print(
+        f"{label:<11} listening={summary['listening_ms']:.0f} ms  ready={summary['ready_ms']:.0f} ms  "
+        f"warm-up={summary['warmup_ms']:.0f} ms ({steps})  first call turns={turns} ms"
+    )
+
+
+async def main_async(args):
+    env = bench_env(args)
+    imports = [cold_import_ms(env) for _ in range(args.runs)]
+    report = {
+        "cold_import_ms": round(statistics.median(app for app, _ in imports), 1),
+        "cold_process_ms": round(statistics.median(process for _, process in imports), 1),
+    }
+    print(f"cold import  main+bot={report['cold_import_ms']:.0f} ms  (whole process {report['cold_process_ms']:.0f} ms)")
+
+    fake = start_fake_upstreams(args, env)
+    try:
+        await wait_ready(args.fake_port)
+        for label, warmup in [("warm-up", True)] + ([("no warm-up", False)] if args.compare else []):
+            runs = [await start_worker(args, env, warmup) for _ in range(args.runs)]
+            report[label] = {"summary": summarize(runs), "runs": runs}
+            print_summary(label, report[label]["summary"])
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**report, "config": vars(args)}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh workers per mode (medians are reported)")
+    parser.add_argument("--compare", action="store_true", help="also start workers with WARMUP=0")
+    parser.add_argument("--provider", choices=["twilio", "telnyx"], default="twilio")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--to", default="+15550100000")
+    parser.add_argument("--speech-ms", type=int, default=1500)
+    parser.add_argument("--pause-ms", type=int, default=500)
+    parser.add_argument("--turn-timeout", type=float, default=15.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="give up on a worker after this long")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--fake-port", type=int, default=9101)
+    parser.add_argument("--llm-ttft-ms", type=float, default=250.0)
+    parser.add_argument("--llm-large-ttft-ms", type=float, default=450.0)
+    parser.add_argument("--stt-latency-ms", type=float, default=150.0)
+    parser.add_argument("--tts-latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show server output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Runs the voice agent app (main.py) in a single uvicorn worker with an
+event-loop lag probe, for the load generator to drive and measure.
+
+Run: python -m bench.worker --port 8080
+(upstream URLs come from the environment, see bench/fake_upstreams.py)
+"""
+
+import time
+import asyncio
+import argparse
+import uvicorn
+from collections import deque
+
+from main import app, DrainingServer
+
+PROBE_INTERVAL = 0.01
+
+# Lag samples (seconds) since the last read of /bench/loop-lag
+_lag_samples = deque(maxlen=100_000)
+
+
+async def _lag_probe():
+    """Sleeps a fixed interval and records how late the loop woke us up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        _lag_samples.append(max(loop.time() - expected, 0.0))
+
+
+@app.get("/bench/loop-lag")
+async def loop_lag():
+    """Lag percentiles since the previous call (resets the window)."""
+    samples = sorted(_lag_samples)
+    _lag_samples.clear()
+    if not samples:
+        return {"samples": 0}
+
+    def pct(q):
+        return round(1000 * samples[min(int(q * len(samples)), len(samples) - 1)], 3)
+
+    return {
+        "samples": len(samples),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "max_ms": round(1000 * samples[-1], 3),
+        "at": time.time(),
+    }
+
+
+async def serve(host: str, port: int):
+    server = DrainingServer(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    probe = asyncio.create_task(_lag_probe())
+    try:
+        await server.serve()
+    finally:
+        probe.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,50 @@ Provider-agnostic: works with Twilio, Telnyx, or any provider implementing Telep
 
 import os
 import json
-import base64
+import time
+import uuid
 import asyncio
 import httpx
+from urllib.parse import urlencode
+from contextlib import aclosing
 import websockets
 from groq import AsyncGroq
 from dotenv import load_dotenv
-from system_prompt import SYSTEM_PROMPT
-from providers import TelephonyProvider
+from personas import Persona, default_persona
+from segmenter import SentenceSegmenter
+from playback import AudioSender
+from providers import TelephonyProvider, media_path_stats
+from clients import ClientPool
+from tts_cache import TTSCache
+from speculation import Speculator
+from turns import TurnAssembler
+from history import ConversationHistory
+from tracing import TurnTrace, CallSummary, AudioTimeline, metrics
+from stt_pool import STTWarmPool, connect_stt
+from stt_forwarder import STTForwarder
+from vad import VoiceActivityDetector, vad_stats
+from endpointing import EndOfTurnPredictor
+from audio import PCMToTelephony
+from fillers import FillerBank
+from faq import FAQIndex, FAQMatch
+from llm_router import Route, llm_router
+from deadline import TurnDeadline, breakers
+from session_registry import SessionRegistry
+from log import get_logger, bind_call
+from recorder import CallRecorder, bind_recorder
+
+log = get_logger("bot")
 
 load_dotenv()
 
-# Deepgram STT WebSocket URL
-DEEPGRAM_STT_URL = (
+# Adaptive end-of-turn detection: Deepgram's short endpointing only proposes the
+# end of a turn, and a per-call predictor (endpointing.py) decides how long to wait
+ADAPTIVE_ENDPOINTING = os.getenv("ADAPTIVE_ENDPOINTING", "1") == "1"
+FIXED_ENDPOINTING_MS = 300
+STT_ENDPOINTING_MS = int(os.getenv("STT_ENDPOINTING_MS", 150 if ADAPTIVE_ENDPOINTING else FIXED_ENDPOINTING_MS))
+
+# Deepgram STT WebSocket URL (overridable, e.g. to point the load generator at a fake)
+DEEPGRAM_STT_URL = os.getenv("DEEPGRAM_STT_URL") or (
     "wss://api.deepgram.com/v1/listen"
     "?model=nova-2-phonecall"
     "&language=en-US"
@@ -26,106 +57,396 @@ DEEPGRAM_STT_URL = (
     "&sample_rate=8000"
     "&smart_format=true"
     "&interim_results=true"
-    "&endpointing=300"
+    f"&endpointing={STT_ENDPOINTING_MS}"
     "&utterance_end_ms=1000"
 )
-
-# Deepgram TTS REST URL
-DEEPGRAM_TTS_URL = (
-    "https://api.deepgram.com/v1/speak"
-    "?model=aura-asteria-en"
-    "&encoding=mulaw"
-    "&sample_rate=8000"
-    "&container=none"
-)
+# The end-of-turn timing relies on STT's endpointing, so an override gets it too
+if "endpointing=" not in DEEPGRAM_STT_URL:
+    DEEPGRAM_STT_URL += ("&" if "?" in DEEPGRAM_STT_URL else "?") + f"endpointing={STT_ENDPOINTING_MS}"
+
+# Groq completion parameters (shared by regular and speculative requests);
+# the model is chosen per turn by llm_router
+LLM_PARAMS = {
+    "temperature": 0.7,
+    "max_tokens": 150,
+}
+
+# First-token budget the router plans against: the larger model is skipped while
+# its recent median exceeds this, and hedged to the fast one once a request does
+LLM_FIRST_TOKEN_BUDGET_MS = int(os.getenv("LLM_FIRST_TOKEN_BUDGET_MS", 700))
+
+# End-to-end silence budget per turn (caller stops speaking → first answer audio),
+# shared out across STT finalization, the LLM's first token and TTS's first byte.
+# Overruns cascade: a short retry on the fast model, then the canned apology clip.
+TURN_BUDGET_MS = int(os.getenv("TURN_BUDGET_MS", 3000))
+DEGRADED_MAX_TOKENS = 60
+
+# Start the LLM early once interim transcripts have been stable this long
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "1") == "1"
+SPECULATION_WINDOW_MS = int(os.getenv("SPECULATION_WINDOW_MS", 300))
+
+# Wait this long after speech_final before closing the turn (caller may continue)
+TURN_DEBOUNCE_MS = int(os.getenv("TURN_DEBOUNCE_MS", 150))
+
+# Prompt size control: system prompt + last N turns within a token budget
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 6))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))
+
+# Caller audio kept while the STT socket is still connecting (or falling behind)
+MAX_PENDING_AUDIO_MS = 5000
+
+# Inbound 20 ms frames are coalesced into one STT send per batch (40–100 ms)
+STT_BATCH_MS = int(os.getenv("STT_BATCH_MS", 40))
+
+# Local VAD barge-in: playback is cleared on speech onset and resumed if no
+# Deepgram transcript confirms it within VAD_CONFIRM_MS (0 = interrupt on VAD alone)
+VAD_BARGE_IN = os.getenv("VAD_BARGE_IN", "1") == "1"
+VAD_CONFIRM_MS = int(os.getenv("VAD_CONFIRM_MS", 1000))
+
+# Record every call's inbound audio, STT messages and upstream responses here
+# (one <call_id>.vbrec per call, replayable with bench/replay.py; empty = off)
+RECORD_DIR = os.getenv("RECORD_DIR", "")
+
+# Default Deepgram TTS voice / output format (also part of the TTS cache key);
+# a persona may choose its own voice and extra TTS parameters.
+# At 16/24 kHz, linear16 audio is requested and converted to 8 kHz mulaw locally.
+TTS_MODEL = "aura-asteria-en"
+TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", 8000))
+TTS_ENCODING = "mulaw" if TTS_SAMPLE_RATE == 8000 else "linear16"
+
+# Deepgram TTS REST endpoint (the voice and format are added per persona)
+DEEPGRAM_TTS_URL = os.getenv("DEEPGRAM_TTS_URL") or "https://api.deepgram.com/v1/speak"
+
+
+def tts_voice(persona: Persona = None) -> str:
+    """A persona's voice as the TTS cache sees it: the model, plus any extra parameters."""
+    voice = (persona and persona.voice) or TTS_MODEL
+    if persona and persona.tts_params:
+        voice += "?" + urlencode(sorted(persona.tts_params.items()))
+    return voice
+
+
+def tts_url(persona: Persona = None) -> str:
+    query = {
+        "model": (persona and persona.voice) or TTS_MODEL,
+        "encoding": TTS_ENCODING,
+        "sample_rate": TTS_SAMPLE_RATE,
+        "container": "none",
+        **(persona.tts_params if persona else {}),
+    }
+    return DEEPGRAM_TTS_URL + ("&" if "?" in DEEPGRAM_TTS_URL else "?") + urlencode(query)
+
+
+async def synthesize(http_client: httpx.AsyncClient, text: str, tts_cache: TTSCache = None, persona: Persona = None) -> bytes:
+    """Whole-utterance TTS as 8 kHz mulaw, for short prompts prepared ahead of calls."""
+    cache_key = TTSCache.key(text, tts_voice(persona), TTS_ENCODING, TTS_SAMPLE_RATE)
+    if tts_cache:
+        cached = await tts_cache.get(cache_key)
+        if cached is not None:
+            return bytes(cached)
+    response = await http_client.post(
+        tts_url(persona),
+        headers={
+            "Authorization": f"Token {os.getenv('DEEPGRAM_API_KEY')}",
+            "Content-Type": "application/json",
+        },
+        json={"text": text},
+    )
+    response.raise_for_status()
+    audio = response.content
+    if TTS_ENCODING != "mulaw":
+        audio = PCMToTelephony(TTS_SAMPLE_RATE).feed(audio)
+    if tts_cache:
+        await tts_cache.put(cache_key, audio)
+    return audio
+
+
+async def _prepend(first: str, deltas):
+    """Re-attach an already awaited first delta to the rest of its stream."""
+    yield first
+    async with aclosing(deltas):
+        async for delta in deltas:
+            yield delta
 
 
 class VoiceBot:
-    def __init__(self, provider: TelephonyProvider):
+    def __init__(
+        self,
+        provider: TelephonyProvider,
+        clients: ClientPool = None,
+        tts_cache: TTSCache = None,
+        stt_pool: STTWarmPool = None,
+        fillers: FillerBank = None,
+        faq: FAQIndex = None,
+        apology: bytes = None,
+        registry: SessionRegistry = None,
+        persona: Persona = None,
+    ):
         self.provider = provider
+        self.stt_pool = stt_pool
+        self.tts_cache = tts_cache
+        # The tenant this call is for (prompt, voice, models, greeting, FAQ), shared with its other calls
+        self.persona = persona or default_persona()
+        self._tts_voice = tts_voice(self.persona)
+        self._tts_url = tts_url(self.persona)
+        self._llm_params = {**LLM_PARAMS, **self.persona.llm_params}
+        # Filler clips are in the default voice
+        self.fillers = fillers if self._tts_voice == TTS_MODEL else None
+        self.faq = faq or self.persona.faq
+        # Pre-synthesized apology audio, the last step of the deadline cascade
+        self.apology = apology or self.persona.apology_audio
+        # Cluster session registry: records this call (key + stream_sid) as owned by this worker
+        self.registry = registry
+        self._registry_key = None
         self.deepgram_api_key = os.getenv("DEEPGRAM_API_KEY")
         self.groq_api_key = os.getenv("GROQ_API_KEY")
 
-        self.groq_client = AsyncGroq(api_key=self.groq_api_key)
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        # Borrow the app's shared keep-alive clients; fall back to private ones
+        # (and close them ourselves) when running standalone
+        self._owns_clients = clients is None
+        if clients is None:
+            self.groq_client = AsyncGroq(api_key=self.groq_api_key)
+            self.http_client = httpx.AsyncClient(timeout=30.0)
+        else:
+            self.groq_client = clients.groq
+            self.http_client = clients.http
 
         # Telephony WebSocket & stream state
         self.telephony_ws = None
         self.stream_sid = None
 
-        # Deepgram STT WebSocket
+        # Deepgram STT WebSocket, and the batched audio path into it
         self.dg_ws = None
+        self._stt_forwarder = STTForwarder(batch_ms=STT_BATCH_MS, max_buffered_ms=MAX_PENDING_AUDIO_MS)
 
-        # Barge-in state
+        # Barge-in state; the VAD hold is the pending "resume playback" timer
         self._current_response_task = None
         self._is_responding = False
+        # (the VAD also feeds local silence to the end-of-turn predictor)
+        self._vad = VoiceActivityDetector() if VAD_BARGE_IN or ADAPTIVE_ENDPOINTING else None
+        self._barge_in_hold = None
+
+        # Outbound audio for the active response, plus (segment text, end offset in ms)
+        # so a barge-in knows how much of the answer the caller actually heard
+        self._sender = None
+        self._segment_marks = []
+        # Name of the playback mark the current response is waiting for
+        self._playback_mark = None
+        # Milliseconds of filler audio queued ahead of the answer this turn
+        self._filler_ms = 0
+
+        # Conversation history for multi-turn context (older turns are summarized)
+        self.history = ConversationHistory(
+            self.persona.system_prompt,
+            self.groq_client,
+            max_turns=HISTORY_MAX_TURNS,
+            token_budget=HISTORY_TOKEN_BUDGET,
+            system_prompt_tokens=self.persona.system_prompt_tokens,
+        )
+
+        # Per-call recording (RECORD_DIR), created when the call starts
+        self._recorder = None
+
+        # Latency tracing: current turn's marks and silence budget, finished turns, inbound audio clock
+        self._trace = None
+        self._deadline = None
+        self._turn_count = 0
+        self._call_summary = CallSummary()
+        self._audio_timeline = AudioTimeline()
+        self._speech_end_at = None
+
+        # Merges Deepgram final segments into one turn → one response
+        self._endpointer = None
+        if ADAPTIVE_ENDPOINTING:
+            self._endpointer = EndOfTurnPredictor(
+                fixed_extra_ms=FIXED_ENDPOINTING_MS - STT_ENDPOINTING_MS + TURN_DEBOUNCE_MS,
+                stt_silence_ms=STT_ENDPOINTING_MS,
+            )
+        self._turns = TurnAssembler(self._on_turn, debounce_ms=TURN_DEBOUNCE_MS, endpointer=self._endpointer)
+        # User text whose response was cut off before the caller heard anything
+        self._unanswered_text = ""
+
+        # Early LLM requests on stable interim transcripts
+        self._speculator = None
+        if SPECULATIVE_LLM:
+            self._speculator = Speculator(
+                self.groq_client,
+                self._messages_for,
+                self._llm_params,
+                window_ms=SPECULATION_WINDOW_MS,
+                choose_model=lambda text: self._route(text).model,
+                context_version=lambda: self.history.version,
+            )
 
-        # Conversation history for multi-turn context
-        self.conversation_history = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
+    async def start(self, telephony_websocket, session_key: str = None):
+        """Entry point: starts listening on the telephony WebSocket.
 
-    async def start(self, telephony_websocket):
-        """Entry point: starts listening on the telephony WebSocket."""
+        session_key identifies the STT session pre-warmed at webhook time (if any).
+        """
         self.telephony_ws = telephony_websocket
-        print(f"🔌 Using provider: {self.provider.name}")
-
+        self._session_key = session_key
+        # Every record logged from this call's tasks carries its id (and stream_sid once known)
+        self._log_context = bind_call(session_key or uuid.uuid4().hex)
+        log.info("call_connected", f"🔌 Using provider: {self.provider.name}")
+        if RECORD_DIR:
+            self._recorder = CallRecorder(self.provider.name)
+            bind_recorder(self._recorder)
+
+        # Read the media stream right away; audio is buffered until STT is ready
+        telephony_task = asyncio.create_task(self._handle_telephony_messages())
+        connect_task = asyncio.create_task(self._connect_stt(session_key))
         try:
-            async with websockets.connect(
-                DEEPGRAM_STT_URL,
-                additional_headers={"Authorization": f"Token {self.deepgram_api_key}"},
-            ) as dg_ws:
+            await asyncio.wait({telephony_task, connect_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not connect_task.done():
+                # Caller hung up before the STT socket was even ready
+                connect_task.cancel()
+                return
+
+            dg_ws = connect_task.result()
+            if telephony_task.done():
+                await dg_ws.close()
+                return
+            try:
+                log.info("stt_connected", "✅ Deepgram STT connected")
                 self.dg_ws = dg_ws
-                print("✅ Deepgram STT connected")
+                self._stt_forwarder.start(dg_ws)
 
                 await asyncio.gather(
-                    self._handle_telephony_messages(),
+                    telephony_task,
                     self._handle_deepgram_messages(),
                 )
+            finally:
+                await self._stt_forwarder.close()
+                await dg_ws.close()
         except Exception as e:
-            print(f"❌ Deepgram connection error: {e}")
+            log.error("stt_error", f"❌ Deepgram connection error: {e}")
         finally:
-            await self.http_client.aclose()
+            if not telephony_task.done():
+                telephony_task.cancel()
+            if self._barge_in_hold:
+                self._barge_in_hold.cancel()
+            self._finish_trace("hangup")
+            # Nobody is listening any more: stop the LLM / TTS streams and the frame pump
+            # before the call is reported as ended
+            if self._sender:
+                self._sender.stop()
+            response, self._current_response_task = self._current_response_task, None
+            if response and not response.done():
+                response.cancel()
+                await asyncio.gather(response, return_exceptions=True)
+            if self._registry_key:
+                await self._registry_call(self.registry.release, self._registry_key)
+            log.info("call_summary", f"📊 Call summary: {self._call_summary.format()}", history=self.history.stats())
+            self._turns.reset()
+            self.history.close()
+            if self._speculator:
+                self._speculator.cancel()
+            if self._owns_clients:
+                await self.http_client.aclose()
+                await self.groq_client.close()
+            if self._recorder:
+                await self._save_recording()
+
+    async def _save_recording(self):
+        path = os.path.join(RECORD_DIR, f"{self._log_context.call_id}.vbrec")
+        try:
+            await self._recorder.save(path)
+            log.info("call_recorded", f"💾 Call recorded to {path}")
+        except Exception as e:
+            log.warning("record_failed", f"⚠️ Could not save call recording ({e})")
+
+    async def _registry_call(self, method, *args):
+        """Registry bookkeeping must never take a call down with it."""
+        try:
+            await method(*args)
+        except Exception as e:
+            log.warning("registry_error", f"⚠️ Session registry error ({e})")
+
+    async def _connect_stt(self, session_key: str = None):
+        """Claim the pre-warmed STT session for this call, or connect a new one."""
+        if self.stt_pool:
+            return await self.stt_pool.claim(session_key)
+        return await connect_stt(DEEPGRAM_STT_URL, self.deepgram_api_key)
 
     async def _handle_telephony_messages(self):
         """Reads messages from the telephony provider and forwards audio to Deepgram."""
         try:
             async for message in self.telephony_ws.iter_text():
+                # Fast path for media frames: no JSON parse
+                payload = self.provider.extract_media_payload(message)
+                if payload is not None:
+                    if self._on_media(payload) and self._is_responding:
+                        await self._vad_barge_in()
+                    continue
+
                 event_type, data = self.provider.parse_event(message)
+                if self._recorder and event_type != "media":
+                    self._recorder.telephony(message)
 
                 if event_type == "start":
                     self.stream_sid = data["stream_sid"]
-                    print(f"📞 [{self.provider.name}] Stream started: {self.stream_sid}")
+                    self._log_context.stream_sid = self.stream_sid
+                    log.info("stream_started", f"📞 [{self.provider.name}] Stream started: {self.stream_sid}")
+                    if self.registry:
+                        # Calls without a webhook session key are tracked by stream_sid
+                        self._registry_key = self._session_key or self.stream_sid
+                        await self._registry_call(self.registry.attach, self._registry_key, self.stream_sid)
+                    if self.persona.greeting_audio:
+                        self._current_response_task = asyncio.create_task(self._play_greeting())
 
                 elif event_type == "media":
-                    audio_bytes = base64.b64decode(data["payload"])
-                    try:
-                        if self.dg_ws:
-                            await self.dg_ws.send(audio_bytes)
-                    except Exception:
-                        pass
+                    # Missed by the fast path (counted so a provider format change shows up at /stats)
+                    media_path_stats.parsed += 1
+                    if self._on_media(data["payload"]) and self._is_responding:
+                        await self._vad_barge_in()
 
                 elif event_type == "mark":
+                    # A late mark from a cleared or superseded response says nothing about this one
+                    if data.get("name") != self._playback_mark:
+                        log.debug("stale_mark", f"Ignoring stale playback mark {data.get('name')!r}")
+                        continue
                     # Playback finished — safe to clear the responding flag
-                    print(f"✅ [{self.provider.name}] Playback finished (mark received)")
+                    self._playback_mark = None
+                    log.info("playback_done", f"✅ [{self.provider.name}] Playback finished (mark received)")
                     self._is_responding = False
+                    if self._trace:
+                        self._trace.mark("playback_mark")
+                        self._finish_trace()
 
                 elif event_type == "stop":
-                    print(f"📞 [{self.provider.name}] Stream stopped")
-                    try:
-                        if self.dg_ws:
-                            await self.dg_ws.close()
-                    except Exception:
-                        pass
+                    log.info("stream_stopped", f"📞 [{self.provider.name}] Stream stopped")
                     break
 
         except Exception as e:
-            print(f"❌ [{self.provider.name}] handler error: {e}")
+            log.error("telephony_error", f"❌ [{self.provider.name}] handler error: {e}")
+        finally:
+            # Stop event or a dropped socket: either way the call is over, so end
+            # the STT session too (otherwise the session, and a drain, waits on it)
+            try:
+                if self.dg_ws:
+                    await self.dg_ws.close()
+            except Exception:
+                pass
+
+    def _on_media(self, payload: str) -> bool:
+        """Queue one inbound frame for STT; returns True when local VAD detects speech onset."""
+        audio = self._stt_forwarder.add(payload)
+        self._audio_timeline.add(len(audio))
+        if self._recorder:
+            self._recorder.media(audio)
+        if self._vad is None:
+            return False
+        onset = self._vad.process(audio) == "start"
+        if self._endpointer:
+            self._endpointer.on_audio(self._vad.voiced)
+        return onset and VAD_BARGE_IN
 
     async def _handle_deepgram_messages(self):
         """Reads transcription results from Deepgram and triggers LLM + TTS."""
         try:
             async for msg in self.dg_ws:
+                if self._recorder:
+                    self._recorder.stt(msg)
                 data = json.loads(msg)
                 msg_type = data.get("type")
 
@@ -136,100 +457,527 @@ class VoiceBot:
 
                     transcript = alternatives[0].get("transcript", "").strip()
                     is_final = data.get("is_final", False)
+                    speech_final = data.get("speech_final", False)
 
                     if not transcript:
+                        # An empty speech_final still closes the current turn
+                        if is_final:
+                            self._turns.add_final("", speech_final)
                         continue
 
                     # Barge-in: user started speaking while AI is talking
                     if not is_final and self._is_responding:
-                        print(f"🛑 Barge-in detected! User said: {transcript}")
+                        log.info("barge_in", f"🛑 Barge-in detected! User said: {transcript}")
                         await self._interrupt()
                         continue
 
-                    if is_final:
-                        print(f"🎤 User: {transcript}")
-                        self._current_response_task = asyncio.create_task(
-                            self._respond(transcript)
-                        )
+                    if not is_final:
+                        self._turns.add_interim(transcript)
+                        if self._speculator:
+                            turn_text = self._turn_text(transcript)
+                            # No point speculating on a question the FAQ will answer
+                            if not (self.faq and self.faq.matches(turn_text)):
+                                self._speculator.observe(turn_text)
+                        continue
+
+                    log.info("user_segment", f"🎤 User (segment): {transcript}")
+                    # Wall-clock arrival of the last audio in this segment (for turn latency)
+                    speech_end = data.get("start", 0.0) + data.get("duration", 0.0)
+                    self._speech_end_at = self._audio_timeline.arrival_time(speech_end)
+                    self._turns.add_final(transcript, speech_final)
+
+                elif msg_type == "UtteranceEnd":
+                    self._turns.utterance_end()
 
         except websockets.exceptions.ConnectionClosed:
-            print("Deepgram STT connection closed")
+            log.info("stt_closed", "Deepgram STT connection closed")
         except Exception as e:
-            print(f"❌ Deepgram listener error: {e}")
+            log.error("stt_error", f"❌ Deepgram listener error: {e}")
+
+    async def _vad_barge_in(self):
+        """Caller started talking over the response: clear playback within a few frames."""
+        if self._barge_in_hold is not None or not self.stream_sid:
+            return
+        if not VAD_CONFIRM_MS:
+            vad_stats.barge_ins += 1
+            log.info("barge_in", "🛑 Barge-in detected (VAD)")
+            await self._interrupt()
+            return
+        if not self._sender or not self._sender.pause():
+            return
+        vad_stats.barge_ins += 1
+        await self.telephony_ws.send_text(self.provider.format_clear_message(self.stream_sid))
+        log.info("barge_in_hold", "⏸️ Possible barge-in (VAD), playback held")
+        self._barge_in_hold = asyncio.get_running_loop().call_later(
+            VAD_CONFIRM_MS / 1000, self._release_barge_in_hold,
+        )
+
+    def _release_barge_in_hold(self):
+        """No transcript followed the VAD onset (cough, noise, echo): resume playback."""
+        self._barge_in_hold = None
+        vad_stats.false_alarms += 1
+        log.info("barge_in_false_alarm", "▶️ VAD false alarm, resuming playback")
+        if self._sender:
+            self._sender.resume()
+
+    def _confirm_barge_in(self):
+        """A transcript or new turn followed the VAD onset, so the hold was a real barge-in."""
+        if self._barge_in_hold is not None:
+            self._barge_in_hold.cancel()
+            self._barge_in_hold = None
+            vad_stats.confirmed += 1
 
     async def _interrupt(self):
         """Cancel the active response and flush the telephony audio buffer."""
+        self._confirm_barge_in()
         # Cancel the running LLM/TTS task
         if self._current_response_task and not self._current_response_task.done():
             self._current_response_task.cancel()
-            print("🛑 Cancelled active response task")
+            log.info("response_cancelled", "🛑 Cancelled active response task")
+
+        await self._stop_playback()
+        self._is_responding = False
+        self._current_response_task = None
+
+    async def _stop_playback(self):
+        """Stop pacing frames out, remember how far the caller got and flush the provider's buffer."""
+        if self._sender:
+            heard_ms = self._sender.stop()
+            log.info("response_cancelled", f"🛑 Caller heard {heard_ms} ms of {self._sender.queued_ms} ms")
 
         # Tell the telephony provider to stop playing audio
         if self.stream_sid and self.telephony_ws:
             clear_msg = self.provider.format_clear_message(self.stream_sid)
             await self.telephony_ws.send_text(clear_msg)
-            print(f"🛑 [{self.provider.name}] Audio buffer cleared")
-
-        self._is_responding = False
-        self._current_response_task = None
+            log.info("playback_cleared", f"🛑 [{self.provider.name}] Audio buffer cleared")
+
+    def _turn_text(self, interim: str = "") -> str:
+        """Full text of the turn in progress, including any unanswered earlier text."""
+        return " ".join(filter(None, (self._unanswered_text, self._turns.text_with(interim))))
+
+    def _on_turn(self, text: str):
+        """TurnAssembler callback: exactly one response per completed user turn."""
+        if self._unanswered_text:
+            text = f"{self._unanswered_text} {text}"
+            self._unanswered_text = ""
+        log.info("user_turn", f"🎤 User: {text}")
+        self._turn_count += 1
+        trace = TurnTrace(self._turn_count)
+        if self._speech_end_at is not None:
+            trace.mark("audio_last", self._speech_end_at)
+        if self._turns.proposed_at is not None:
+            trace.mark("stt_proposed", self._turns.proposed_at)
+        trace.mark("transcript_final")
+
+        speculation = self._speculator.claim(text) if self._speculator else None
+        # Single flight: the new turn supersedes any response still in progress
+        previous = self._current_response_task
+        self._current_response_task = asyncio.create_task(
+            self._respond(text, speculation, previous, trace)
+        )
+
+    def _finish_trace(self, outcome: str = None):
+        """Close the current turn's trace and feed it to the histograms / call summary."""
+        trace, self._trace = self._trace, None
+        if trace is None:
+            return
+        trace.outcome = outcome or trace.outcome
+        metrics.observe_turn(trace)
+        self._call_summary.add(trace)
+        # Answer latency (independent of any filler) drives the next filler decision
+        if self.fillers and "transcript_final" in trace.marks and "tts_first_byte" in trace.marks:
+            self.fillers.observe(1000 * (trace.marks["tts_first_byte"] - trace.marks["transcript_final"]))
+        if self.faq and "llm_first_token" in trace.marks:
+            self.faq.observe_llm(1000 * (trace.marks["llm_first_token"] - trace.marks["llm_request"]))
+
+    @staticmethod
+    def _budget_start(trace: TurnTrace):
+        """
+        The silence budget runs from the end of the caller's speech, less the
+        endpointing hold: waiting out a pause on purpose isn't lateness, so it
+        must not shrink the LLM / TTS shares or count as an STT overrun.
+        """
+        marks = trace.marks
+        if "audio_last" not in marks:
+            return marks.get("transcript_final")
+        hold = marks["transcript_final"] - marks["stt_proposed"] if "stt_proposed" in marks else 0.0
+        return marks["audio_last"] + hold
+
+    async def _respond(self, user_text: str, speculation=None, previous=None, trace=None):
+        """Streams the LLM response, speaking each sentence as soon as it is complete."""
+        if previous is not None and not previous.done():
+            previous.cancel()
+            await asyncio.gather(previous, return_exceptions=True)
+            # Its sender keeps pacing queued frames out: stop it and flush the provider's
+            # buffer, or the old answer interleaves with this one
+            await self._stop_playback()
+            # The superseded response may have left its question unanswered
+            if self._unanswered_text:
+                user_text = f"{self._unanswered_text} {user_text}"
+                self._unanswered_text = ""
+                if speculation is not None:
+                    self._speculator.reject(speculation)
+                    speculation = None
+        self._confirm_barge_in()
+        self._finish_trace("superseded")
+        self._trace = trace or TurnTrace(self._turn_count)
 
-    async def _respond(self, user_text: str):
-        """Gets LLM response and synthesizes speech back to the caller."""
         self._is_responding = True
+        trace = self._trace
+        self._deadline = TurnDeadline(TURN_BUDGET_MS, self._budget_start(trace))
+        if not self._deadline.finish("stt"):
+            log.warning("deadline_overrun", f"⏱️ STT finalization used more than its share of the {TURN_BUDGET_MS} ms budget")
+        self._sender = AudioSender(
+            self.provider,
+            self.telephony_ws,
+            self.stream_sid,
+            on_first_frame=lambda: trace.mark("audio_first_sent"),
+        )
+        self._segment_marks = []
+        self._filler_ms = 0
+        # Common questions are answered from the local FAQ index, without Groq
+        match = self.faq.lookup(user_text) if self.faq else None
+        if match is not None and speculation is not None:
+            self._speculator.reject(speculation)
+            speculation = None
+        # LLM → TTS hand-off; None marks the end of the response
+        segments = asyncio.Queue()
+        if match is not None:
+            llm_task = asyncio.create_task(self._answer_from_faq(user_text, match, segments))
+        else:
+            llm_task = asyncio.create_task(self._stream_llm(user_text, segments, speculation))
+        tts_task = asyncio.create_task(self._speak_segments(segments, self._sender))
+        filler_task = asyncio.create_task(self._play_filler(self._sender, trace)) if self.fillers else None
         try:
-            self.conversation_history.append({"role": "user", "content": user_text})
-
-            chat_completion = await self.groq_client.chat.completions.create(
-                messages=self.conversation_history,
-                model="llama-3.1-8b-instant",
-                temperature=0.7,
-                max_tokens=150,
-            )
-
-            ai_text = chat_completion.choices[0].message.content
-            print(f"🤖 AI: {ai_text}")
-
-            self.conversation_history.append({"role": "assistant", "content": ai_text})
-
-            await self._synthesize_and_send(ai_text)
+            await asyncio.gather(llm_task, tts_task)
 
         except asyncio.CancelledError:
-            print("🛑 Response was interrupted by user")
+            log.info("response_interrupted", "🛑 Response was interrupted by user")
             self._is_responding = False
+            for task in (llm_task, tts_task):
+                task.cancel()
+            await asyncio.gather(llm_task, tts_task, return_exceptions=True)
+            self._trim_history_to_heard()
+            self._finish_trace("interrupted")
         except Exception as e:
-            print(f"❌ Response error: {e}")
+            log.error("response_error", f"❌ Response error: {e}")
             self._is_responding = False
+            self._finish_trace("error")
+        finally:
+            # Barge-in cancels this task; make sure neither stage keeps running
+            for task in (llm_task, tts_task, filler_task):
+                if task and not task.done():
+                    task.cancel()
         # NOTE: do NOT set _is_responding = False here on success.
         # It stays True until the telephony provider sends back a "mark"
         # event confirming playback is done (see _handle_telephony_messages).
 
-    async def _synthesize_and_send(self, text: str):
-        """Calls Deepgram TTS REST API and sends audio back via the telephony provider."""
+    async def _stream_llm(self, user_text: str, segments: asyncio.Queue, speculation=None):
+        """Streams the Groq completion and pushes sentence-sized segments onto the queue."""
+        trace = self._trace
+        deadline = self._deadline
+        messages = self._messages_for(user_text)
+        deltas = None
+        if speculation is not None:
+            speculation = self._speculator.adopt(speculation)
+            if speculation is None:
+                log.info("speculation_stale", "🔄 Speculation discarded: the history changed after it started")
+        if speculation is not None:
+            # The request already went out on the stable interim transcript
+            log.info("speculation_hit", f"⚡ Speculation hit ({len(speculation.deltas)} tokens ready)")
+            trace.mark("llm_request", speculation.started_at)
+            if speculation.first_delta_at is not None:
+                trace.mark("llm_first_token", speculation.first_delta_at)
+            deltas = speculation.stream()
+        elif breakers["groq"].allow():
+            route = self._route(user_text)
+            hedge = f", hedge → {route.hedge_model} after {route.hedge_after_ms:.0f} ms" if route.hedge_model else ""
+            log.info("llm_route", f"🧭 LLM: {route.model} ({route.reason}{hedge})")
+            trace.mark("llm_request")
+            deltas = self._groq_deltas(messages, route)
+        self.history.append("user", user_text)
+        trace.prompt_tokens = self.history.turn_prompt_tokens[-1]
+        log.debug("llm_prompt", f"📏 Prompt: {trace.prompt_tokens} tokens")
+
+        segmenter = SentenceSegmenter()
+        parts = []
+        try:
+            deltas = await self._first_delta_within(deltas, deadline.stage_ms("llm"))
+            if deltas is None and breakers["groq"].allow():
+                # Cascade: a short answer from the fast model, in what is left of the LLM's share
+                deadline.overrun("llm", "short_llm")
+                trace.outcome = "degraded"
+                log.warning("deadline_overrun", f"⏱️ LLM missed its deadline, retrying on {llm_router.fallback} (max {DEGRADED_MAX_TOKENS} tokens)")
+                trace.mark("llm_request")
+                deltas = await self._first_delta_within(
+                    self._groq_deltas(messages, Route(llm_router.fallback, "deadline"), max_tokens=DEGRADED_MAX_TOKENS),
+                    deadline.stage_ms("llm"),
+                )
+            if deltas is None:
+                deadline.overrun("llm", "apology")
+                if self._play_apology(self._sender):
+                    parts.append(self.persona.apology)
+                return
+            deadline.finish("llm")
+
+            async with aclosing(deltas):
+                async for delta in deltas:
+                    trace.mark("llm_first_token")
+                    parts.append(delta)
+                    for segment in segmenter.feed(delta):
+                        segments.put_nowait(segment)
+
+            for segment in segmenter.flush():
+                segments.put_nowait(segment)
+            trace.mark("llm_done")
+        finally:
+            if speculation is not None and not speculation.task.done():
+                speculation.task.cancel()
+            # Keep whatever was generated (even if interrupted) so the history stays coherent
+            ai_text = "".join(parts).strip()
+            if ai_text:
+                log.info("assistant_turn", f"🤖 AI: {ai_text}")
+                self.history.append("assistant", ai_text)
+            segments.put_nowait(None)
+
+    async def _answer_from_faq(self, user_text: str, match: FAQMatch, segments: asyncio.Queue):
+        """Speaks a curated answer; one segment, so its audio is a single (pre-cached) TTS entry."""
+        saved_ms = max(self.faq.llm_first_token_ms - match.lookup_ms, 0.0)
+        log.info("faq_hit", f"📚 FAQ hit ({match.score:.2f} ~ \"{match.question}\", {match.lookup_ms:.2f} ms, ~{saved_ms:.0f} ms saved)")
+        self._trace.mark("faq_answer")
+        self.history.append("user", user_text)
+        log.info("assistant_turn", f"🤖 AI: {match.answer}")
+        self.history.append("assistant", match.answer)
+        segments.put_nowait(match.answer)
+        segments.put_nowait(None)
+
+    async def _groq_deltas(self, messages: list, route: Route, **overrides):
+        """Yields content deltas from a streaming Groq completion (hedged per the route)."""
+        deltas = llm_router.stream(self.groq_client, messages, {**self._llm_params, **overrides}, route)
+        async with aclosing(deltas):
+            async for delta in deltas:
+                yield delta
+
+    async def _first_delta_within(self, deltas, timeout_ms: float):
+        """Waits up to timeout_ms for the first delta; returns a stream that starts with it, or None."""
+        if deltas is None:
+            return None
+        try:
+            first = await asyncio.wait_for(anext(deltas), timeout_ms / 1000)
+        except StopAsyncIteration:
+            breakers["groq"].success()
+            return deltas
+        except asyncio.CancelledError:
+            await deltas.aclose()
+            raise
+        except Exception as e:
+            await deltas.aclose()
+            breakers["groq"].failure()
+            reason = f"no first token in {timeout_ms:.0f} ms" if isinstance(e, asyncio.TimeoutError) else e
+            log.error("llm_error", f"❌ LLM error ({reason})")
+            return None
+        breakers["groq"].success()
+        return _prepend(first, deltas)
+
+    async def _play_greeting(self):
+        """The persona's pre-synthesized greeting, as soon as the stream starts (interruptible)."""
+        greeting = self.persona.greeting
+        self._is_responding = True
+        self._sender = AudioSender(self.provider, self.telephony_ws, self.stream_sid)
+        self._sender.write(self.persona.greeting_audio)
+        self._segment_marks = [(greeting, self._sender.queued_ms)]
+        self._filler_ms = 0
+        self.history.append("assistant", greeting)
+        log.info("greeting", f"👋 Greeting: {greeting}")
         try:
-            response = await self.http_client.post(
-                DEEPGRAM_TTS_URL,
+            await self._sender.finish()
+            await self._send_playback_mark("greeting")
+        except asyncio.CancelledError:
+            self._is_responding = False
+            self._trim_history_to_heard()
+            raise
+
+    async def _send_playback_mark(self, name: str):
+        """Ask the provider to echo `name` once this response's audio has played (one name per response)."""
+        self._playback_mark = name
+        await self.telephony_ws.send_text(self.provider.format_mark_message(self.stream_sid, name))
+
+    def _play_apology(self, sender: AudioSender) -> bool:
+        """Last step of the deadline cascade: the canned apology clip instead of silence."""
+        self._trace.outcome = "degraded"
+        if not self.apology:
+            return False
+        log.warning("apology", "🙏 Out of time for this turn, playing the apology clip")
+        sender.write(self.apology)
+        self._segment_marks.append((self.persona.apology, sender.queued_ms))
+        self._trace.mark("apology_sent")
+        return True
+
+    def _route(self, user_text: str) -> Route:
+        """A persona with a fixed model always gets it; otherwise llm_router decides per turn."""
+        if self.persona.llm_model:
+            return Route(self.persona.llm_model, "persona")
+        return llm_router.choose(user_text, LLM_FIRST_TOKEN_BUDGET_MS)
+
+    def _messages_for(self, user_text: str) -> list:
+        """The message list Groq sees for a new user turn."""
+        return self.history.messages(pending_user=user_text)
+
+    async def _play_filler(self, sender: AudioSender, trace: TurnTrace):
+        """If the answer is predicted to be slow and hasn't started in time, say a filler first."""
+        delay = self.fillers.delay()
+        if delay is None:
+            return
+        await asyncio.sleep(delay)
+        if sender.queued_ms:
+            self.fillers.not_needed += 1
+            return
+        started = trace.marks.get("transcript_final", trace.marks.get("llm_request"))
+        elapsed_ms = 1000 * (time.monotonic() - started) if started else self.fillers.threshold_ms
+        filler = self.fillers.pick(elapsed_ms)
+        # Frame-aligned, so the answer's first frame follows without a gap
+        sender.lead_in_ms = filler.duration_ms
+        sender.write(filler.audio)
+        self._filler_ms = filler.duration_ms
+        trace.mark("filler_sent")
+        log.info("filler", f"💬 Filler: {filler.text}")
+
+    async def _speak_segments(self, segments: asyncio.Queue, sender: AudioSender):
+        """Synthesizes queued segments in order while the LLM keeps generating."""
+        trace = self._trace
+        deadline = self._deadline
+        cut = False
+        while True:
+            segment = await segments.get()
+            if segment is None:
+                break
+            if cut:
+                continue
+            if self._segment_marks:
+                # Later sentences only have to start before the audio already queued runs out
+                timeout_ms = sender.queued_ms - sender.sent_ms + deadline.min_stage_ms
+            else:
+                timeout_ms = deadline.stage_ms("tts")
+            if await self._synthesize_and_send(segment, sender, trace, timeout_ms):
+                self._segment_marks.append((segment, sender.queued_ms))
+            elif self._segment_marks or deadline.remaining_ms() <= 0:
+                # No gap mid-answer: stop after the sentences already queued (or apologize if none)
+                deadline.overrun("tts", "truncated" if self._segment_marks else "apology")
+                cut = True
+
+        if cut or not self._segment_marks:
+            if not self._segment_marks and self._play_apology(sender):
+                cut = True
+            if cut and self.history.last and self.history.last["role"] == "assistant":
+                # The caller only hears what was spoken, so that is what the history keeps
+                self.history.set_last_content(" ".join(text for text, _ in self._segment_marks))
+
+        if not self._segment_marks:
+            self._is_responding = False
+            self._finish_trace("no_audio")
+            return
+
+        await sender.finish()
+
+        # Send a mark so the provider tells us when playback finishes
+        await self._send_playback_mark(f"response_end:{trace.turn}")
+        log.info("response_sent", f"🔊 [{self.provider.name}] {sender.sent_ms} ms of audio sent (waiting for playback mark)")
+
+    async def _synthesize_and_send(self, text: str, sender: AudioSender, trace: TurnTrace, timeout_ms: float = None) -> bool:
+        """Streams Deepgram TTS audio for one segment into the paced frame sender.
+
+        timeout_ms bounds the wait for the first audio byte; the rest streams at its own pace.
+        """
+        trace.mark("tts_request")
+        cache_key = None
+        if self.tts_cache:
+            cache_key = TTSCache.key(text, self._tts_voice, TTS_ENCODING, TTS_SAMPLE_RATE)
+            cached = await self.tts_cache.get(cache_key)
+            if cached is not None:
+                # Cache hit: skip Deepgram entirely and go straight to frame output
+                trace.mark("tts_first_byte")
+                sender.write(cached)
+                return True
+
+        breaker = breakers["deepgram_tts"]
+        if not breaker.allow():
+            return False
+        try:
+            async with asyncio.timeout(timeout_ms / 1000 if timeout_ms else None) as first_byte, self.http_client.stream(
+                "POST",
+                self._tts_url,
                 headers={
                     "Authorization": f"Token {self.deepgram_api_key}",
                     "Content-Type": "application/json",
                 },
                 json={"text": text},
-            )
-
-            if response.status_code != 200:
-                print(f"❌ Deepgram TTS error ({response.status_code}): {response.text}")
-                return
-
-            encoded_audio = base64.b64encode(response.content).decode("utf-8")
-
-            # Use provider to format the audio response
-            media_message = self.provider.format_audio_response(self.stream_sid, encoded_audio)
-            await self.telephony_ws.send_text(media_message)
-
-            # Send a mark so the provider tells us when playback finishes
-            mark_message = self.provider.format_mark_message(self.stream_sid, "response_end")
-            await self.telephony_ws.send_text(mark_message)
-            print(f"🔊 [{self.provider.name}] Audio sent to caller (waiting for playback mark)")
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    log.error("tts_error", f"❌ Deepgram TTS error ({response.status_code}): {body.decode(errors='replace')}")
+                    if response.status_code >= 500 or response.status_code == 429:
+                        breaker.failure()
+                    return False
+
+                # Playback starts with the first bytes; frames are paced by the sender
+                transcoder = PCMToTelephony(TTS_SAMPLE_RATE) if TTS_ENCODING != "mulaw" else None
+                chunks = []
+                async for chunk in response.aiter_bytes():
+                    if not chunks:
+                        first_byte.reschedule(None)
+                        breaker.success()
+                    trace.mark("tts_first_byte")
+                    if transcoder:
+                        chunk = transcoder.feed(chunk)
+                    sender.write(chunk)
+                    chunks.append(chunk)
+
+            # Only complete (uninterrupted) audio makes it into the cache
+            if cache_key:
+                await self.tts_cache.put(cache_key, b"".join(chunks))
+            return True
 
+        except asyncio.CancelledError:
+            raise
+        except TimeoutError:
+            breaker.failure()
+            log.error("tts_error", f"❌ TTS: no audio within {timeout_ms:.0f} ms")
+            return False
         except Exception as e:
-            print(f"❌ TTS/Send error: {e}")
-            self._is_responding = False
+            breaker.failure()
+            log.error("tts_error", f"❌ TTS/Send error: {e}")
+            return False
+
+    def _trim_history_to_heard(self):
+        """After a barge-in, keep only the part of the answer the caller actually heard."""
+        last = self.history.last
+        if last is None:
+            return
+        if last["role"] == "user":
+            # Cut off before any answer: merge this text into the caller's next turn
+            self._unanswered_text = self.history.pop()["content"]
+            return
+
+        heard_ms = self._sender.played_ms if self._sender else 0
+        heard = []
+        previous_end = self._filler_ms
+        for segment, end_ms in self._segment_marks:
+            if end_ms <= heard_ms:
+                heard.append(segment)
+            else:
+                # Partially heard segment: keep the proportional share of its words
+                words = segment.split()
+                fraction = (heard_ms - previous_end) / max(end_ms - previous_end, 1)
+                keep = int(len(words) * max(fraction, 0))
+                if keep:
+                    heard.append(" ".join(words[:keep]) + "—")
+                break
+            previous_end = end_ms
+
+        if heard:
+            self.history.set_last_content(" ".join(heard))
+        else:
+            self.history.pop()
+            # (a greeting has no user turn before it)
+            if self.history.last and self.history.last["role"] == "user":
+                self._unanswered_text = self.history.pop()["content"]
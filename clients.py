@@ -0,0 +1,164 @@
+"""
+Process-wide HTTP / Groq client pool.
+Owned by the FastAPI app and borrowed by every VoiceBot, so calls reuse warm
+keep-alive connections to Deepgram TTS and Groq instead of paying a fresh
+TLS handshake on their first turn.
+"""
+
+import os
+import time
+import asyncio
+import httpx
+from groq import AsyncGroq
+
+from log import get_logger
+from recorder import RecordingTransport
+
+log = get_logger("clients")
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+
+# Origins we keep warm connections to (follow the same overrides as the bot / Groq SDK)
+DEEPGRAM_ORIGIN = _origin(os.getenv("DEEPGRAM_TTS_URL") or "https://api.deepgram.com")
+GROQ_ORIGIN = _origin(os.getenv("GROQ_BASE_URL") or "https://api.groq.com")
+
+
+class ClientPool:
+    """Shared httpx + AsyncGroq clients with connection reuse statistics."""
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 30.0,
+    ):
+        self.keepalive_expiry = keepalive_expiry
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        hooks = {"request": [self._on_request]}
+
+        # Deepgram TTS (and anything else plain HTTP); the recording wrapper only
+        # copies traffic for calls that are being recorded (RECORD_DIR)
+        self.http = httpx.AsyncClient(
+            timeout=timeout, event_hooks=hooks,
+            transport=RecordingTransport(httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_AVAILABLE)),
+        )
+        # Groq gets its own pool so a burst of TTS requests can't starve the LLM
+        self._groq_http = httpx.AsyncClient(
+            timeout=timeout, event_hooks=hooks,
+            transport=RecordingTransport(httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_AVAILABLE)),
+        )
+        self.groq = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=self._groq_http)
+
+        self._refresh_task = None
+
+        # Stats
+        self.requests = 0
+        self.new_connections = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def start(self):
+        """Open warm connections and keep them alive until close()."""
+        await self.warm()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        await self.http.aclose()
+        await self._groq_http.aclose()
+
+    async def warm(self):
+        """Establish (or refresh) a keep-alive connection to each upstream."""
+        results = await asyncio.gather(
+            self.http.head(DEEPGRAM_ORIGIN),
+            self._groq_http.head(GROQ_ORIGIN),
+            return_exceptions=True,
+        )
+        for origin, result in zip((DEEPGRAM_ORIGIN, GROQ_ORIGIN), results):
+            if isinstance(result, Exception):
+                log.warning("warm_failed", f"⚠️ Could not warm connection to {origin}: {result}")
+
+    async def prime_sdk(self):
+        """Make the Groq SDK's first request before a call does (it builds its resources and
+        request models then, ~60 ms). Listing models is documented, free and side-effect-free."""
+        try:
+            await self.groq.models.list()
+        except Exception as e:
+            log.warning("warm_failed", f"⚠️ Could not prime the Groq SDK: {e}")
+
+    def stats(self) -> dict:
+        reused = self.requests - self.new_connections
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "open_connections": _open_connections(self.http) + _open_connections(self._groq_http),
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+            "wait_time_avg_ms": round(1000 * self.wait_time_total / self.requests, 3) if self.requests else 0.0,
+            "wait_time_max_ms": round(1000 * self.wait_time_max, 3),
+        }
+
+    async def _refresh_loop(self):
+        # Touch each upstream before the idle connections expire
+        while True:
+            await asyncio.sleep(self.keepalive_expiry / 2)
+            await self.warm()
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = _ConnectionTrace(self, time.perf_counter())
+
+
+class _ConnectionTrace:
+    """httpcore trace callback: detects new connections and time spent waiting for one."""
+
+    def __init__(self, pool: ClientPool, started: float):
+        self.pool = pool
+        self.started = started
+        self.connect_started = None
+        self.connect_done = None
+
+    async def __call__(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.started":
+            self.pool.new_connections += 1
+            self.connect_started = time.perf_counter()
+        elif event_name == "connection.connect_tcp.complete":
+            self.connect_done = time.perf_counter()
+        elif event_name == "connection.start_tls.complete":
+            self.connect_done = time.perf_counter()
+        elif event_name.endswith("send_request_headers.started"):
+            now = time.perf_counter()
+            connect_time = 0.0
+            if self.connect_started is not None and self.connect_done is not None:
+                connect_time = self.connect_done - self.connect_started
+            # Time spent queued for a free connection (handshakes excluded)
+            wait = max(now - self.started - connect_time, 0.0)
+            self.pool.wait_time_total += wait
+            self.pool.wait_time_max = max(self.pool.wait_time_max, wait)
+
+
+def _open_connections(client: httpx.AsyncClient) -> int:
+    transport = getattr(client, "_transport", None)
+    # Unwrap the RecordingTransport to reach httpcore's pool
+    transport = getattr(transport, "_transport", transport)
+    pool = getattr(transport, "_pool", None)
+    try:
+        return len(pool.connections)
+    except AttributeError:
+        return 0
@@ -0,0 +1,139 @@
+"""
+Per-turn latency budget and per-upstream circuit breakers.
+A TurnDeadline starts when the caller stops speaking and is split across
+the stages that stand between them and the first answer audio: STT
+finalization, the LLM's first token and TTS's first byte. Each stage gets
+its share of whatever budget is left, so a slow stage shrinks the stages
+after it instead of the turn simply running long; the bot cascades to
+cheaper fallbacks when a stage overruns. Circuit breakers remember that an
+upstream is failing, so calls skip it immediately instead of each waiting
+out its own timeout.
+"""
+
+import time
+from typing import Optional
+
+from log import get_logger
+
+log = get_logger("deadline")
+
+# Stage → relative share of the budget, in pipeline order
+STAGE_SHARES = {"stt": 0.2, "llm": 0.5, "tts": 0.3}
+
+
+class TurnDeadline:
+    """Silence budget for one turn: speech end → first answer audio."""
+
+    def __init__(
+        self,
+        budget_ms: float,
+        started_at: Optional[float] = None,
+        shares: dict = STAGE_SHARES,
+        min_stage_ms: float = 250.0,
+    ):
+        self.budget_ms = budget_ms
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.shares = shares
+        # Even an exhausted budget leaves each stage this long (a fast upstream still makes it)
+        self.min_stage_ms = min_stage_ms
+        self._done = set()
+        # Stages that ran past their share, and the fallbacks taken instead
+        self.overruns = []
+        self.fallbacks = []
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - (time.monotonic() - self.started_at) * 1000
+
+    def stage_ms(self, stage: str) -> float:
+        """This stage's share of the remaining budget (shared with the stages still ahead)."""
+        ahead = sum(share for name, share in self.shares.items() if name not in self._done)
+        share = self.shares[stage] / ahead if ahead else 1.0
+        return max(self.remaining_ms() * share, self.min_stage_ms)
+
+    def finish(self, stage: str) -> bool:
+        """Mark a stage done; False (recorded as an overrun) if the turn is past this stage's cumulative share."""
+        self._done.add(stage)
+        stages = list(self.shares)
+        allowed = sum(self.shares[name] for name in stages[:stages.index(stage) + 1])
+        if (time.monotonic() - self.started_at) * 1000 > self.budget_ms * allowed / sum(self.shares.values()):
+            self.overruns.append(stage)
+            return False
+        return True
+
+    def overrun(self, stage: str, fallback: str):
+        """Record that a stage missed its deadline and which fallback replaced it."""
+        self._done.add(stage)
+        self.overruns.append(stage)
+        self.fallbacks.append(fallback)
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures; one trial request (half-open) after a cool-down."""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_after_s: float = 15.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+        # Stats
+        self.opens = 0
+        self.skipped = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether to call the upstream now (False = go straight to the fallback)."""
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.reset_after_s):
+            # Let one request at a time probe whether the upstream recovered
+            # (a probe that never reports back, e.g. after a barge-in, expires)
+            self._trial_at = now
+            return True
+        self.skipped += 1
+        return False
+
+    def success(self):
+        if self.opened_at is not None:
+            log.info("circuit_closed", f"✅ {self.name} recovered, circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.opened_at is not None:
+            # The half-open probe failed: stay open for another cool-down
+            self.opened_at = time.monotonic()
+            self._trial_at = None
+        elif self.failures >= self.failure_threshold:
+            log.warning("circuit_open", f"⚡ {self.name} failing ({self.failures} in a row), circuit open for {self.reset_after_s:.0f} s")
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "open": self.state != "closed",
+            "failures": self.failures,
+            "opens": self.opens,
+            "skipped": self.skipped,
+        }
+
+
+# One breaker per upstream, shared by every call in the process
+breakers = {
+    "groq": CircuitBreaker("groq"),
+    "deepgram_tts": CircuitBreaker("deepgram_tts"),
+}
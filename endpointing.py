@@ -0,0 +1,175 @@
+"""
+Adaptive end-of-turn detection.
+A fixed endpointing silence is wrong for most callers: fast talkers wait on
+it after every question, slow talkers get cut off mid-thought (and the
+response started for the fragment is thrown away). Deepgram runs with a
+short endpointing (STT_ENDPOINTING_MS) so speech_final and UtteranceEnd only
+propose the end of a turn; this per-call predictor decides how much silence
+to wait for before the turn is closed:
+
+- the caller's own pauses: gaps inside their turns, and pauses that were
+  mistaken for the end of a turn, are collected and the hold is their p90
+  plus a margin;
+- transcript cues: a question mark shortens the hold, a trailing comma,
+  conjunction or filler ("and", "because", "um") lengthens it;
+- local silence: the hold counts from the last voiced inbound frame (VAD),
+  so STT's own latency isn't waited out on top of it.
+
+Deepgram only takes endpointing when the socket opens, and the session is
+pre-warmed before the caller has said a word, so the per-session tuning
+happens here rather than in the STT URL.
+"""
+
+import re
+import time
+from collections import deque
+from typing import Optional
+
+# Words a finished sentence rarely ends on: the caller is probably still going
+TRAILING_WORDS = frozenset({
+    "and", "but", "or", "so", "because", "cause", "if", "then", "that", "which", "when",
+    "like", "with", "to", "of", "for", "the", "a", "an", "my", "your", "his", "her", "i",
+    "um", "uh", "uhm", "er", "hmm",
+})
+_LAST_WORD = re.compile(r"([a-z']+)\W*$")
+
+
+class EndpointingStats:
+    """Process-wide end-of-turn decisions, compared against the fixed endpointing."""
+
+    def __init__(self):
+        self.turns = 0
+        self.false_cutoffs = 0
+        self.hold_ms_total = 0.0
+        # Turns where local silence was measured (VAD saw the caller speak)
+        self.measured = 0
+        self.waited_ms_total = 0.0
+        self.saved_ms_total = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "false_cutoffs": self.false_cutoffs,
+            "false_cutoff_rate": round(self.false_cutoffs / self.turns, 4) if self.turns else 0.0,
+            "hold_avg_ms": round(self.hold_ms_total / self.turns, 1) if self.turns else 0.0,
+            "silence_waited_avg_ms": round(self.waited_ms_total / self.measured, 1) if self.measured else 0.0,
+            # vs. a fixed endpointing of FIXED_ENDPOINTING_MS plus the debounce (negative = waited longer)
+            "latency_saved_avg_ms": round(self.saved_ms_total / self.measured, 1) if self.measured else 0.0,
+        }
+
+
+endpointing_stats = EndpointingStats()
+
+
+class EndOfTurnPredictor:
+    """Per-call silence hold, learned from the caller's pauses and adjusted by transcript cues."""
+
+    def __init__(
+        self,
+        initial_hold_ms: float = 400.0,
+        min_hold_ms: float = 200.0,
+        max_hold_ms: float = 1500.0,
+        margin_ms: float = 100.0,
+        min_pause_ms: float = 100.0,
+        cutoff_window_ms: float = 1500.0,
+        fixed_extra_ms: float = 300.0,
+        stt_silence_ms: float = 0.0,
+        window: int = 50,
+        min_samples: int = 3,
+    ):
+        # Until the caller has paused min_samples times, wait initial_hold_ms
+        self.initial_hold_ms = initial_hold_ms
+        self.min_hold_ms = min_hold_ms
+        self.max_hold_ms = max_hold_ms
+        self.margin_ms = margin_ms
+        # Shorter gaps between voiced frames are just the gaps between words
+        self.min_pause_ms = min_pause_ms
+        # Speech resuming this soon after a turn was closed means it was closed too early
+        self.cutoff_window_ms = cutoff_window_ms
+        # How much longer than the first end-of-turn proposal the fixed settings would have
+        # waited (their extra endpointing plus the debounce), for the latency-saved stat
+        self.fixed_extra_ms = fixed_extra_ms
+        # Silence STT itself waits before proposing an end of turn (its endpointing)
+        self.stt_silence_ms = stt_silence_ms
+        self.min_samples = min_samples
+        self._pauses = deque(maxlen=window)
+        self._last_voiced_at = None
+        self._ended_at = None
+        self._proposed_silence_ms = None
+        self._proposed_at = None
+        self._hold_ms = None
+
+        # Stats (this call)
+        self.turns = 0
+        self.false_cutoffs = 0
+
+    def on_audio(self, voiced: bool, now: Optional[float] = None):
+        """Feed the VAD decision for each inbound frame."""
+        if not voiced:
+            return
+        now = time.monotonic() if now is None else now
+        if self._last_voiced_at is not None:
+            gap_ms = (now - self._last_voiced_at) * 1000
+            if gap_ms >= self.min_pause_ms:
+                if self._ended_at is None:
+                    # Paused and went on: a pause inside a turn
+                    self._pauses.append(gap_ms)
+                elif (now - self._ended_at) * 1000 <= self.cutoff_window_ms:
+                    # Went on right after the turn was closed: that pause wasn't the end
+                    self.false_cutoffs += 1
+                    endpointing_stats.false_cutoffs += 1
+                    self._pauses.append(gap_ms)
+                self._ended_at = None
+        self._last_voiced_at = now
+
+    def hold_ms(self, text: str) -> float:
+        """Silence to wait for after `text` before the turn is over."""
+        if len(self._pauses) >= self.min_samples:
+            pauses = sorted(self._pauses)
+            hold = pauses[min(int(0.9 * len(pauses)), len(pauses) - 1)] + self.margin_ms
+        else:
+            hold = self.initial_hold_ms
+        text = text.rstrip()
+        last_word = _LAST_WORD.search(text.lower())
+        if text.endswith("?"):
+            hold *= 0.6
+        elif text.endswith(",") or (last_word and last_word.group(1) in TRAILING_WORDS):
+            hold = max(hold * 2, 1000.0)
+        return min(max(hold, self.min_hold_ms), self.max_hold_ms)
+
+    def end_delay_ms(self, text: str) -> float:
+        """STT proposed the end of the turn: how much longer to wait (0 = close it now)."""
+        now = time.monotonic()
+        silence_ms = self._silence_ms(now)
+        if self._proposed_at is None:
+            self._proposed_at = now
+            self._proposed_silence_ms = silence_ms
+        self._hold_ms = self.hold_ms(text)
+        if silence_ms is None:
+            # No voiced frames seen (VAD can't tell speech here): count from the first proposal
+            silence_ms = self.stt_silence_ms + (now - self._proposed_at) * 1000
+        return max(self._hold_ms - silence_ms, 0.0)
+
+    def proposal_withdrawn(self):
+        """The caller kept talking after an end-of-turn proposal."""
+        self._proposed_at = None
+        self._proposed_silence_ms = None
+
+    def turn_ended(self):
+        now = time.monotonic()
+        self._ended_at = now
+        self.turns += 1
+        endpointing_stats.turns += 1
+        endpointing_stats.hold_ms_total += self._hold_ms or 0.0
+        silence_ms = self._silence_ms(now)
+        if silence_ms is not None and self._proposed_silence_ms is not None:
+            endpointing_stats.measured += 1
+            endpointing_stats.waited_ms_total += silence_ms
+            endpointing_stats.saved_ms_total += self._proposed_silence_ms + self.fixed_extra_ms - silence_ms
+        self._proposed_at = None
+        self._proposed_silence_ms = None
+
+    def _silence_ms(self, now: float) -> Optional[float]:
+        if self._last_voiced_at is None:
+            return None
+        return (now - self._last_voiced_at) * 1000
@@ -0,0 +1,147 @@
+"""
+Local FAQ answers for the questions recruiters ask most.
+Curated (phrasings, answer) pairs are indexed as TF-IDF vectors over word
+unigrams, word bigrams and character trigrams (the trigrams keep small ASR
+slips matching). A turn whose cosine similarity to a phrasing clears the
+threshold is answered locally — a sub-millisecond lookup instead of a Groq
+round trip, with the answer audio usually already in the TTS cache.
+"""
+
+import re
+import math
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+
+_WORD = re.compile(r"[a-z0-9']+")
+_CONTRACTIONS = {"what's": "what is", "where's": "where is", "who's": "who is", "he's": "he is", "how's": "how is"}
+
+# Feature weights: whole words and word pairs carry the intent, trigrams only smooth over typos
+_BIGRAM_WEIGHT = 1.0
+_TRIGRAM_WEIGHT = 0.3
+# Words the curated phrasings never use ("Google", "salary") usually mean a
+# different question, so they count double against the match
+_UNKNOWN_WEIGHT = 2.0
+
+
+def _features(text: str) -> dict:
+    words = []
+    for word in _WORD.findall(text.lower()):
+        words.extend(_CONTRACTIONS.get(word, word).split())
+    features = {}
+    for word in words:
+        features["w:" + word] = features.get("w:" + word, 0.0) + 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            key = "c:" + padded[i:i + 3]
+            features[key] = features.get(key, 0.0) + _TRIGRAM_WEIGHT
+    for first, second in zip(words, words[1:]):
+        key = f"b:{first} {second}"
+        features[key] = features.get(key, 0.0) + _BIGRAM_WEIGHT
+    return features
+
+
+class FAQMatch:
+    def __init__(self, answer: str, question: str, score: float, lookup_ms: float):
+        self.answer = answer
+        self.question = question
+        self.score = score
+        self.lookup_ms = lookup_ms
+
+
+class FAQIndex:
+    """TF-IDF nearest-phrasing lookup over curated Q/A pairs."""
+
+    def __init__(self, entries: List[Tuple[List[str], str]], threshold: float = 0.55):
+        self.threshold = threshold
+        self.answers = [answer for _, answer in entries]
+        self._questions = []
+        self._entry_of = []
+        for entry, (phrasings, _) in enumerate(entries):
+            for phrasing in phrasings:
+                self._questions.append(phrasing)
+                self._entry_of.append(entry)
+
+        docs = [_features(question) for question in self._questions]
+        self._vocab = {}
+        for doc in docs:
+            for key in doc:
+                self._vocab.setdefault(key, len(self._vocab))
+        df = np.zeros(len(self._vocab))
+        for doc in docs:
+            for key in doc:
+                df[self._vocab[key]] += 1
+        n = len(docs)
+        self._idf = np.log((1 + n) / (1 + df)) + 1
+        # Terms the index has never seen are as rare as it gets
+        self._unknown_idf = (math.log(1 + n) + 1) * _UNKNOWN_WEIGHT
+
+        self._matrix = np.zeros((n, len(self._vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for key, tf in doc.items():
+                self._matrix[row, self._vocab[key]] = tf * self._idf[self._vocab[key]]
+        norms = np.linalg.norm(self._matrix, axis=1, keepdims=True)
+        self._matrix /= np.maximum(norms, 1e-9)
+
+        # Stats, plus an EWMA of LLM first-token latency for the "saved" estimate
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_ms_total = 0.0
+        self.saved_ms_total = 0.0
+        self.llm_first_token_ms = 500.0
+
+    def lookup(self, text: str) -> Optional[FAQMatch]:
+        """Best curated answer for this turn, or None if nothing is close enough."""
+        started = time.perf_counter()
+        self.lookups += 1
+        match = self._best(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.lookup_ms_total += elapsed_ms
+        if match is not None:
+            match.lookup_ms = elapsed_ms
+            self.hits += 1
+            self.saved_ms_total += max(self.llm_first_token_ms - elapsed_ms, 0.0)
+        return match
+
+    def matches(self, text: str) -> bool:
+        """Whether this text would be answered locally (no stats; for interim transcripts)."""
+        return self._best(text) is not None
+
+    def observe_llm(self, first_token_ms: float):
+        """Feed the LLM first-token latency of a turn that did go to Groq."""
+        self.llm_first_token_ms += 0.2 * (first_token_ms - self.llm_first_token_ms)
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index (vectors, vocabulary, phrasings and answers)."""
+        text = sum(map(len, self._questions)) + sum(map(len, self.answers))
+        return self._matrix.nbytes + self._idf.nbytes + 64 * len(self._vocab) + text
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.answers),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "avg_lookup_ms": round(self.lookup_ms_total / self.lookups, 3) if self.lookups else 0.0,
+            "saved_ms_total": round(self.saved_ms_total, 1),
+            "saved_ms_per_hit": round(self.saved_ms_total / self.hits, 1) if self.hits else 0.0,
+        }
+
+    def _best(self, text: str) -> Optional[FAQMatch]:
+        columns, weights, unknown = [], [], 0.0
+        for key, tf in _features(text).items():
+            column = self._vocab.get(key)
+            if column is None:
+                unknown += (tf * self._unknown_idf) ** 2
+            else:
+                columns.append(column)
+                weights.append(tf * self._idf[column])
+        if not columns:
+            return None
+        query = np.asarray(weights, dtype=np.float32)
+        norm = math.sqrt(float(query @ query) + unknown)
+        scores = self._matrix[:, columns] @ query / norm
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return FAQMatch(self.answers[self._entry_of[best]], self._questions[best], float(scores[best]), 0.0)
@@ -0,0 +1,131 @@
+"""
+Filler / backchannel audio ("Sure.", "Let me think.") for slow turns.
+Phrases are synthesized once at startup and kept in memory as trimmed,
+frame-aligned 8 kHz mulaw, so one can be written to the call's AudioSender
+instantly and the real answer follows in the same frame stream. A rolling
+estimate of answer latency decides whether a filler is worth playing at
+all, and how long it may be.
+"""
+
+import random
+import asyncio
+import numpy as np
+from typing import Awaitable, Callable, List, Optional
+
+from audio import MULAW_TO_PCM
+from playback import FRAME_BYTES, FRAME_MS, MULAW_SILENCE
+from log import get_logger
+
+log = get_logger("fillers")
+
+FILLER_PHRASES = (
+    "Sure.",
+    "Okay.",
+    "Good question.",
+    "Let me think.",
+    "Hmm, let me check.",
+    "Give me one second.",
+)
+
+# Samples quieter than this (PCM16 magnitude) count as leading/trailing silence
+_SILENCE_LEVEL = 500
+
+
+def trim_to_frames(audio: bytes, margin_frames: int = 1) -> bytes:
+    """Strip leading/trailing silence and pad to whole 20 ms frames."""
+    samples = np.abs(MULAW_TO_PCM[np.frombuffer(audio, dtype=np.uint8)].astype(np.int32))
+    loud = np.flatnonzero(samples > _SILENCE_LEVEL)
+    if len(loud):
+        start = max(int(loud[0]) - margin_frames * FRAME_BYTES, 0)
+        end = min(int(loud[-1]) + 1 + margin_frames * FRAME_BYTES, len(audio))
+        audio = audio[start:end]
+    padding = -len(audio) % FRAME_BYTES
+    return bytes(audio) + bytes([MULAW_SILENCE]) * padding
+
+
+class Filler:
+    def __init__(self, text: str, audio: bytes):
+        self.text = text
+        self.audio = audio
+        self.duration_ms = len(audio) // FRAME_BYTES * FRAME_MS
+
+
+class FillerBank:
+    """Pre-synthesized fillers plus the answer-latency estimate that gates them."""
+
+    def __init__(
+        self,
+        phrases=FILLER_PHRASES,
+        threshold_ms: int = 600,
+        min_gap_ms: int = 250,
+        initial_latency_ms: float = 900.0,
+        alpha: float = 0.2,
+    ):
+        self.phrases = phrases
+        # A filler starts once the answer is this late...
+        self.threshold_ms = threshold_ms
+        # ...and only if the answer is predicted to take at least this much longer
+        self.min_gap_ms = min_gap_ms
+        # EWMA of transcript_final → first answer audio byte, across all calls
+        self.predicted_ms = initial_latency_ms
+        self.alpha = alpha
+
+        self.fillers: List[Filler] = []
+        self._last = None
+
+        # Stats
+        self.played = 0
+        self.skipped_fast = 0
+        self.not_needed = 0
+
+    async def load(self, synthesize: Callable[[str], Awaitable[bytes]], timeout: float = 10.0):
+        """Synthesize every phrase (concurrently); failures just leave that phrase out."""
+        async def one(text: str):
+            audio = await synthesize(text)
+            return Filler(text, trim_to_frames(audio)) if audio else None
+
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(one(text) for text in self.phrases), return_exceptions=True),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            results = []
+        self.fillers = sorted(
+            (filler for filler in results if isinstance(filler, Filler)),
+            key=lambda filler: filler.duration_ms,
+        )
+        log.info("fillers_loaded", f"💬 Loaded {len(self.fillers)}/{len(self.phrases)} fillers")
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before playing a filler this turn, or None if the answer should be fast."""
+        if not self.fillers:
+            return None
+        if self.predicted_ms - self.threshold_ms < self.min_gap_ms:
+            self.skipped_fast += 1
+            return None
+        return self.threshold_ms / 1000
+
+    def pick(self, elapsed_ms: float) -> Filler:
+        """The longest filler that fits the predicted remaining wait (avoiding repeats)."""
+        remaining = self.predicted_ms - elapsed_ms
+        fitting = [filler for filler in self.fillers if filler.duration_ms <= remaining] or self.fillers[:1]
+        # Choose among the two longest that fit, so calls don't hear the same phrase twice in a row
+        candidates = [filler for filler in fitting[-2:] if filler is not self._last] or fitting[-1:]
+        filler = random.choice(candidates)
+        self._last = filler
+        self.played += 1
+        return filler
+
+    def observe(self, latency_ms: float):
+        """Feed the measured answer latency of a finished turn."""
+        self.predicted_ms += self.alpha * (latency_ms - self.predicted_ms)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": len(self.fillers),
+            "played": self.played,
+            "skipped_fast": self.skipped_fast,
+            "not_needed": self.not_needed,
+            "predicted_ms": round(self.predicted_ms, 1),
+        }
@@ -0,0 +1,163 @@
+"""
+Token-budgeted conversation history.
+Keeps the system prompt plus the most recent turns within a token budget and
+folds older turns into a short rolling summary, produced by a background Groq
+call so it never sits on a turn's critical path.
+"""
+
+import re
+import asyncio
+from typing import List, Optional
+
+from log import get_logger
+
+log = get_logger("history")
+
+# Llama-style tokenizers average ~4 characters per token on English text;
+# counting word pieces this way is within a few percent and needs no tokenizer
+_TOKEN_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Chat template overhead per message (role header + separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the earlier part of this phone conversation in at most three short "
+    "sentences. Keep what the caller asked about and anything they told you about "
+    "themselves. Reply with the summary only."
+)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of a piece of text."""
+    return len(_TOKEN_PIECE.findall(text))
+
+
+class ConversationHistory:
+    """System prompt + rolling summary + the last N turns, within a token budget."""
+
+    def __init__(
+        self,
+        system_prompt: str,
+        groq_client=None,
+        max_turns: int = 6,
+        token_budget: int = 1500,
+        system_prompt_tokens: Optional[int] = None,
+    ):
+        self.system_prompt = system_prompt
+        self.system_tokens = (
+            system_prompt_tokens if system_prompt_tokens is not None else count_tokens(system_prompt)
+        ) + MESSAGE_OVERHEAD_TOKENS
+        self.groq_client = groq_client
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+
+        self._messages: List[dict] = []
+        self._tokens: List[int] = []
+
+        # Rolling summary of evicted turns
+        self.summary = ""
+        self._summary_tokens = 0
+        self._unsummarized: List[dict] = []
+        self._summary_task = None
+
+        # Prompt size sent to the LLM for each user turn
+        self.turn_prompt_tokens: List[int] = []
+        # Bumped on every change to what the LLM would see (speculation checks it before use)
+        self.version = 0
+
+    @property
+    def last(self) -> Optional[dict]:
+        return self._messages[-1] if self._messages else None
+
+    def append(self, role: str, content: str):
+        self.version += 1
+        self._messages.append({"role": role, "content": content})
+        self._tokens.append(count_tokens(content) + MESSAGE_OVERHEAD_TOKENS)
+        if role == "user":
+            self.turn_prompt_tokens.append(self.prompt_tokens())
+        else:
+            self._enforce_budget()
+
+    def pop(self) -> dict:
+        self.version += 1
+        self._tokens.pop()
+        return self._messages.pop()
+
+    def set_last_content(self, content: str):
+        self.version += 1
+        self._messages[-1]["content"] = content
+        self._tokens[-1] = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def messages(self, pending_user: Optional[str] = None) -> List[dict]:
+        """The message list to send to the LLM (optionally with a not-yet-recorded user turn)."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the conversation so far: {self.summary}",
+            })
+        messages.extend(self._messages)
+        if pending_user is not None:
+            messages.append({"role": "user", "content": pending_user})
+        return messages
+
+    def prompt_tokens(self) -> int:
+        summary = self._summary_tokens + MESSAGE_OVERHEAD_TOKENS if self.summary else 0
+        return self.system_tokens + summary + sum(self._tokens)
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self._messages),
+            "prompt_tokens": self.prompt_tokens(),
+            "summary_tokens": self._summary_tokens,
+            "turn_prompt_tokens": list(self.turn_prompt_tokens),
+        }
+
+    def close(self):
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+
+    def _enforce_budget(self):
+        # Evict whole (user, assistant) turns from the front, always keeping the latest one
+        while len(self._messages) > 2 and (
+            len(self._messages) > 2 * self.max_turns or self.prompt_tokens() > self.token_budget
+        ):
+            self.version += 1
+            evicted = 2 if self._messages[1]["role"] == "assistant" else 1
+            for _ in range(evicted):
+                self._tokens.pop(0)
+                self._unsummarized.append(self._messages.pop(0))
+
+        if self._unsummarized and self.groq_client and (
+            self._summary_task is None or self._summary_task.done()
+        ):
+            self._summary_task = asyncio.create_task(self._summarize())
+
+    async def _summarize(self):
+        """Fold evicted turns into the rolling summary (runs off the critical path)."""
+        while self._unsummarized:
+            batch, self._unsummarized = self._unsummarized, []
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in batch)
+            if self.summary:
+                transcript = f"Earlier summary: {self.summary}\n{transcript}"
+            try:
+                completion = await self.groq_client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                        {"role": "user", "content": transcript},
+                    ],
+                    model=SUMMARY_MODEL,
+                    temperature=0.2,
+                    max_tokens=120,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("summary_failed", f"⚠️ History summary failed: {e}")
+                return
+            summary = (completion.choices[0].message.content or "").strip()
+            if summary:
+                self.version += 1
+                self.summary = summary
+                self._summary_tokens = count_tokens(summary)
@@ -0,0 +1,283 @@
+"""
+Per-turn Groq model routing with hedged requests.
+Simple questions go straight to the fast model. Harder ones go to the
+larger model unless its recent first-token latency already blows the
+turn's budget; if its first token then misses the hedge deadline, the same
+request is sent to the fast model and whichever streams first wins (the
+loser is cancelled at its own first token, so its latency is still
+measured). First-token latency is tracked per model over a rolling window,
+so routing follows Groq's load through the day.
+"""
+
+import os
+import re
+import time
+import asyncio
+from collections import deque
+from typing import List, Optional
+
+from log import get_logger
+
+log = get_logger("llm_router")
+
+PRIMARY_MODEL = os.getenv("LLM_PRIMARY_MODEL", "llama-3.3-70b-versatile")
+FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant")
+
+# Expected first-token latency (ms) until a model has enough recent samples
+PRIOR_FIRST_TOKEN_MS = {PRIMARY_MODEL: 450.0, FALLBACK_MODEL: 250.0}
+
+_WORD = re.compile(r"[a-z']+")
+# Words that usually ask for an explanation rather than a fact
+_OPEN_ENDED = {
+    "why", "how", "explain", "describe", "compare", "difference", "tell", "elaborate",
+    "detail", "details", "approach", "design", "challenge", "challenges", "example", "think",
+}
+
+
+def complexity(text: str) -> float:
+    """0..1 estimate of how much reasoning a turn needs (length, open-endedness, multiple asks)."""
+    words = _WORD.findall(text.lower())
+    score = min(len(words) / 25, 1.0) * 0.5
+    if _OPEN_ENDED.intersection(words):
+        score += 0.3
+    if text.count("?") > 1 or " and " in text.lower():
+        score += 0.2
+    return min(score, 1.0)
+
+
+class ModelLatency:
+    """Rolling first-token latency samples for one model."""
+
+    def __init__(self, prior_ms: float, window_s: float = 300.0, max_samples: int = 200, min_samples: int = 5):
+        self.prior_ms = prior_ms
+        self.window_s = window_s
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=max_samples)
+
+        # Stats
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+
+    def observe(self, first_token_ms: float):
+        self._samples.append((time.monotonic(), first_token_ms))
+
+    def quantile(self, q: float) -> float:
+        cutoff = time.monotonic() - self.window_s
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        if len(self._samples) < self.min_samples:
+            return self.prior_ms
+        values = sorted(ms for _, ms in self._samples)
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "errors": self.errors,
+            "first_token_p50_ms": round(self.quantile(0.5), 1),
+            "first_token_p90_ms": round(self.quantile(0.9), 1),
+        }
+
+
+class Route:
+    def __init__(self, model: str, reason: str, hedge_model: Optional[str] = None, hedge_after_ms: Optional[float] = None):
+        self.model = model
+        self.reason = reason
+        self.hedge_model = hedge_model
+        self.hedge_after_ms = hedge_after_ms
+
+
+class Attempt:
+    """One streaming completion on one model; buffers deltas so the winner replays from its start."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.deltas: List[str] = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self.started_at = None
+        self.first_delta_at = None
+        self._changed = asyncio.Event()
+
+    @property
+    def first_token_ms(self) -> Optional[float]:
+        if self.first_delta_at is None:
+            return None
+        return (self.first_delta_at - self.started_at) * 1000
+
+    async def run(self, groq_client, messages: list, params: dict):
+        self.started_at = time.monotonic()
+        try:
+            stream = await groq_client.chat.completions.create(
+                messages=messages, stream=True, **{**params, "model": self.model},
+            )
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if self.first_delta_at is None:
+                            self.first_delta_at = time.monotonic()
+                        self.deltas.append(delta)
+                        self._changed.set()
+            finally:
+                await stream.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def wait_started(self):
+        """Wait for the first delta (or the end of the request)."""
+        while not self.deltas and not self.done:
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def stream(self):
+        """Yield every delta: the buffered ones first, then live ones as they arrive."""
+        index = 0
+        while True:
+            while index < len(self.deltas):
+                yield self.deltas[index]
+                index += 1
+            if self.done:
+                if self.error:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class LLMRouter:
+    """Chooses a model per turn and runs hedged streaming completions."""
+
+    def __init__(
+        self,
+        primary: str = PRIMARY_MODEL,
+        fallback: str = FALLBACK_MODEL,
+        complexity_threshold: float = 0.35,
+        min_hedge_ms: float = 150.0,
+        loser_timeout_ms: float = 5000.0,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        # Turns scoring below this go straight to the fallback model
+        self.complexity_threshold = complexity_threshold
+        # Never hedge earlier than this, however fast the primary has been
+        self.min_hedge_ms = min_hedge_ms
+        # A losing request runs on until its first token (capped by this) so its real latency is learned
+        self.loser_timeout_ms = loser_timeout_ms
+        self._losers = set()
+        self.models = {
+            model: ModelLatency(PRIOR_FIRST_TOKEN_MS.get(model, 400.0))
+            for model in (primary, fallback)
+        }
+        self.routes = {}
+        self.hedges = 0
+
+    def choose(self, text: str, budget_ms: float) -> Route:
+        """Model for this turn, given a first-token latency budget."""
+        if self.primary == self.fallback or complexity(text) < self.complexity_threshold:
+            route = Route(self.fallback, "simple")
+        elif self.models[self.primary].quantile(0.5) > budget_ms:
+            route = Route(self.fallback, "primary_slow")
+        else:
+            # Hedge at the primary's usual worst case, but no later than the budget
+            hedge_after = min(max(self.models[self.primary].quantile(0.9), self.min_hedge_ms), budget_ms)
+            route = Route(self.primary, "complex", self.fallback, hedge_after)
+        self.routes[route.reason] = self.routes.get(route.reason, 0) + 1
+        return route
+
+    async def stream(self, groq_client, messages: list, params: dict, route: Route):
+        """Yield content deltas from whichever model of the route streams first."""
+        attempts = [self._start(groq_client, messages, params, route.model)]
+        try:
+            winner = await self._first_to_stream(attempts, route.hedge_after_ms if route.hedge_model else None)
+            if route.hedge_model and (winner is None or winner.error is not None):
+                reason = "failed" if winner else f"missed its {route.hedge_after_ms:.0f} ms first-token deadline"
+                log.info("llm_hedge", f"🔀 {route.model} {reason}, hedging to {route.hedge_model}")
+                self.hedges += 1
+                attempts.append(self._start(groq_client, messages, params, route.hedge_model))
+                winner = await self._first_to_stream(attempts, None)
+
+            for loser in [attempt for attempt in attempts if attempt is not winner]:
+                attempts.remove(loser)
+                if not loser.task.done():
+                    task = asyncio.create_task(self._measure_loser(loser))
+                    self._losers.add(task)
+                    task.add_done_callback(self._losers.discard)
+            if winner.error is None:
+                self.models[winner.model].wins += 1
+
+            async for delta in winner.stream():
+                yield delta
+        finally:
+            for attempt in attempts:
+                if not attempt.task.done():
+                    attempt.task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "routes": dict(self.routes),
+            "hedges": self.hedges,
+            "models": {model: latency.as_dict() for model, latency in self.models.items()},
+        }
+
+    def _start(self, groq_client, messages: list, params: dict, model: str) -> Attempt:
+        attempt = Attempt(model)
+        attempt.task = asyncio.create_task(attempt.run(groq_client, messages, params))
+        attempt.task.add_done_callback(lambda _: self._record(attempt))
+        # Models outside the route (a persona's fixed model) are tracked from their first request
+        if model not in self.models:
+            self.models[model] = ModelLatency(PRIOR_FIRST_TOKEN_MS.get(model, 400.0))
+        self.models[model].requests += 1
+        return attempt
+
+    async def _measure_loser(self, attempt: Attempt):
+        """Let a losing request reach its first token (then cancel it) to record its latency."""
+        try:
+            await asyncio.wait_for(attempt.wait_started(), self.loser_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            attempt.task.cancel()
+        if attempt.first_token_ms is not None:
+            self.models[attempt.model].observe(attempt.first_token_ms)
+        elif attempt.error is None:
+            self.models[attempt.model].observe(self.loser_timeout_ms)
+
+    def _record(self, attempt: Attempt):
+        if attempt.error is not None:
+            self.models[attempt.model].errors += 1
+
+    async def _first_to_stream(self, attempts: List[Attempt], timeout_ms: Optional[float]) -> Optional[Attempt]:
+        """The first attempt to produce a delta (or finish); None on timeout."""
+        waiters = {asyncio.create_task(attempt.wait_started()): attempt for attempt in attempts}
+        deadline = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000
+        try:
+            while waiters:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    return None
+                for waiter in done:
+                    attempt = waiters.pop(waiter)
+                    if attempt.first_token_ms is not None:
+                        self.models[attempt.model].observe(attempt.first_token_ms)
+                    # A failed attempt only wins if nothing else is left to wait for
+                    if attempt.error is None or not waiters:
+                        return attempt
+            return None
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+
+llm_router = LLMRouter()
@@ -0,0 +1,251 @@
+"""
+Structured, non-blocking logging.
+Records are put on a bounded queue and written to stdout by a background
+thread (logging's QueueHandler/QueueListener), so a slow terminal or log
+shipper never stalls the event loop that paces every call's audio. Each
+record carries an event type plus the call_id / stream_sid of the call it
+came from; chatty event types can be sampled (LOG_SAMPLE) and everything
+below ERROR is rate limited per event type and call (LOG_RATE_PER_S), so one
+noisy call can't hide another call's warnings. Drops are counted in
+log_stats, and a "log_suppressed" line reports each burst once it is over.
+
+    LOG_LEVEL=INFO|DEBUG|...   LOG_FORMAT=text|json
+    LOG_SAMPLE=user_segment=0.1,playback_done=0.5   LOG_RATE_PER_S=50
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import contextvars
+import logging.handlers
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_RATE_PER_S = float(os.getenv("LOG_RATE_PER_S", 50))
+LOG_QUEUE_SIZE = 10_000
+
+
+def _parse_sample(spec: str) -> dict:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+# Event type → fraction of DEBUG/INFO records kept
+LOG_SAMPLE = _parse_sample(os.getenv("LOG_SAMPLE", ""))
+
+
+class CallContext:
+    """Per-call fields stamped on every record logged from that call's tasks."""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        # Filled in when the media stream starts (mutable, so tasks created earlier see it)
+        self.stream_sid = None
+
+
+_call = contextvars.ContextVar("call", default=None)
+
+
+def bind_call(call_id: str) -> CallContext:
+    """Attach a call context to the current task (and the tasks it creates from now on)."""
+    context = CallContext(call_id)
+    _call.set(context)
+    return context
+
+
+class LogStats:
+    """Records that never reached the output, by reason."""
+
+    def __init__(self):
+        self.written = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "written": self.written,
+            "sampled_out": self.sampled_out,
+            "rate_limited": self.rate_limited,
+            "queue_full": self.queue_full,
+        }
+
+
+log_stats = LogStats()
+
+
+class _RateLimiter:
+    """Token bucket per (event type, call_id) (refills at rate/s, bursts up to one second's worth)."""
+
+    # Buckets kept before idle ones (calls that hung up) are pruned
+    MAX_BUCKETS = 10_000
+
+    def __init__(self, rate: float, window_s: float = 1.0):
+        self.rate = rate
+        # A burst's suppressed count is reported this long after its first drop
+        self.window_s = window_s
+        self._buckets = {}
+        # key → (records dropped, when the first was)
+        self._suppressed = {}
+
+    def allow(self, key: tuple) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.rate, now))
+        tokens = min(tokens + (now - last) * self.rate, self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            count, first = self._suppressed.get(key, (0, now))
+            self._suppressed[key] = (count + 1, first)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.MAX_BUCKETS:
+            self._prune(now)
+        return True
+
+    def closed_windows(self) -> list:
+        """(key, dropped) for bursts whose window has ended, each reported once."""
+        if not self._suppressed:
+            return []
+        now = time.monotonic()
+        # (list() copies in one step: worker threads log too)
+        closed = [(key, count) for key, (count, first) in list(self._suppressed.items()) if now - first >= self.window_s]
+        for key, _ in closed:
+            self._suppressed.pop(key, None)
+        return closed
+
+    def _prune(self, now: float):
+        # A bucket idle for a second is full again: dropping it changes nothing
+        for key, (_, last) in list(self._buckets.items()):
+            if now - last >= 1.0:
+                self._buckets.pop(key, None)
+
+
+_limiter = _RateLimiter(LOG_RATE_PER_S)
+
+
+class EventLogger:
+    """logging.Logger wrapper: every record has an event type, call context and optional fields."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def enabled(self, level: int) -> bool:
+        """Guard for expensive messages (e.g. full payload dumps)."""
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, event: str, message: str, **fields):
+        self._log(logging.DEBUG, event, message, fields)
+
+    def info(self, event: str, message: str, **fields):
+        self._log(logging.INFO, event, message, fields)
+
+    def warning(self, event: str, message: str, **fields):
+        self._log(logging.WARNING, event, message, fields)
+
+    def error(self, event: str, message: str, **fields):
+        self._log(logging.ERROR, event, message, fields)
+
+    def _log(self, level: int, event: str, message: str, fields: dict):
+        if not self._logger.isEnabledFor(level):
+            return
+        # Warnings and errors are never sampled (warnings are still rate limited)
+        rate = LOG_SAMPLE.get(event) if level < logging.WARNING else None
+        if rate is not None and random.random() >= rate:
+            log_stats.sampled_out += 1
+            return
+        context = _call.get()
+        call_id = context.call_id if context else None
+        for (suppressed_event, suppressed_call), count in _limiter.closed_windows():
+            logging.getLogger("voicebot.log").warning(
+                f"🔇 {count} {suppressed_event} records suppressed (over {_limiter.rate:g}/s)",
+                extra={
+                    "event": "log_suppressed",
+                    "fields": {"suppressed_event": suppressed_event, "suppressed": count},
+                    "call_id": suppressed_call,
+                    "stream_sid": None,
+                },
+            )
+        # Errors are never dropped
+        if level < logging.ERROR and not _limiter.allow((event, call_id)):
+            log_stats.rate_limited += 1
+            return
+        self._logger.log(level, message, extra={
+            "event": event,
+            "fields": fields,
+            "call_id": call_id,
+            "stream_sid": context.stream_sid if context else None,
+        })
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        call = getattr(record, "call_id", None)
+        where = f" [{call[:8]}]" if call else ""
+        return f"{stamp} {record.levelname:<7}{where} {record.getMessage()}"
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+            "call_id": getattr(record, "call_id", None),
+            "stream_sid": getattr(record, "stream_sid", None),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue without blocking; a full queue drops the record (and counts it)."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread; only freeze what must not change
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            log_stats.written += 1
+        except queue.Full:
+            log_stats.queue_full += 1
+
+
+_listener = None
+
+
+def configure_logging():
+    """Install the queue handler and start the writer thread (once per process)."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_JSONFormatter() if LOG_FORMAT == "json" else _TextFormatter())
+    records = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger("voicebot")
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    root.addHandler(_QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    # Flush what is still queued on exit
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> EventLogger:
+    configure_logging()
+    return EventLogger(f"voicebot.{name}")
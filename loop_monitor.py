@@ -0,0 +1,161 @@
+"""
+Event-loop lag monitor.
+A background task sleeps a fixed interval and records how late the loop
+wakes it. Every call on a worker shares this loop, so sustained lag means
+frames are already being paced late for all of them — the signal admission
+control uses to stop taking new calls before existing ones degrade.
+
+Lag says the loop is late, not why. A watchdog thread notices when the
+loop hasn't woken the probe for slow_callback_ms and snapshots the loop
+thread's stack at that moment: the task and the line still running are
+the coroutine hogging the loop (flagged in the log and at /stats).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Optional
+
+from log import get_logger
+
+log = get_logger("loop_monitor")
+
+
+def _task_name(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return "-"
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+def _owning_task(loop, frames: list) -> Optional[asyncio.Task]:
+    """The task whose coroutine is on this stack: its outermost coroutine frame is one of them."""
+    try:
+        # all_tasks() copies the task set (retrying if the loop thread changes it meanwhile)
+        by_frame = {}
+        for task in asyncio.all_tasks(loop):
+            frame = getattr(task.get_coro(), "cr_frame", None)
+            if frame is not None:
+                by_frame[id(frame)] = task
+    except Exception:
+        return None
+    for frame in frames:
+        task = by_frame.get(id(frame))
+        if task is not None:
+            return task
+    return None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class LoopMonitor:
+    """Rolling window of event-loop wake-up delays, plus a stall watchdog."""
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        window_s: float = 5.0,
+        slow_callback_ms: float = 100.0,
+        keep_slow: int = 20,
+    ):
+        self.interval = interval
+        self._samples = deque(maxlen=max(int(window_s / interval), 1))
+        self._task = None
+        self.max_lag_ms = 0.0
+        # A loop that hasn't woken the probe for this long (past its interval) is stuck in one callback
+        self.slow_callback_ms = slow_callback_ms
+        self.slow_callbacks = deque(maxlen=keep_slow)
+        self.slow_total = 0
+        self._loop = None
+        self._loop_thread = None
+        self._ticked_at = 0.0
+        self._stall = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._ticked_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if self.slow_callback_ms:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def close(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def lag_ms(self, q: float = 0.9) -> float:
+        """Lag quantile over the recent window (0 until there are samples)."""
+        if not self._samples:
+            return 0.0
+        values = sorted(self._samples)
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def stats(self) -> dict:
+        return {
+            "lag_p50_ms": round(self.lag_ms(0.5), 2),
+            "lag_p90_ms": round(self.lag_ms(0.9), 2),
+            "lag_max_ms": round(self.max_lag_ms, 2),
+            "slow_callbacks": self.slow_total,
+            # Most recent first (a list, so it stays out of the Prometheus gauges)
+            "recent_slow": list(reversed(self.slow_callbacks)),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(loop.time() - expected, 0.0) * 1000
+            self._samples.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if self._stall is not None:
+                self._report(self._stall, (now - self._ticked_at - self.interval) * 1000)
+                self._stall = None
+            self._ticked_at = now
+
+    def _watch(self):
+        poll = min(self.interval, self.slow_callback_ms / 1000) / 2
+        while not self._stop.wait(poll):
+            stalled_ms = (time.monotonic() - self._ticked_at - self.interval) * 1000
+            if self._stall is None and stalled_ms >= self.slow_callback_ms:
+                self._stall = self._snapshot()
+
+    def _snapshot(self) -> dict:
+        """What the loop thread is running right now (called from the watchdog thread)."""
+        current_frames = getattr(sys, "_current_frames", None)
+        frame = current_frames().get(self._loop_thread) if current_frames else None
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        stack = [_frame_label(frame) for frame in frames]
+        # Innermost first; asyncio's own frames sit at the bottom and say nothing
+        return {
+            "task": _task_name(_owning_task(self._loop, frames)),
+            "where": stack[0] if stack else "-",
+            "stack": stack[:12],
+        }
+
+    def _report(self, stall: dict, stalled_ms: float):
+        self.slow_total += 1
+        stall["stalled_ms"] = round(stalled_ms, 1)
+        stall["at"] = round(time.time(), 3)
+        self.slow_callbacks.append(stall)
+        log.warning(
+            "slow_callback",
+            f"🐢 Event loop blocked {stalled_ms:.0f} ms by {stall['task']} at {stall['where']}",
+            **stall,
+        )
@@ -1,14 +1,174 @@
 import os
+import time
+# Startup timing (reported at /stats): from here to the end of the warm-up
+_IMPORT_STARTED = time.monotonic()
+import asyncio
+import uuid
 import uvicorn
+from urllib.parse import parse_qs
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
+from clients import ClientPool
+from tts_cache import TTSCache
+from speculation import speculation_stats
+from llm_router import llm_router
+from vad import vad_stats
+from stt_forwarder import forwarder_stats
+from providers import media_path_stats
+from endpointing import endpointing_stats
+from tracing import metrics, flatten_stats
+from stt_pool import STTWarmPool
+from fillers import FillerBank
+from deadline import breakers
+from admission import AdmissionController
+from loop_monitor import LoopMonitor
+from profiler import SamplingProfiler, ProfileBusy
+from session_registry import create_registry, default_worker_id
+from personas import PersonaRegistry
+from warmup import Warmup, dns_cache, tls_context
+from log import get_logger, log_stats
 
-load_dotenv()
+log = get_logger("main")
 
-app = FastAPI()
+load_dotenv()
+IMPORT_MS = (time.monotonic() - _IMPORT_STARTED) * 1000
 
 PORT = int(os.getenv("PORT", 8080))
+MAX_UPSTREAM_CONNECTIONS = int(os.getenv("MAX_UPSTREAM_CONNECTIONS", 200))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+TTS_CACHE_MEMORY_MB = int(os.getenv("TTS_CACHE_MEMORY_MB", 64))
+STT_WARM_TTL = float(os.getenv("STT_WARM_TTL", 30))
+STT_WARM_MAX = int(os.getenv("STT_WARM_MAX", 32))
+FILLERS = os.getenv("FILLERS", "1") == "1"
+FILLER_THRESHOLD_MS = int(os.getenv("FILLER_THRESHOLD_MS", 600))
+FAQ_ANSWERS = os.getenv("FAQ_ANSWERS", "1") == "1"
+FAQ_THRESHOLD = float(os.getenv("FAQ_THRESHOLD", 0.55))
+# Admission control: calls beyond MAX_SESSIONS, or while loop lag (p90) is over
+# MAX_LOOP_LAG_MS, get a busy response — or a redirect to OVERFLOW_URL if set
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 50))
+MAX_LOOP_LAG_MS = float(os.getenv("MAX_LOOP_LAG_MS", 50))
+OVERFLOW_URL = os.getenv("OVERFLOW_URL", "")
+# On shutdown, active calls get this long to finish before they are cut off
+DRAIN_TIMEOUT_S = float(os.getenv("DRAIN_TIMEOUT_S", 600))
+# Session registry shared by the workers ("memory" = this process only,
+# "sqlite:///path.db" = every worker on the box). WORKER_HOST is the host[:port]
+# providers reach this worker at, so media streams come back to the worker
+# whose webhook reserved them (default: the webhook request's Host).
+SESSION_REGISTRY = os.getenv("SESSION_REGISTRY", "memory")
+WORKER_ID = os.getenv("WORKER_ID") or default_worker_id()
+WORKER_HOST = os.getenv("WORKER_HOST", "")
+# Per-tenant personas: PERSONA_DIR/<dialed number digits>.json (unset = the built-in
+# persona for every call); compiled personas are kept within PERSONA_CACHE_MB
+PERSONA_DIR = os.getenv("PERSONA_DIR", "")
+PERSONA_CACHE_MB = int(os.getenv("PERSONA_CACHE_MB", 32))
+# A callback holding the event loop this long is logged with its task and stack (0 = off)
+LOOP_SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", 100))
+# /admin/* needs "Authorization: Bearer $ADMIN_TOKEN" (unset = loopback clients only)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Warm-up before the first call (warmup.py): /ready is 503 and calls are refused until
+# it finishes or WARMUP_TIMEOUT_S passes. WARMUP=0 skips the priming steps (DNS, TLS,
+# Groq SDK, STT socket) but still loads connections and audio before going ready.
+WARMUP = os.getenv("WARMUP", "1") == "1"
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", 30))
+
+# ── App lifespan: admission control, session registry, shared upstream clients, TTS cache, warm STT pool, fillers, personas, warm-up ──
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # bot (and through it groq / websockets) is imported here, not on the first call
+    started = time.monotonic()
+    from bot import DEEPGRAM_STT_URL, synthesize
+    app.state.bot_import_ms = (time.monotonic() - started) * 1000
+    app.state.loop_monitor = LoopMonitor(slow_callback_ms=LOOP_SLOW_CALLBACK_MS)
+    app.state.loop_monitor.start()
+    app.state.profiler = SamplingProfiler()
+    app.state.admission = AdmissionController(
+        max_sessions=MAX_SESSIONS,
+        max_loop_lag_ms=MAX_LOOP_LAG_MS,
+        loop_monitor=app.state.loop_monitor,
+    )
+    admission = app.state.admission
+    app.state.registry = create_registry(SESSION_REGISTRY, WORKER_ID, WORKER_HOST or None)
+    await app.state.registry.start(
+        lambda: {"active": admission.active, "spare": admission.spare, "draining": admission.draining}
+    )
+    app.state.stt_pool = STTWarmPool(
+        DEEPGRAM_STT_URL,
+        os.getenv("DEEPGRAM_API_KEY"),
+        ttl=STT_WARM_TTL,
+        max_sessions=STT_WARM_MAX,
+    )
+    app.state.stt_pool.start()
+    app.state.tts_cache = TTSCache(
+        max_memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+        disk_dir=TTS_CACHE_DIR or None,
+    )
+    app.state.clients = ClientPool(max_connections=MAX_UPSTREAM_CONNECTIONS)
+    app.state.fillers = FillerBank(threshold_ms=FILLER_THRESHOLD_MS) if FILLERS else None
+    app.state.personas = PersonaRegistry(
+        PERSONA_DIR or None,
+        lambda text, persona: synthesize(app.state.clients.http, text, app.state.tts_cache, persona),
+        max_memory_bytes=PERSONA_CACHE_MB * 1024 * 1024,
+        faq_threshold=FAQ_THRESHOLD if FAQ_ANSWERS else None,
+    )
+    # Serve right away (/ready says "warming") and admit calls once the warm-up is done
+    admission.warming = True
+    app.state.warmup = Warmup(timeout=WARMUP_TIMEOUT_S)
+    warmup_task = asyncio.create_task(warm_up(app, DEEPGRAM_STT_URL, synthesize))
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        # Normally already drained by DrainingServer before connections were closed
+        await app.state.admission.drain(DRAIN_TIMEOUT_S)
+        await app.state.registry.close()
+        await app.state.personas.close()
+        await dns_cache.close()
+        await app.state.stt_pool.close()
+        await app.state.clients.close()
+        await app.state.loop_monitor.close()
+
+async def warm_up(app: FastAPI, stt_url: str, synthesize):
+    """Pay every first-use cost before the first call, then start admitting calls."""
+    state = app.state
+    priming = {}
+    if WARMUP:
+        # The per-call STT socket is the one connection opened on every call
+        priming = {
+            "dns": lambda: dns_cache.resolve(stt_url),
+            "tls_context": lambda: asyncio.to_thread(tls_context),
+        }
+    loading = {
+        "connections": state.clients.start,
+        # The built-in persona's apology clip has to be in memory before the first call
+        "personas": state.personas.start,
+    }
+    if state.fillers:
+        loading["fillers"] = lambda: state.fillers.load(
+            lambda text: synthesize(state.clients.http, text, state.tts_cache)
+        )
+    if WARMUP:
+        loading["groq_sdk"] = state.clients.prime_sdk
+        loading["stt_socket"] = state.stt_pool.prime
+    await state.warmup.run(priming, loading)
+    if WARMUP:
+        dns_cache.start()
+    state.admission.warming = False
+
+def startup_stats(app: FastAPI) -> dict:
+    warmup = app.state.warmup
+    ready_at = warmup.started_at + warmup.duration_ms / 1000 if warmup.ready.is_set() else None
+    return {
+        "import_ms": round(IMPORT_MS, 1),
+        "bot_import_ms": round(app.state.bot_import_ms, 1),
+        # From the start of main's imports (the interpreter's own start-up isn't included)
+        "time_to_ready_ms": round((ready_at - _IMPORT_STARTED) * 1000, 1) if ready_at else None,
+        "warmup": warmup.stats(),
+        "dns": dns_cache.stats(),
+    }
+
+app = FastAPI(lifespan=lifespan)
 
 # ── Provider instances (created once) ──────────────────────────
 from providers.twilio import TwilioProvider
@@ -22,46 +182,186 @@ telnyx_provider = TelnyxProvider()
 async def index_page():
     return "<h1>Voice Agent Server is Running!</h1><p>Providers: Twilio, Telnyx</p>"
 
+def collect_stats(app: FastAPI) -> dict:
+    return {
+        "startup": startup_stats(app),
+        "admission": app.state.admission.stats(),
+        "loop": app.state.loop_monitor.stats(),
+        "profiler": app.state.profiler.stats(),
+        "cluster": app.state.registry.stats(),
+        "logging": log_stats.as_dict(),
+        "clients": app.state.clients.stats(),
+        "tts_cache": app.state.tts_cache.stats(),
+        "speculation": speculation_stats.as_dict(),
+        "llm_router": llm_router.stats(),
+        "vad": vad_stats.as_dict(),
+        "endpointing": endpointing_stats.as_dict(),
+        "stt_pool": app.state.stt_pool.stats(),
+        "stt_forwarder": forwarder_stats.as_dict(),
+        "media_path": media_path_stats.as_dict(),
+        "fillers": app.state.fillers.stats() if app.state.fillers else {},
+        "personas": app.state.personas.stats(),
+        "faq": app.state.personas.default.faq.stats() if app.state.personas.default.faq else {},
+        "breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+    }
+
+@app.get("/ready")
+async def ready(request: Request):
+    """Load balancer readiness: 200 with spare capacity, 503 while full, lagging or draining."""
+    admission = request.app.state.admission
+    reason = admission.rejection()
+    return JSONResponse(
+        {
+            "ready": reason is None,
+            "reason": reason,
+            "spare": admission.spare,
+            "active": admission.active,
+            "loop_lag_ms": round(request.app.state.loop_monitor.lag_ms(), 2),
+        },
+        status_code=200 if reason is None else 503,
+    )
+
+async def dialed_number(request: Request) -> str:
+    """The number the caller dialed: "To" in the webhook's form body or query string."""
+    number = request.query_params.get("To")
+    if number is None and "application/x-www-form-urlencoded" in request.headers.get("content-type", ""):
+        form = parse_qs((await request.body()).decode("utf-8", "replace"))
+        number = form.get("To", [""])[0]
+    return number or ""
+
+async def registry_call(method, *args):
+    """Registry bookkeeping must never take a call down with it (None = fall back to local routing)."""
+    try:
+        return await method(*args)
+    except Exception as e:
+        log.warning("registry_error", f"⚠️ Session registry error ({e})")
+        return None
+
+async def busy_response(request: Request, provider) -> HTMLResponse:
+    """XML for a call this worker won't take: redirect to a peer with room, the overflow URL, or busy."""
+    redirect_url = None
+    # One hop only, so two full workers can't bounce a call between them
+    peer = None if "redirected" in request.query_params else await registry_call(request.app.state.registry.best_peer)
+    if peer is not None:
+        redirect_url = f"https://{peer['host']}{request.url.path}?redirected=1"
+        request.app.state.registry.redirected += 1
+        log.info("call_redirected", f"🔀 Redirecting call to {peer['worker_id']} ({peer['spare']} spare)")
+    elif OVERFLOW_URL:
+        redirect_url = OVERFLOW_URL.rstrip("/") + request.url.path
+    return HTMLResponse(content=provider.generate_busy_response(redirect_url), media_type="application/xml")
+
+@app.get("/stats")
+async def stats(request: Request):
+    return collect_stats(request.app)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(request: Request):
+    """Per-stage latency histograms + component stats in Prometheus text format."""
+    gauges = flatten_stats("voicebot", collect_stats(request.app))
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+# ── Admin: live profiling ──────────────────────────────────────
+def is_admin(request: Request) -> bool:
+    if ADMIN_TOKEN:
+        return request.headers.get("authorization") == f"Bearer {ADMIN_TOKEN}"
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+@app.get("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 10.0, hz: int = 100):
+    """Sample every thread's stack for `seconds`; returns collapsed stacks for a flame graph."""
+    if not is_admin(request):
+        return PlainTextResponse("forbidden\n", status_code=403)
+    try:
+        collapsed = await request.app.state.profiler.profile(seconds, hz)
+    except ProfileBusy:
+        return PlainTextResponse("a profile is already running\n", status_code=409)
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{WORKER_ID}.collapsed"'},
+    )
+
 # ── Twilio endpoints ──────────────────────────────────────────
 @app.api_route("/incoming-call/twilio", methods=["GET", "POST"])
 async def handle_twilio_call(request: Request):
     """Handle incoming Twilio calls → TwiML response."""
-    host = request.headers.get("host", "localhost")
-    xml = twilio_provider.generate_call_response(host)
+    # The stream must come back to this worker, which holds the call's warm STT session
+    host = WORKER_HOST or request.headers.get("host", "localhost")
+    session_key = uuid.uuid4().hex
+    if not request.app.state.admission.admit(session_key):
+        return await busy_response(request, twilio_provider)
+    # Start the Deepgram handshake and the persona load now; the media stream claims both by key
+    request.app.state.stt_pool.reserve(session_key)
+    request.app.state.personas.assign(session_key, await dialed_number(request))
+    await registry_call(request.app.state.registry.reserve, session_key)
+    xml = twilio_provider.generate_call_response(host, session_key)
     return HTMLResponse(content=xml, media_type="application/xml")
 
 @app.websocket("/media-stream/twilio")
-async def handle_twilio_stream(websocket: WebSocket):
+@app.websocket("/media-stream/twilio/{session_key}")
+async def handle_twilio_stream(websocket: WebSocket, session_key: str = None):
     """WebSocket for Twilio media stream."""
-    print("📞 [Twilio] Client connected")
+    log.info("ws_connected", "📞 [Twilio] Client connected")
     await websocket.accept()
     from bot import VoiceBot
-    bot = VoiceBot(provider=twilio_provider)
-    await bot.start(websocket)
+    bot = VoiceBot(
+        provider=twilio_provider,
+        clients=websocket.app.state.clients,
+        tts_cache=websocket.app.state.tts_cache,
+        stt_pool=websocket.app.state.stt_pool,
+        fillers=websocket.app.state.fillers,
+        registry=websocket.app.state.registry,
+        persona=await websocket.app.state.personas.claim(session_key),
+    )
+    # Connected calls are always served; admission happened at the webhook
+    websocket.app.state.admission.session_started(session_key)
+    try:
+        await bot.start(websocket, session_key)
+    finally:
+        websocket.app.state.admission.session_ended()
 
 # ── Telnyx endpoints ──────────────────────────────────────────
 @app.api_route("/incoming-call/telnyx", methods=["GET", "POST"])
 async def handle_telnyx_call(request: Request):
     """Handle incoming Telnyx calls → TeXML response."""
     # Prefer forwarded host headers (ngrok sets these)
-    host = (
+    host = WORKER_HOST or (
         request.headers.get("x-forwarded-host")
         or request.headers.get("x-original-host")
         or request.headers.get("host", "localhost")
     )
-    xml = telnyx_provider.generate_call_response(host)
-    print(f"📞 [Telnyx] Incoming call webhook hit. Host: {host}")
-    print(f"📞 [Telnyx] TeXML response:\n{xml}")
+    session_key = uuid.uuid4().hex
+    if not request.app.state.admission.admit(session_key):
+        return await busy_response(request, telnyx_provider)
+    request.app.state.stt_pool.reserve(session_key)
+    request.app.state.personas.assign(session_key, await dialed_number(request))
+    await registry_call(request.app.state.registry.reserve, session_key)
+    xml = telnyx_provider.generate_call_response(host, session_key)
+    log.info("webhook", f"📞 [Telnyx] Incoming call webhook hit. Host: {host}")
+    log.debug("webhook_response", f"📞 [Telnyx] TeXML response:\n{xml}")
     return HTMLResponse(content=xml, media_type="application/xml")
 
 @app.websocket("/media-stream/telnyx")
-async def handle_telnyx_stream(websocket: WebSocket):
+@app.websocket("/media-stream/telnyx/{session_key}")
+async def handle_telnyx_stream(websocket: WebSocket, session_key: str = None):
     """WebSocket for Telnyx media stream."""
-    print("📞 [Telnyx] Client connected")
+    log.info("ws_connected", "📞 [Telnyx] Client connected")
     await websocket.accept()
     from bot import VoiceBot
-    bot = VoiceBot(provider=telnyx_provider)
-    await bot.start(websocket)
+    bot = VoiceBot(
+        provider=telnyx_provider,
+        clients=websocket.app.state.clients,
+        tts_cache=websocket.app.state.tts_cache,
+        stt_pool=websocket.app.state.stt_pool,
+        fillers=websocket.app.state.fillers,
+        registry=websocket.app.state.registry,
+        persona=await websocket.app.state.personas.claim(session_key),
+    )
+    # Connected calls are always served; admission happened at the webhook
+    websocket.app.state.admission.session_started(session_key)
+    try:
+        await bot.start(websocket, session_key)
+    finally:
+        websocket.app.state.admission.session_ended()
 
 # ── Legacy endpoints (backwards compatibility) ────────────────
 @app.api_route("/incoming-call", methods=["GET", "POST"])
@@ -74,5 +374,21 @@ async def handle_media_stream_legacy(websocket: WebSocket):
     """Legacy endpoint — redirects to Twilio handler."""
     await handle_twilio_stream(websocket)
 
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains calls on shutdown before closing connections.
+
+    Plain uvicorn closes every WebSocket as soon as shutdown starts; this keeps
+    serving (webhooks now get busy responses, /ready returns 503) until the
+    active calls hang up or DRAIN_TIMEOUT_S runs out.
+    """
+
+    async def shutdown(self, sockets=None):
+        drain = asyncio.create_task(app.state.admission.drain(DRAIN_TIMEOUT_S))
+        # A second Ctrl+C (force_exit) stops waiting
+        while not drain.done() and not self.force_exit:
+            await asyncio.wait({drain}, timeout=0.1)
+        drain.cancel()
+        await super().shutdown(sockets)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    asyncio.run(DrainingServer(uvicorn.Config(app, host="0.0.0.0", port=PORT)).serve())
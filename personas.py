@@ -0,0 +1,331 @@
+"""
+Per-tenant personas, routed by dialed number.
+A persona is what makes one deployment one business: system prompt, voice,
+LLM model and parameters, greeting, FAQ entries and apology line. Each lives
+in PERSONA_DIR as <digits of the dialed number>.json (symlink the file for a
+tenant with several numbers); numbers without one get the built-in persona
+from system_prompt.py.
+
+A persona is loaded and compiled the first time one of its numbers rings —
+prompt token count, FAQ index, greeting and apology audio — and then shared
+by every concurrent call for that tenant. Compiled personas sit in an LRU
+bounded by bytes, so memory follows the tenants with recent calls rather
+than the number of files in the directory.
+
+    {
+      "system_prompt": "You are the receptionist at ...",
+      "greeting": "Thanks for calling ..., how can I help?",
+      "voice": "aura-luna-en",
+      "tts_params": {},
+      "llm_model": "llama-3.1-8b-instant",
+      "llm_params": {"temperature": 0.5},
+      "faq": [{"questions": ["When are you open"], "answer": "..."}],
+      "apology": "..."
+    }
+
+Every field but system_prompt is optional.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from faq import FAQIndex
+from fillers import trim_to_frames
+from history import count_tokens
+from system_prompt import SYSTEM_PROMPT, FAQ_ENTRIES, APOLOGY_MESSAGE
+from log import get_logger
+
+log = get_logger("personas")
+
+DEFAULT_PERSONA_ID = "default"
+
+# Webhook → media stream hand-offs remembered at once (the oldest are dropped)
+MAX_ASSIGNED = 1024
+
+# Numbers without a persona file get the default without another file lookup for this
+# long (a file added meanwhile takes effect after it); at most this many are remembered
+UNKNOWN_TTL = 60.0
+MAX_UNKNOWN = 4096
+
+# A cold tenant's first call waits this long for its greeting and apology clips; a
+# slower clip finishes in the background and calls meanwhile go without it
+CLIP_TIMEOUT_S = 2.0
+
+_NON_DIGIT = re.compile(r"\D")
+
+
+def persona_key(number: str) -> str:
+    """Persona file stem for a dialed number: its digits ("+1 (555) 010-2000" → "15550102000")."""
+    return _NON_DIGIT.sub("", number or "")
+
+
+class Persona:
+    """One tenant's prompt, voice and model settings, plus what is compiled from them."""
+
+    def __init__(
+        self,
+        persona_id: str,
+        system_prompt: str,
+        voice: Optional[str] = None,
+        tts_params: dict = None,
+        llm_model: Optional[str] = None,
+        llm_params: dict = None,
+        greeting: str = "",
+        faq_entries: list = None,
+        apology: str = APOLOGY_MESSAGE,
+    ):
+        self.persona_id = persona_id
+        self.system_prompt = system_prompt
+        # Deepgram TTS model (None = the default voice) and extra /v1/speak query parameters
+        self.voice = voice
+        self.tts_params = tts_params or {}
+        # A fixed Groq model (None = llm_router picks per turn) and completion parameter overrides
+        self.llm_model = llm_model
+        self.llm_params = llm_params or {}
+        self.greeting = greeting
+        self.faq_entries = faq_entries or []
+        self.apology = apology
+
+        # Compiled once per persona (PersonaRegistry)
+        self.system_prompt_tokens = None
+        self.faq = None
+        self.greeting_audio = None
+        self.apology_audio = None
+
+    @classmethod
+    def from_dict(cls, persona_id: str, data: dict) -> "Persona":
+        return cls(
+            persona_id,
+            data["system_prompt"],
+            voice=data.get("voice"),
+            tts_params=data.get("tts_params"),
+            llm_model=data.get("llm_model"),
+            llm_params=data.get("llm_params"),
+            greeting=data.get("greeting", ""),
+            faq_entries=[(list(entry["questions"]), entry["answer"]) for entry in data.get("faq", [])],
+            apology=data.get("apology", APOLOGY_MESSAGE),
+        )
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size, once compiled."""
+        size = len(self.system_prompt) + len(self.greeting) + len(self.apology)
+        size += sum(len(answer) + sum(map(len, questions)) for questions, answer in self.faq_entries)
+        size += len(self.greeting_audio or b"") + len(self.apology_audio or b"")
+        if self.faq is not None:
+            size += self.faq.memory_bytes()
+        return size
+
+
+def default_persona() -> Persona:
+    """The built-in persona (system_prompt.py), for numbers without a persona file."""
+    return Persona(DEFAULT_PERSONA_ID, SYSTEM_PROMPT, faq_entries=FAQ_ENTRIES)
+
+
+class PersonaRegistry:
+    """Lazily loaded, compiled-once personas in a memory-bounded LRU."""
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        synthesize: Callable[[str, Persona], Awaitable[bytes]],
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        faq_threshold: Optional[float] = 0.55,
+        clip_timeout_s: float = CLIP_TIMEOUT_S,
+    ):
+        self.directory = directory
+        # (text, persona) → 8 kHz mulaw in the persona's voice (through the TTS cache)
+        self._synthesize = synthesize
+        self.max_memory_bytes = max_memory_bytes
+        # None = no local FAQ answers for any persona
+        self.faq_threshold = faq_threshold
+        self.clip_timeout_s = clip_timeout_s
+        # Always resident (outside the LRU)
+        self.default = default_persona()
+
+        self._cache = OrderedDict()
+        self._memory_bytes = 0
+        self._loading = {}
+        self._assigned = OrderedDict()
+        # Persona key → monotonic time its "no such file" (or failed load) result expires
+        self._unknown = OrderedDict()
+        self._background = set()
+
+        # Stats
+        self.hits = 0
+        self.loads = 0
+        self.unknown = 0
+        self.failed = 0
+        self.evicted = 0
+
+    async def start(self):
+        """Compile the built-in persona before the first call (its apology clip must be ready)."""
+        await self._compile(self.default, clip_timeout=None)
+
+    async def close(self):
+        for task in [*self._loading.values(), *self._background]:
+            task.cancel()
+
+    def assign(self, session_key: str, number: str):
+        """Webhook: start loading the dialed number's persona; the media stream claims it by key."""
+        key = persona_key(number)
+        if not key or not self.directory:
+            return
+        self._assigned[session_key] = key
+        while len(self._assigned) > MAX_ASSIGNED:
+            self._assigned.popitem(last=False)
+        if key not in self._cache and not self._known_unknown(key):
+            self._load_task(key)
+
+    async def claim(self, session_key: Optional[str]) -> Persona:
+        """The persona assigned to this call at webhook time (the default if none)."""
+        key = self._assigned.pop(session_key, None) if session_key else None
+        return await self.get(key)
+
+    async def get(self, key: Optional[str]) -> Persona:
+        if not key or not self.directory:
+            return self.default
+        persona = self._cache.get(key)
+        if persona is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return persona
+        if self._known_unknown(key):
+            self.hits += 1
+            return self.default
+        # Shielded: a caller hanging up mid-load must not cancel it for the others waiting
+        return await asyncio.shield(self._load_task(key))
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "unknown_cached": len(self._unknown),
+            "memory_bytes": self._memory_bytes,
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "loads": self.loads,
+            "unknown": self.unknown,
+            "failed": self.failed,
+            "evicted": self.evicted,
+        }
+
+    def _load_task(self, key: str) -> asyncio.Task:
+        """One load per persona, however many calls for it arrive meanwhile."""
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._loading[key] = task
+        return task
+
+    async def _load(self, key: str) -> Persona:
+        try:
+            path = os.path.join(self.directory, f"{key}.json")
+            try:
+                persona = await asyncio.to_thread(_read, key, path)
+            except FileNotFoundError:
+                self.unknown += 1
+                self._remember_unknown(key)
+                return self.default
+            await self._compile(persona, self.clip_timeout_s)
+        except Exception as e:
+            # (a broken file is not re-read and re-logged on every call until the entry expires)
+            self.failed += 1
+            self._remember_unknown(key)
+            log.warning("persona_failed", f"⚠️ Persona {key} failed to load ({e}); using the default", persona=key)
+            return self.default
+        finally:
+            self._loading.pop(key, None)
+        self.loads += 1
+        self._insert(key, persona)
+        log.info("persona_loaded", f"🎭 Persona {key} loaded ({persona.memory_bytes() // 1024} KB)", persona=key)
+        return persona
+
+    async def _compile(self, persona: Persona, clip_timeout: Optional[float]):
+        # Token count and FAQ vectors are CPU work: off the event loop
+        await asyncio.to_thread(self._prepare, persona)
+        # The greeting plays the moment the stream starts; the apology is the deadline cascade's last resort
+        clips = [self._clip(persona, "apology_audio", persona.apology, "apology", clip_timeout)]
+        if persona.greeting:
+            clips.append(self._clip(persona, "greeting_audio", persona.greeting, "greeting", clip_timeout))
+        await asyncio.gather(*clips)
+        if persona.faq is not None:
+            self._track(asyncio.create_task(self._prepare_faq_audio(persona)))
+
+    async def _clip(self, persona: Persona, attribute: str, text: str, what: str, timeout: Optional[float]):
+        """Synthesize persona.<attribute>, waiting at most timeout seconds (the rest runs in the background)."""
+        task = asyncio.create_task(self._audio(persona, text, what))
+        try:
+            setattr(persona, attribute, await asyncio.wait_for(asyncio.shield(task), timeout))
+            return
+        except TimeoutError:
+            log.warning(f"{what}_slow", f"⚠️ {what.capitalize()} clip for {persona.persona_id} not ready in {timeout:.1f} s; going on without it")
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        self._track(task)
+        task.add_done_callback(lambda done: done.cancelled() or self._late_clip(persona, attribute, done.result()))
+
+    def _late_clip(self, persona: Persona, attribute: str, audio: Optional[bytes]):
+        setattr(persona, attribute, audio)
+        if audio and self._cache.get(persona.persona_id) is persona:
+            self._memory_bytes += len(audio)
+
+    def _track(self, task: asyncio.Task):
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _prepare(self, persona: Persona):
+        persona.system_prompt_tokens = count_tokens(persona.system_prompt)
+        if self.faq_threshold is not None and persona.faq_entries:
+            persona.faq = FAQIndex(persona.faq_entries, threshold=self.faq_threshold)
+
+    async def _audio(self, persona: Persona, text: str, what: str) -> Optional[bytes]:
+        try:
+            return trim_to_frames(await self._synthesize(text, persona))
+        except Exception as e:
+            log.warning(f"{what}_unavailable", f"⚠️ {what.capitalize()} clip for {persona.persona_id} unavailable ({e})")
+            return None
+
+    async def _prepare_faq_audio(self, persona: Persona):
+        """Synthesize every FAQ answer into the TTS cache in the background (disk-backed, so once)."""
+        ready = 0
+        for answer in persona.faq.answers:
+            try:
+                await self._synthesize(answer, persona)
+                ready += 1
+            except Exception as e:
+                log.warning("faq_audio_failed", f"⚠️ FAQ audio failed ({e})")
+        log.info("faq_audio_ready", f"📚 FAQ audio ready for {ready}/{len(persona.faq.answers)} answers ({persona.persona_id})")
+
+    def _remember_unknown(self, key: str):
+        self._unknown[key] = time.monotonic() + UNKNOWN_TTL
+        while len(self._unknown) > MAX_UNKNOWN:
+            self._unknown.popitem(last=False)
+
+    def _known_unknown(self, key: str) -> bool:
+        """Whether key was recently found to have no usable persona file."""
+        expires = self._unknown.get(key)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._unknown[key]
+            return False
+        return True
+
+    def _insert(self, key: str, persona: Persona):
+        self._cache[key] = persona
+        self._memory_bytes += persona.memory_bytes()
+        # Evicted personas stay alive for the calls still holding them
+        while self._memory_bytes > self.max_memory_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._memory_bytes -= evicted.memory_bytes()
+            self.evicted += 1
+
+
+def _read(key: str, path: str) -> Persona:
+    with open(path, encoding="utf-8") as f:
+        return Persona.from_dict(key, json.load(f))
@@ -0,0 +1,171 @@
+"""
+Outbound audio sender.
+Cuts TTS audio into fixed 20 ms mulaw frames and paces them to the telephony
+socket in (slightly ahead of) real time, tracking how much the caller has heard.
+"""
+
+import time
+import base64
+import asyncio
+
+# 8 kHz mulaw: 1 byte per sample → 160 bytes per 20 ms frame
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000
+MULAW_SILENCE = 0xFF
+
+
+class AudioSender:
+    """Paced 20 ms frame writer for one response on a telephony media stream."""
+
+    def __init__(self, provider, websocket, stream_sid: str, lead_ms: int = 100, on_first_frame=None):
+        self.provider = provider
+        self.websocket = websocket
+        self.stream_sid = stream_sid
+        # How far ahead of real time we let the provider's jitter buffer run
+        self.lead_ms = lead_ms
+        # Called once, right after the first frame goes out (latency tracing)
+        self.on_first_frame = on_first_frame
+        # Audio queued ahead of the response proper (a filler); on_first_frame fires after it
+        self.lead_in_ms = 0
+
+        self._buffer = bytearray()
+        self._offset = 0
+        self._data_ready = asyncio.Event()
+        self._finished = False
+        self._pump_task = None
+        # Cleared while playback is held for a possible barge-in (see pause())
+        self._running = asyncio.Event()
+        self._running.set()
+        # Sent bytes kept in the buffer so a pause can rewind to what was heard
+        self._keep_bytes = (lead_ms // FRAME_MS + 1) * FRAME_BYTES
+
+        # Playback clock: monotonic time at which sent audio position 0 started playing
+        self._clock_start = None
+        self._stopped_ms = None
+        self._written = 0
+        self.queued_ms = 0
+        self.sent_ms = 0
+
+    @property
+    def played_ms(self) -> int:
+        """Milliseconds of audio the caller has (approximately) heard so far."""
+        if self._stopped_ms is not None:
+            return self._stopped_ms
+        if self._clock_start is None:
+            return 0
+        elapsed = (time.monotonic() - self._clock_start) * 1000
+        return int(min(self.sent_ms, elapsed))
+
+    def write(self, chunk: bytes):
+        """Queue raw mulaw bytes for playback; frames go out as soon as they are complete."""
+        if not chunk:
+            return
+        self._buffer += chunk
+        self._written += len(chunk)
+        self.queued_ms = self._written * 1000 // SAMPLE_RATE
+        self._data_ready.set()
+        if self._pump_task is None and self._running.is_set():
+            self._pump_task = asyncio.create_task(self._pump())
+
+    async def finish(self):
+        """Pad the final partial frame with silence and wait until everything is sent."""
+        self._finished = True
+        self._data_ready.set()
+        while True:
+            await self._running.wait()
+            if self._pump_task is None:
+                self._pump_task = asyncio.create_task(self._pump())
+            task = self._pump_task
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            # A pause cancels the pump mid-way; wait for resume() and carry on
+            if not task.cancelled() or self._stopped_ms is not None:
+                break
+        if not task.cancelled():
+            task.result()
+
+    def pause(self) -> bool:
+        """Hold playback after the provider's buffer was cleared (possible barge-in).
+
+        Rewinds to the frame the caller was hearing, so resume() replays
+        what the clear message discarded. Returns False if there is nothing
+        left to hold (all audio already sent, or stopped).
+        """
+        if self._stopped_ms is not None or not self._running.is_set():
+            return False
+        if self._finished and (self._pump_task is None or self._pump_task.done()):
+            return False
+        heard_ms = self.played_ms // FRAME_MS * FRAME_MS
+        self._running.clear()
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
+        rewind = min((self.sent_ms - heard_ms) * SAMPLE_RATE // 1000, self._offset)
+        self._offset -= rewind
+        self.sent_ms -= rewind * 1000 // SAMPLE_RATE
+        return True
+
+    def resume(self):
+        """Continue after a pause (the barge-in was a false alarm)."""
+        if self._running.is_set() or self._stopped_ms is not None:
+            return
+        self._running.set()
+        if self._pump_task is None and (self._buffer or self._finished):
+            self._pump_task = asyncio.create_task(self._pump())
+
+    def stop(self) -> int:
+        """Stop sending immediately (barge-in). Returns the milliseconds actually heard."""
+        if self._pump_task is not None and not self._pump_task.done():
+            self._pump_task.cancel()
+        if self._stopped_ms is None:
+            self._stopped_ms = self.played_ms
+        self._running.set()
+        self._buffer.clear()
+        self._offset = 0
+        return self._stopped_ms
+
+    async def _pump(self):
+        while True:
+            available = len(self._buffer) - self._offset
+            if available < FRAME_BYTES:
+                if self._finished:
+                    break
+                self._data_ready.clear()
+                await self._data_ready.wait()
+                continue
+            await self._send_frame(bytes(self._buffer[self._offset:self._offset + FRAME_BYTES]))
+            self._offset += FRAME_BYTES
+            # Trim sent bytes once in a while instead of on every frame
+            if self._offset >= 64 * FRAME_BYTES + self._keep_bytes:
+                del self._buffer[:self._offset - self._keep_bytes]
+                self._offset = self._keep_bytes
+
+        remainder = bytes(self._buffer[self._offset:])
+        if remainder:
+            await self._send_frame(remainder.ljust(FRAME_BYTES, bytes([MULAW_SILENCE])))
+        self._buffer.clear()
+        self._offset = 0
+
+    async def _send_frame(self, frame: bytes):
+        now = time.monotonic()
+        if self._clock_start is None:
+            self._clock_start = now
+        elapsed_ms = (now - self._clock_start) * 1000
+        if elapsed_ms > self.sent_ms:
+            # Underrun: the caller already heard everything, restart the clock from here
+            self._clock_start = now - self.sent_ms / 1000
+        else:
+            ahead_ms = self.sent_ms - elapsed_ms
+            if ahead_ms > self.lead_ms:
+                await asyncio.sleep((ahead_ms - self.lead_ms) / 1000)
+
+        payload = base64.b64encode(frame).decode("ascii")
+        await self.websocket.send_text(self.provider.format_audio_response(self.stream_sid, payload))
+        self.sent_ms += FRAME_MS
+        if self.on_first_frame and self.sent_ms > self.lead_in_ms:
+            self.on_first_frame()
+            self.on_first_frame = None
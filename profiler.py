@@ -0,0 +1,85 @@
+"""
+On-demand sampling profiler for a live worker.
+A thread snapshots every other thread's Python stack (sys._current_frames)
+at a fixed rate for a bounded time and counts identical stacks. Nothing is
+instrumented and the event loop keeps running while it samples, so it is
+safe on a worker with live calls. The result is in collapsed-stack format
+("thread;outer;...;inner count" per line), which flamegraph.pl, speedscope
+and inferno read directly.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter
+
+# Upper bounds for a single request (a profile holds a thread and memory while it runs)
+MAX_SECONDS = 60.0
+MAX_HZ = 1000
+
+
+def _frame_name(frame) -> str:
+    # Function-level (its first line), so every line of a hot function lands in one frame
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfileBusy(Exception):
+    """Another profile is already running in this process."""
+
+
+class SamplingProfiler:
+    """One profile at a time; sampling happens off the event loop."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+        # Stats
+        self.runs = 0
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float = 10.0, hz: int = 100) -> str:
+        """Sample for `seconds` at `hz`; returns the collapsed stacks (hottest first)."""
+        if self._lock.locked():
+            raise ProfileBusy()
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        hz = min(max(hz, 1), MAX_HZ)
+        async with self._lock:
+            stacks = await asyncio.to_thread(sample_stacks, seconds, 1.0 / hz)
+        self.runs += 1
+        self.samples += sum(stacks.values())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def stats(self) -> dict:
+        return {"running": self.running, "runs": self.runs, "samples": self.samples}
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """Collapsed stack → sample count, for every thread but the calling one."""
+    me = threading.get_ident()
+    names = {}
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        frames = sys._current_frames()
+        if len(names) != len(frames):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == me:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_name(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(labels))] += 1
+        next_at += interval
+        time.sleep(max(next_at - time.perf_counter(), 0))
+    return stacks
@@ -3,9 +3,34 @@ Base telephony provider interface.
 Defines the contract that Twilio, Telnyx, and any future provider must implement.
 """
 
+import re
 from abc import ABC, abstractmethod
+from xml.sax.saxutils import escape
 from typing import Optional, Tuple
 
+# Compact-JSON markers for the media fast path (Twilio and Telnyx send compact JSON today)
+_MEDIA_EVENT_MARKER = '"event":"media"'
+_PAYLOAD_MARKER = '"payload":"'
+# The same keys with any whitespace around the colon, should a provider ever pretty-print
+_MEDIA_EVENT_PATTERN = re.compile(r'"event"\s*:\s*"media"')
+_PAYLOAD_PATTERN = re.compile(r'"payload"\s*:\s*"([^"\\]*)"')
+
+
+class MediaPathStats:
+    """How inbound media frames were parsed, process-wide."""
+
+    def __init__(self):
+        # Compact-marker scan, whitespace-tolerant scan, full JSON parse (parse_event)
+        self.compact = 0
+        self.spaced = 0
+        self.parsed = 0
+
+    def as_dict(self) -> dict:
+        return {"compact": self.compact, "spaced": self.spaced, "parsed": self.parsed}
+
+
+media_path_stats = MediaPathStats()
+
 
 class TelephonyProvider(ABC):
     """Abstract base class for telephony providers."""
@@ -25,11 +50,38 @@ class TelephonyProvider(ABC):
             (event_type, data) where event_type is one of:
             - "start"  → call started, data has "stream_sid"
             - "media"  → audio chunk, data has "payload" (base64)
+            - "mark"   → queued audio finished playing, data has "name"
             - "stop"   → call ended
             - "ignore" → unrecognized event, skip it
         """
         ...
 
+    def extract_media_payload(self, raw_message: str) -> Optional[str]:
+        """
+        Fast path for the ~50 media messages per second per call: return the
+        base64 payload of an inbound media message by string search, without
+        a full JSON parse. Returns None for anything else (or anything the
+        scan can't handle safely) — callers then fall back to parse_event().
+        """
+        if _MEDIA_EVENT_MARKER in raw_message:
+            start = raw_message.find(_PAYLOAD_MARKER)
+            if start >= 0:
+                start += len(_PAYLOAD_MARKER)
+                end = raw_message.find('"', start)
+                payload = raw_message[start:end]
+                # Escaped characters (e.g. "\/") mean the payload isn't raw base64
+                if end >= 0 and "\\" not in payload:
+                    media_path_stats.compact += 1
+                    return payload
+        # Not compact JSON: a slower, whitespace-tolerant scan (non-media events fail the first test)
+        if '"media"' not in raw_message or not _MEDIA_EVENT_PATTERN.search(raw_message):
+            return None
+        match = _PAYLOAD_PATTERN.search(raw_message)
+        if match is None:
+            return None
+        media_path_stats.spaced += 1
+        return match.group(1)
+
     @abstractmethod
     def format_audio_response(self, stream_sid: str, base64_audio: str) -> str:
         """
@@ -55,15 +107,37 @@ class TelephonyProvider(ABC):
         ...
 
     @abstractmethod
-    def generate_call_response(self, host: str) -> str:
+    def generate_call_response(self, host: str, session_key: Optional[str] = None) -> str:
         """
         Generate the XML response for an incoming call webhook
         that connects the call to the media stream WebSocket.
 
         Args:
             host: The server hostname (for constructing the WSS URL)
+            session_key: Optional per-call key appended to the stream path,
+                so the media stream can claim resources reserved at webhook time
 
         Returns:
             XML string (TwiML or TeXML)
         """
         ...
+
+    def generate_busy_response(self, redirect_url: Optional[str] = None) -> str:
+        """
+        Generate the XML response for an incoming call this worker has no
+        capacity for: redirect the call's webhook to redirect_url (another
+        worker or region) if given, otherwise reject it as busy.
+
+        The default is the <Redirect>/<Reject> pair TwiML and TeXML share;
+        providers with a different call-control language override it.
+
+        Returns:
+            XML string (TwiML or TeXML)
+        """
+        verb = f'<Redirect method="POST">{escape(redirect_url)}</Redirect>' if redirect_url else '<Reject reason="busy"/>'
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            "<Response>"
+            f"{verb}"
+            "</Response>"
+        )
@@ -4,8 +4,12 @@ Parses Telnyx TeXML Media Stream WebSocket messages and generates TeXML.
 """
 
 import json
-from typing import Tuple
+import logging
+from typing import Optional, Tuple
 from . import TelephonyProvider
+from log import get_logger
+
+log = get_logger("telnyx")
 
 
 class TelnyxProvider(TelephonyProvider):
@@ -19,8 +23,9 @@ class TelnyxProvider(TelephonyProvider):
         event = data.get("event", "")
 
         # Debug: log first message of each type to discover field names
-        if event in ("connected", "start", "stop"):
-            print(f"🔍 [Telnyx] event={event} payload={json.dumps(data, indent=2)}")
+        # (only serialized at DEBUG: this runs on the call's event loop)
+        if event in ("connected", "start", "stop") and log.enabled(logging.DEBUG):
+            log.debug("telnyx_event", f"🔍 [Telnyx] event={event} payload={json.dumps(data, indent=2)}")
 
         if event == "start":
             # Telnyx may use "streamSid" or nested differently
@@ -42,7 +47,7 @@ class TelnyxProvider(TelephonyProvider):
             return "stop", {}
 
         elif event == "mark":
-            return "mark", {}
+            return "mark", {"name": data.get("mark", {}).get("name", "")}
 
         return "ignore", {}
 
@@ -68,7 +73,8 @@ class TelnyxProvider(TelephonyProvider):
             "mark": {"name": mark_name},
         })
 
-    def generate_call_response(self, host: str) -> str:
+    def generate_call_response(self, host: str, session_key: Optional[str] = None) -> str:
+        path = f"/media-stream/telnyx/{session_key}" if session_key else "/media-stream/telnyx"
         return (
             '<?xml version="1.0" encoding="UTF-8"?>'
             "<Response>"
@@ -76,7 +82,7 @@ class TelnyxProvider(TelephonyProvider):
             "<Pause length=\"1\"/>"
             "<Say>Okay, you can start talking!</Say>"
             "<Connect>"
-            f'<Stream url="wss://{host}/media-stream/telnyx"'
+            f'<Stream url="wss://{host}{path}"'
             ' track="inbound_track"'
             ' bidirectionalMode="rtp"'
             ' bidirectionalCodec="PCMU"'
@@ -4,7 +4,7 @@ Parses Twilio Media Stream WebSocket messages and generates TwiML.
 """
 
 import json
-from typing import Tuple
+from typing import Optional, Tuple
 from . import TelephonyProvider
 
 
@@ -28,7 +28,7 @@ class TwilioProvider(TelephonyProvider):
             return "stop", {}
 
         elif event == "mark":
-            return "mark", {}
+            return "mark", {"name": data.get("mark", {}).get("name", "")}
 
         return "ignore", {}
 
@@ -54,7 +54,8 @@ class TwilioProvider(TelephonyProvider):
             "mark": {"name": mark_name},
         })
 
-    def generate_call_response(self, host: str) -> str:
+    def generate_call_response(self, host: str, session_key: Optional[str] = None) -> str:
+        path = f"/media-stream/twilio/{session_key}" if session_key else "/media-stream/twilio"
         return (
             '<?xml version="1.0" encoding="UTF-8"?>'
             "<Response>"
@@ -62,7 +63,7 @@ class TwilioProvider(TelephonyProvider):
             "<Pause length=\"1\"/>"
             "<Say>Okay, you can start talking!</Say>"
             "<Connect>"
-            f'<Stream url="wss://{host}/media-stream/twilio"/>'
+            f'<Stream url="wss://{host}{path}"/>'
             "</Connect>"
             "</Response>"
         )
@@ -0,0 +1,183 @@
+"""
+Call recorder: everything a call received, with timestamps, in one file.
+Captures the caller's inbound audio (decoded mulaw frames), the other
+telephony events (start / mark / stop), every Deepgram STT message and every
+upstream HTTP exchange made on the call's behalf (Groq completions, Deepgram
+TTS audio), each chunk stamped with milliseconds since the call started.
+bench/replay.py plays a recording back through VoiceBot with no network, so
+pipeline changes can be benchmarked against real conversations.
+
+File format (.vbrec): a gzip stream of records, each
+
+    kind (u8) | channel (u16) | t_ms (u32) | length (u32) | payload
+
+little-endian. The first record is META (JSON). channel numbers HTTP
+exchanges (one REQUEST, RESPONSE, any number of BODY chunks, then END);
+it is 0 for everything else.
+
+Enable with RECORD_DIR=/path/to/recordings (one <call_id>.vbrec per call).
+"""
+
+import os
+import gzip
+import json
+import time
+import struct
+import asyncio
+import contextvars
+import httpx
+from typing import Iterator, Optional, Tuple
+
+FORMAT_VERSION = 1
+MAGIC = b"VBREC"
+HEADER = struct.Struct("<BHII")
+
+# Record kinds
+META = 0
+TELEPHONY = 1       # non-media telephony message (raw text)
+MEDIA = 2           # inbound caller audio (decoded mulaw)
+STT = 3             # Deepgram STT message (raw text)
+HTTP_REQUEST = 4    # {"method", "url", "body"}
+HTTP_RESPONSE = 5   # {"status", "headers"}
+HTTP_BODY = 6       # response body chunk, as received
+HTTP_END = 7
+
+# A runaway call stops recording here (about an hour of audio plus responses)
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class CallRecorder:
+    """In-memory record stream for one call; written out once at hang-up."""
+
+    def __init__(self, provider: str, max_bytes: int = MAX_BYTES):
+        self.started = time.monotonic()
+        self.max_bytes = max_bytes
+        self.truncated = False
+        self._buffer = bytearray(MAGIC)
+        self._exchanges = 0
+        self._add(META, 0, json.dumps({
+            "version": FORMAT_VERSION,
+            "provider": provider,
+            "recorded_at": time.time(),
+        }).encode())
+
+    def telephony(self, message: str):
+        self._add(TELEPHONY, 0, message.encode())
+
+    def media(self, audio):
+        self._add(MEDIA, 0, bytes(audio))
+
+    def stt(self, message):
+        self._add(STT, 0, message.encode() if isinstance(message, str) else message)
+
+    def http_request(self, request: httpx.Request) -> int:
+        """Start an exchange; returns its channel number."""
+        self._exchanges += 1
+        channel = self._exchanges % 65536
+        try:
+            body = request.content.decode("utf-8", "replace")
+        except httpx.RequestNotRead:
+            body = ""  # streaming upload (none of our upstream calls send one)
+        self._add(HTTP_REQUEST, channel, json.dumps({
+            "method": request.method,
+            "url": str(request.url),
+            "body": body,
+        }).encode())
+        return channel
+
+    def http_response(self, channel: int, response: httpx.Response):
+        self._add(HTTP_RESPONSE, channel, json.dumps({
+            "status": response.status_code,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers.raw],
+        }).encode())
+
+    def http_body(self, channel: int, chunk: bytes):
+        self._add(HTTP_BODY, channel, chunk)
+
+    def http_end(self, channel: int):
+        self._add(HTTP_END, channel, b"")
+
+    async def save(self, path: str):
+        """Compress and write the recording (off the event loop)."""
+        data = bytes(self._buffer)
+        await asyncio.to_thread(_write, path, data)
+
+    def _add(self, kind: int, channel: int, payload: bytes):
+        if self.truncated:
+            return
+        if len(self._buffer) + HEADER.size + len(payload) > self.max_bytes:
+            self.truncated = True
+            return
+        t_ms = int((time.monotonic() - self.started) * 1000)
+        self._buffer += HEADER.pack(kind, channel, t_ms, len(payload))
+        self._buffer += payload
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        f.write(data)
+
+
+# ── Per-call binding (for code that doesn't know which call it serves) ──
+_recorder = contextvars.ContextVar("recorder", default=None)
+
+
+def bind_recorder(recorder: Optional[CallRecorder]):
+    """Record upstream HTTP made by the current task (and tasks it creates from now on)."""
+    _recorder.set(recorder)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Pass-through transport that copies exchanges into the calling task's recorder, if any."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        recorder = _recorder.get()
+        if recorder is None:
+            return await self._transport.handle_async_request(request)
+        channel = recorder.http_request(request)
+        response = await self._transport.handle_async_request(request)
+        recorder.http_response(channel, response)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, recorder, channel),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, recorder: CallRecorder, channel: int):
+        self._stream = stream
+        self._recorder = recorder
+        self._channel = channel
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._recorder.http_body(self._channel, chunk)
+            yield chunk
+
+    async def aclose(self):
+        self._recorder.http_end(self._channel)
+        await self._stream.aclose()
+
+
+# ── Reading ──
+def read_recording(path: str) -> Iterator[Tuple[int, int, int, bytes]]:
+    """(kind, channel, t_ms, payload) for every record in a .vbrec file."""
+    with gzip.open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a call recording")
+    offset = len(MAGIC)
+    while offset + HEADER.size <= len(data):
+        kind, channel, t_ms, length = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        yield kind, channel, t_ms, data[offset:offset + length]
+        offset += length
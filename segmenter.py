@@ -0,0 +1,63 @@
+"""
+Sentence / clause segmenter for streamed LLM output.
+Cuts the token stream into speakable chunks so TTS can start on the first
+sentence while the LLM is still generating the rest.
+"""
+
+import re
+from typing import List
+
+# A sentence ends on . ! or ? (optionally followed by a closing quote/bracket) and whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+# Clause boundaries: only used once a segment is long enough to sound natural on its own
+_CLAUSE_END = re.compile(r"[,;:—]\s+")
+
+
+class SentenceSegmenter:
+    """Accumulates LLM deltas and yields complete sentences / long clauses."""
+
+    def __init__(self, min_clause_chars: int = 60, first_clause_chars: int = 25):
+        self.min_clause_chars = min_clause_chars
+        # The first segment is allowed to be shorter: time-to-first-audio matters most
+        self.first_clause_chars = first_clause_chars
+        self._buffer = ""
+        self._emitted = 0
+
+    def feed(self, delta: str) -> List[str]:
+        """Add a token delta; return any segments that are now complete."""
+        self._buffer += delta
+        segments = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            segment = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            if segment:
+                segments.append(segment)
+                self._emitted += 1
+        return segments
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the LLM stream is done."""
+        segment = self._buffer.strip()
+        self._buffer = ""
+        if not segment:
+            return []
+        self._emitted += 1
+        return [segment]
+
+    def _find_cut(self):
+        match = _SENTENCE_END.search(self._buffer)
+        if match:
+            return match.end()
+
+        threshold = self.first_clause_chars if self._emitted == 0 else self.min_clause_chars
+        if len(self._buffer) < threshold:
+            return None
+        # Cut at the first clause boundary past the threshold
+        for match in _CLAUSE_END.finditer(self._buffer):
+            if match.start() >= threshold - 1:
+                return match.end()
+        return None
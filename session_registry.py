@@ -0,0 +1,296 @@
+"""
+Cluster-wide registry of workers and the calls they own.
+Every worker heartbeats its capacity (active calls, spare slots) and
+records each call it takes: the session key handed out by its webhook and,
+once the media stream starts, the provider's stream_sid. That gives:
+
+- sticky routing: the webhook points the media stream at the worker that
+  reserved the call's pre-warmed STT session (its WORKER_HOST), and a full
+  worker redirects the webhook to the live peer with the most spare room;
+- misrouting detection: a stream that lands on a worker other than the one
+  that reserved it is still served (cold STT), and counted;
+- cluster metrics: active calls and capacity summed over live workers.
+
+Backends: "memory" (one process) and "sqlite:///path.db" (all workers on a
+box share one WAL-mode file). Other backends (e.g. a network store for
+many boxes) implement the same handful of _methods.
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+from log import get_logger
+
+log = get_logger("session_registry")
+
+HEARTBEAT_INTERVAL = 2.0
+# A worker that hasn't heartbeat for this long is considered gone (its sessions are dropped)
+WORKER_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+# A webhook reservation whose media stream never arrived is dropped after this long
+RESERVATION_TTL = 60.0
+
+
+class SessionRegistry(ABC):
+    """Shared worker/session bookkeeping; subclasses provide the storage."""
+
+    def __init__(self, worker_id: str, worker_host: Optional[str] = None):
+        self.worker_id = worker_id
+        # host[:port] the telephony provider can reach this worker at (None = the request's Host)
+        self.worker_host = worker_host
+        self._capacity = None
+        self._heartbeat = None
+        # Last cluster snapshot, refreshed by the heartbeat (read synchronously by /stats)
+        self.cluster = {}
+
+        # Stats
+        self.misrouted = 0
+        self.redirected = 0
+
+    # ── Lifecycle ──
+    async def start(self, capacity: Callable[[], dict]):
+        """Register this worker; capacity() returns {"active", "spare", "draining"} for heartbeats."""
+        self._capacity = capacity
+        await self._beat()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def close(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        await self._call(self._remove_worker, self.worker_id)
+
+    # ── Sessions ──
+    async def reserve(self, session_key: str):
+        """The webhook on this worker handed out session_key."""
+        await self._call(self._put_session, session_key, None, self.worker_id, "reserved")
+
+    async def attach(self, session_key: str, stream_sid: str):
+        """The call's media stream started on this worker."""
+        owner = await self._call(self._session_owner, session_key)
+        if owner is not None and owner != self.worker_id:
+            self.misrouted += 1
+            log.warning("misrouted", f"🔀 Stream {stream_sid} was reserved by {owner} but landed on {self.worker_id}")
+        await self._call(self._put_session, session_key, stream_sid, self.worker_id, "active")
+
+    async def release(self, session_key: str):
+        await self._call(self._remove_session, session_key)
+
+    async def owner(self, session_key: str) -> Optional[str]:
+        """Worker id that owns the call (by session key or stream_sid)."""
+        return await self._call(self._session_owner, session_key)
+
+    # ── Routing ──
+    async def best_peer(self) -> Optional[dict]:
+        """The live, non-draining peer with the most spare capacity (None if all are full)."""
+        peers = [
+            worker for worker in await self._call(self._live_workers, time.time() - WORKER_TIMEOUT)
+            if worker["worker_id"] != self.worker_id and worker["host"]
+            and worker["spare"] > 0 and not worker["draining"]
+        ]
+        return max(peers, key=lambda worker: worker["spare"], default=None)
+
+    def stats(self) -> dict:
+        return {**self.cluster, "misrouted": self.misrouted, "redirected": self.redirected}
+
+    # ── Internals ──
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await self._beat()
+            except Exception as e:
+                log.warning("heartbeat_failed", f"⚠️ Session registry heartbeat failed ({e})")
+
+    async def _beat(self):
+        capacity = self._capacity()
+        now = time.time()
+        await self._call(
+            self._put_worker, self.worker_id, self.worker_host,
+            capacity["active"], capacity["spare"], capacity["draining"], now,
+        )
+        await self._call(self._remove_dead_workers, now - WORKER_TIMEOUT)
+        await self._call(self._remove_stale_reservations, now - RESERVATION_TTL)
+        workers = await self._call(self._live_workers, now - WORKER_TIMEOUT)
+        self.cluster = {
+            "workers": len(workers),
+            "active_calls": sum(worker["active"] for worker in workers),
+            "spare": sum(worker["spare"] for worker in workers if not worker["draining"]),
+            "sessions": await self._call(self._session_count),
+        }
+
+    async def _call(self, fn, *args):
+        return fn(*args)
+
+    @abstractmethod
+    def _put_worker(self, worker_id: str, host: Optional[str], active: int, spare: int, draining: bool, at: float): ...
+
+    @abstractmethod
+    def _remove_worker(self, worker_id: str): ...
+
+    @abstractmethod
+    def _remove_dead_workers(self, before: float): ...
+
+    @abstractmethod
+    def _remove_stale_reservations(self, before: float): ...
+
+    @abstractmethod
+    def _live_workers(self, since: float) -> List[dict]: ...
+
+    @abstractmethod
+    def _put_session(self, key: str, stream_sid: Optional[str], worker_id: str, state: str): ...
+
+    @abstractmethod
+    def _session_owner(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def _remove_session(self, key: str): ...
+
+    @abstractmethod
+    def _session_count(self) -> int: ...
+
+
+class MemoryRegistry(SessionRegistry):
+    """Single-process registry (the default; nothing is shared)."""
+
+    def __init__(self, worker_id: str, worker_host: Optional[str] = None):
+        super().__init__(worker_id, worker_host)
+        self._workers = {}
+        self._sessions = {}
+
+    def _put_worker(self, worker_id, host, active, spare, draining, at):
+        self._workers[worker_id] = {
+            "worker_id": worker_id, "host": host, "active": active,
+            "spare": spare, "draining": draining, "heartbeat_at": at,
+        }
+
+    def _remove_worker(self, worker_id):
+        self._workers.pop(worker_id, None)
+        self._sessions = {key: s for key, s in self._sessions.items() if s["worker_id"] != worker_id}
+
+    def _remove_dead_workers(self, before):
+        for worker_id in [w for w, info in self._workers.items() if info["heartbeat_at"] < before]:
+            self._remove_worker(worker_id)
+
+    def _remove_stale_reservations(self, before):
+        self._sessions = {
+            key: s for key, s in self._sessions.items()
+            if s["state"] != "reserved" or s["updated_at"] >= before
+        }
+
+    def _live_workers(self, since):
+        return [dict(info) for info in self._workers.values() if info["heartbeat_at"] >= since]
+
+    def _put_session(self, key, stream_sid, worker_id, state):
+        self._sessions[key] = {
+            "stream_sid": stream_sid, "worker_id": worker_id, "state": state, "updated_at": time.time(),
+        }
+
+    def _session_owner(self, key):
+        session = self._sessions.get(key)
+        if session is None:
+            session = next((s for s in self._sessions.values() if s["stream_sid"] == key), None)
+        return session["worker_id"] if session else None
+
+    def _remove_session(self, key):
+        self._sessions.pop(key, None)
+
+    def _session_count(self):
+        return len(self._sessions)
+
+
+class SQLiteRegistry(SessionRegistry):
+    """Registry in a SQLite file shared by every worker on the box (WAL mode, off-loop queries)."""
+
+    def __init__(self, path: str, worker_id: str, worker_host: Optional[str] = None):
+        super().__init__(worker_id, worker_host)
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, host TEXT,"
+                " active INTEGER, spare INTEGER, draining INTEGER, heartbeat_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_key TEXT PRIMARY KEY, stream_sid TEXT,"
+                " worker_id TEXT, state TEXT, updated_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_stream_sid ON sessions (stream_sid)")
+
+    async def close(self):
+        await super().close()
+        self._db.close()
+
+    async def _call(self, fn, *args):
+        # Queries are tiny, but a locked database must never stall the event loop
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _put_worker(self, worker_id, host, active, spare, draining, at):
+        self._db.execute(
+            "INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?, ?, ?)",
+            (worker_id, host, active, spare, int(draining), at),
+        )
+
+    def _remove_worker(self, worker_id):
+        self._db.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+        self._db.execute("DELETE FROM sessions WHERE worker_id = ?", (worker_id,))
+
+    def _remove_dead_workers(self, before):
+        dead = [row[0] for row in self._db.execute("SELECT worker_id FROM workers WHERE heartbeat_at < ?", (before,))]
+        for worker_id in dead:
+            self._remove_worker(worker_id)
+
+    def _remove_stale_reservations(self, before):
+        self._db.execute("DELETE FROM sessions WHERE state = 'reserved' AND updated_at < ?", (before,))
+
+    def _live_workers(self, since):
+        rows = self._db.execute(
+            "SELECT worker_id, host, active, spare, draining, heartbeat_at FROM workers WHERE heartbeat_at >= ?",
+            (since,),
+        )
+        return [
+            {"worker_id": w, "host": h, "active": a, "spare": s, "draining": bool(d), "heartbeat_at": at}
+            for w, h, a, s, d, at in rows
+        ]
+
+    def _put_session(self, key, stream_sid, worker_id, state):
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+            (key, stream_sid, worker_id, state, time.time()),
+        )
+
+    def _session_owner(self, key):
+        row = self._db.execute(
+            "SELECT worker_id FROM sessions WHERE session_key = ? OR stream_sid = ? LIMIT 1", (key, key),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _remove_session(self, key):
+        self._db.execute("DELETE FROM sessions WHERE session_key = ?", (key,))
+
+    def _session_count(self):
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def create_registry(url: str, worker_id: str, worker_host: Optional[str] = None) -> SessionRegistry:
+    """Registry backend from a URL: memory, or sqlite:///path/to/registry.db."""
+    if url in ("", "memory"):
+        return MemoryRegistry(worker_id, worker_host)
+    if url.startswith("sqlite:///"):
+        return SQLiteRegistry(url[len("sqlite:///"):], worker_id, worker_host)
+    raise ValueError(f"Unknown session registry: {url}")
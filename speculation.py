@@ -0,0 +1,222 @@
+"""
+Speculative LLM generation.
+Once the interim transcript has been stable for a short window, the Groq
+request is started early. If the final transcript matches, the already
+streaming (or finished) completion is committed; otherwise it is cancelled.
+So is a match whose conversation changed after the request went out (a
+barge-in trimmed the last answer, the rolling summary landed): its reply
+would be written from stale context.
+"""
+
+import re
+import time
+import asyncio
+from typing import Callable, List, Optional
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Case/punctuation-insensitive form used to match interim and final transcripts."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+class SpeculationStats:
+    """Process-wide counters for the cost/latency trade-off of speculation."""
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        # Matched the final transcript, but the history had changed since (also counted as misses)
+        self.stale = 0
+        self.wasted_tokens = 0
+        self.used_tokens = 0
+
+    def as_dict(self) -> dict:
+        decided = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / decided, 4) if decided else 0.0,
+            "stale": self.stale,
+            "wasted_tokens": self.wasted_tokens,
+            "used_tokens": self.used_tokens,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """One early completion; buffers deltas so they can be replayed when committed."""
+
+    def __init__(self, transcript: str):
+        self.transcript = transcript
+        self.key = normalize_transcript(transcript)
+        self.deltas: List[str] = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self.started_at = None
+        self.first_delta_at = None
+        # History version its messages were built from
+        self.context_version = None
+        self._changed = asyncio.Event()
+
+    async def run(self, groq_client, messages: list, params: dict):
+        self.started_at = time.monotonic()
+        try:
+            stream = await groq_client.chat.completions.create(
+                messages=messages, stream=True, **params,
+            )
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if self.first_delta_at is None:
+                            self.first_delta_at = time.monotonic()
+                        self.deltas.append(delta)
+                        self._changed.set()
+            finally:
+                await stream.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def wait_started(self):
+        """Wait for the first delta (or the end of the request)."""
+        while not self.deltas and not self.done:
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def stream(self):
+        """Yield every delta: the buffered ones first, then live ones as they arrive."""
+        index = 0
+        while True:
+            while index < len(self.deltas):
+                yield self.deltas[index]
+                index += 1
+            if self.done:
+                if self.error:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class Speculator:
+    """Per-call speculation state driven by interim and final transcripts."""
+
+    def __init__(
+        self,
+        groq_client,
+        build_messages: Callable[[str], list],
+        params: dict,
+        window_ms: int = 300,
+        stats: SpeculationStats = speculation_stats,
+        choose_model: Optional[Callable[[str], str]] = None,
+        context_version: Optional[Callable[[], int]] = None,
+    ):
+        self.groq_client = groq_client
+        self.build_messages = build_messages
+        self.params = params
+        # Per-transcript model choice (the router); otherwise params["model"]
+        self.choose_model = choose_model
+        # Current history version (None = don't check for stale context)
+        self.context_version = context_version
+        self.window_ms = window_ms
+        self.stats = stats
+
+        self._pending_key = None
+        self._timer = None
+        self._current: Optional[Speculation] = None
+
+    def observe(self, transcript: str):
+        """Feed an interim transcript; (re)arms the stability timer when the text changes."""
+        key = normalize_transcript(transcript)
+        if not key or key == self._pending_key:
+            return
+        self._pending_key = key
+        if self._current and self._current.key != key:
+            self._discard()
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._start_when_stable(transcript))
+
+    def claim(self, transcript: str) -> Optional[Speculation]:
+        """Final transcript arrived: return the matching speculation, or cancel a stale one.
+
+        A returned speculation is passed to adopt() (or reject()) when its answer is due.
+        """
+        self._cancel_timer()
+        speculation = self._current
+        self._current = None
+        if speculation is None:
+            return None
+        if speculation.transcript == transcript or speculation.key == normalize_transcript(transcript):
+            return speculation
+        self.reject(speculation)
+        return None
+
+    def adopt(self, speculation: Speculation) -> Optional[Speculation]:
+        """Use a claimed speculation, unless the history changed since its request was built."""
+        if self.context_version is not None and speculation.context_version != self.context_version():
+            self.stats.stale += 1
+            self.reject(speculation)
+            return None
+        self.stats.hits += 1
+        self.stats.used_tokens += len(speculation.deltas)
+        return speculation
+
+    def reject(self, speculation: Speculation):
+        """A claimed speculation that won't be used after all."""
+        self.stats.misses += 1
+        self._waste(speculation)
+
+    def cancel(self):
+        """Drop any pending or running speculation (barge-in, hang-up)."""
+        self._cancel_timer()
+        if self._current:
+            self.stats.misses += 1
+            self._waste(self._current)
+            self._current = None
+
+    async def _start_when_stable(self, transcript: str):
+        await asyncio.sleep(self.window_ms / 1000)
+        self._timer = None
+        speculation = Speculation(transcript)
+        if self.context_version:
+            speculation.context_version = self.context_version()
+        params = self.params
+        if self.choose_model:
+            params = {**params, "model": self.choose_model(transcript)}
+        speculation.task = asyncio.create_task(
+            speculation.run(self.groq_client, self.build_messages(transcript), params)
+        )
+        self._current = speculation
+        self.stats.started += 1
+
+    def _discard(self):
+        self.stats.misses += 1
+        self._waste(self._current)
+        self._current = None
+
+    def _cancel_timer(self):
+        self._pending_key = None
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _waste(self, speculation: Speculation):
+        if speculation.task and not speculation.task.done():
+            speculation.task.cancel()
+        # Streamed deltas are ~1 token each
+        self.stats.wasted_tokens += len(speculation.deltas)
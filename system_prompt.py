@@ -51,3 +51,94 @@ SKILLS:
 - Cloud/DevOps: GCP, AWS, Docker, Kubernetes, Terraform, CI/CD.
 - Databases: PostgreSQL, MySQL, MongoDB, Kafka.
 """
+
+# Curated answers for the questions recruiters ask most, derived from the context
+# above. faq.py answers these locally (no LLM call); keep them in the same
+# spoken, concise style. Each entry: (example phrasings, answer).
+FAQ_ENTRIES = [
+    (
+        ["Where does Omkar work", "Where is he working right now", "Who is his current employer",
+         "What company does he work for", "What is his current job", "Where is Omkar working these days"],
+        "Omkar is currently a Software Engineer at Ford Motor Company in Long Beach, California, where he's been since July 2025.",
+    ),
+    (
+        ["What does he do at Ford", "What is his role at Ford", "What does he work on at Ford",
+         "Tell me about his job at Ford"],
+        "At Ford he builds cost visualization tools in Next.js for datasets of over half a million records, and FastAPI backend services with 99.9 percent availability. He also runs data pipelines processing about 300 thousand records a day on GCP.",
+    ),
+    (
+        ["How many years of experience does he have", "How much experience does he have",
+         "How long has he been a software engineer", "How senior is he", "How many years has he been working"],
+        "Omkar has more than four years of experience building full stack and cloud-native products.",
+    ),
+    (
+        ["Where is he based", "Where does he live", "What city is he in", "Where is he located", "Is he in LA"],
+        "He's based in Los Angeles, California.",
+    ),
+    (
+        ["What programming languages does he know", "What languages does he code in",
+         "What languages is he proficient in", "What is his experience with Python", "Does he know Java"],
+        "He works in Java, Python, TypeScript, JavaScript, and SQL.",
+    ),
+    (
+        ["What are his skills", "What is his tech stack", "What technologies does he use",
+         "What is he good at"],
+        "He's a full stack engineer: Next.js, React and Angular on the frontend, FastAPI, Spring Boot and Node.js on the backend, and GCP, AWS, Docker, Kubernetes and Terraform for cloud and infrastructure.",
+    ),
+    (
+        ["What backend frameworks does he know", "Does he know Spring Boot", "Does he know FastAPI",
+         "What backend experience does he have"],
+        "On the backend he uses Python with FastAPI, Java with Spring Boot, and Node.js.",
+    ),
+    (
+        ["What frontend frameworks does he know", "Does he know React", "Does he know Angular",
+         "What frontend experience does he have"],
+        "On the frontend he works with React, Next.js, and Angular. He even led a migration from Angular 2 to Angular 12.",
+    ),
+    (
+        ["What cloud experience does he have", "What cloud platforms has he used", "Does he know AWS", "Does he know GCP",
+         "Has he worked with Docker or Kubernetes", "Does he know Kubernetes", "What DevOps experience does he have"],
+        "He has hands-on experience with GCP and AWS, containerizes services with Docker and Cloud Run, uses Kubernetes, and manages infrastructure as code with Terraform and CI/CD pipelines.",
+    ),
+    (
+        ["What databases does he know", "What database experience does he have", "Does he know SQL databases"],
+        "He has worked with PostgreSQL, MySQL, and MongoDB, and with Kafka for streaming.",
+    ),
+    (
+        ["Where did he study", "What is his education", "What degree does he have",
+         "Where did he go to school", "Does he have a masters degree", "What did he study"],
+        "Omkar has a Master's in Computer Science from Arizona State University, and a bachelor's in Computer Science from Jawaharlal Nehru Technological University in India.",
+    ),
+    (
+        ["Where did he work before Ford", "What was his previous job", "Tell me about his past experience",
+         "What companies has he worked for"],
+        "Before Ford, he interned at Rocket Mortgage in 2025, and before that he spent almost three years as a Software Engineer at OpenText in Hyderabad.",
+    ),
+    (
+        ["What did he do at OpenText", "Tell me about his time at OpenText", "What was his role at OpenText",
+         "What did he do at Open Text"],
+        "At OpenText he built Java Spring Boot services, led an eight week migration from Angular 2 to Angular 12, moved features to the cloud with thirty percent less downtime, and mentored interns.",
+    ),
+    (
+        ["What did he do at Rocket Mortgage", "Tell me about his internship", "What was his internship"],
+        "At Rocket Mortgage he built an AI-assisted incident analysis service using GitHub, PagerDuty and Dynatrace, plus Angular components and Spring Boot APIs.",
+    ),
+    (
+        ["What projects has he built", "Tell me about his projects", "What side projects does he have",
+         "What has he built"],
+        "Two highlights: an H1B wage intelligence platform with an affordability heatmap across more than three thousand US counties, and a natural language to SQL system built with ChromaDB.",
+    ),
+    (
+        ["Tell me about Omkar", "Who is Omkar", "Can you give me a summary of his background",
+         "Tell me about his background"],
+        "Omkar is a full stack engineer in Los Angeles with over four years of experience. He's currently a Software Engineer at Ford, building Next.js and FastAPI products on GCP.",
+    ),
+    (
+        ["Who are you", "What is your name", "Are you a bot", "Am I talking to a person", "Are you a real person"],
+        "I'm Omki, an AI voice assistant for Omkar Thipparthi. I can answer questions about his background and experience.",
+    ),
+]
+
+# Spoken when a turn runs out of its latency budget (every upstream too slow or down);
+# synthesized once at startup so it plays even when TTS itself is failing
+APOLOGY_MESSAGE = "Sorry, I'm having a little trouble on my end. Could you ask me that again?"
@@ -0,0 +1,63 @@
+import asyncio
+
+from admission import AdmissionController
+from providers import TelephonyProvider
+from providers.twilio import TwilioProvider
+
+
+class _LaggingMonitor:
+    def lag_ms(self):
+        return 120.0
+
+
+def test_admits_up_to_the_session_limit():
+    async def run():
+        admission = AdmissionController(max_sessions=2)
+        assert admission.admit("a") and admission.admit("b")
+        assert not admission.admit("c")
+        assert admission.rejected == {"capacity": 1}
+        # A connected stream turns its reservation into an active slot
+        admission.session_started("a")
+        assert (admission.active, admission.spare) == (1, 0)
+        admission.session_ended()
+        assert admission.spare == 1
+
+    asyncio.run(run())
+
+
+def test_refusal_reasons():
+    async def run():
+        admission = AdmissionController(loop_monitor=_LaggingMonitor(), max_loop_lag_ms=50)
+        assert admission.rejection() == "loop_lag"
+        admission.warming = True
+        assert admission.rejection() == "warming" and admission.spare == 0
+        admission.draining = True
+        assert not admission.admit("a")
+        assert admission.rejected == {"draining": 1}
+
+    asyncio.run(run())
+
+
+def test_busy_response_has_a_default_for_every_provider():
+    class MinimalProvider(TelephonyProvider):
+        name = "Minimal"
+
+        def parse_event(self, raw_message):
+            return "ignore", {}
+
+        def format_audio_response(self, stream_sid, base64_audio):
+            return ""
+
+        def format_clear_message(self, stream_sid):
+            return ""
+
+        def format_mark_message(self, stream_sid, mark_name):
+            return ""
+
+        def generate_call_response(self, host, session_key=None):
+            return ""
+
+    provider = MinimalProvider()
+    assert '<Reject reason="busy"/>' in provider.generate_busy_response()
+    redirect = TwilioProvider().generate_busy_response("https://peer/incoming-call/twilio?a=1&redirected=1")
+    assert '<Redirect method="POST">https://peer/incoming-call/twilio?a=1&amp;redirected=1</Redirect>' in redirect
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from audio import ALAW_TO_PCM, MULAW_TO_PCM, G711Codec, PCMToTelephony, Resampler
+
+ALL_SAMPLES = np.arange(-32768, 32768, dtype=np.int16)
+
+
+def _sine(rate, hz, seconds=0.5, amplitude=8000):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.rint(amplitude * np.sin(2 * np.pi * hz * t)).astype(np.int16)
+
+
+def test_decode_tables_match_g711_reference_values():
+    # Silence, the extremes and the smallest steps from ITU-T G.711
+    assert (MULAW_TO_PCM[0xFF], MULAW_TO_PCM[0x7F]) == (0, 0)
+    assert (MULAW_TO_PCM[0x80], MULAW_TO_PCM[0x00]) == (32124, -32124)
+    assert (ALAW_TO_PCM[0xD5], ALAW_TO_PCM[0x55]) == (8, -8)
+    assert (ALAW_TO_PCM[0xAA], ALAW_TO_PCM[0x2A]) == (32256, -32256)
+
+
+@pytest.mark.parametrize("law", ["mulaw", "alaw"])
+def test_every_code_survives_a_round_trip(law):
+    codec = G711Codec(law, max_samples=256)
+    pcm = codec.decode(bytes(range(256))).copy()
+    # mulaw has two codes for zero, so compare the decoded levels
+    assert np.array_equal(codec.decode(codec.encode(pcm).tobytes()), pcm)
+
+
+@pytest.mark.parametrize("law", ["mulaw", "alaw"])
+def test_encoding_picks_the_nearest_level(law):
+    codec = G711Codec(law)
+    decoded = codec.decode(codec.encode(ALL_SAMPLES).tobytes()).astype(np.int32)
+    levels = np.unique(codec.decode(bytes(range(256)))).astype(np.int32)
+    above = np.clip(np.searchsorted(levels, ALL_SAMPLES), 0, len(levels) - 1)
+    below = np.clip(above - 1, 0, len(levels) - 1)
+    nearest = np.minimum(abs(levels[above] - ALL_SAMPLES), abs(levels[below] - ALL_SAMPLES))
+    assert np.array_equal(abs(decoded - ALL_SAMPLES), nearest)
+
+
+def test_mulaw_silence_is_0xff():
+    assert G711Codec("mulaw").encode(np.zeros(4, dtype=np.int16)).tobytes() == b"\xff" * 4
+
+
+def test_codec_grows_past_max_samples():
+    codec = G711Codec("mulaw", max_samples=2)
+    assert len(codec.decode(b"\xff" * 1000)) == 1000
+
+
+def test_unknown_law_and_rate_are_rejected():
+    with pytest.raises(ValueError):
+        G711Codec("ulaw")
+    with pytest.raises(ValueError):
+        Resampler(44100, 8000)
+
+
+@pytest.mark.parametrize("in_rate,out_rate", [(8000, 16000), (16000, 8000), (24000, 8000), (8000, 24000)])
+def test_chunked_output_equals_whole_stream(in_rate, out_rate):
+    signal = _sine(in_rate, 300)
+    whole = Resampler(in_rate, out_rate).process(signal).copy()
+    assert len(whole) == len(signal) * out_rate // in_rate
+
+    resampler = Resampler(in_rate, out_rate, max_samples=160)
+    chunks, start = [], 0
+    # Uneven chunk sizes, some larger than the preallocated buffers
+    for size in [1, 7, 160, 333, 5, 1000] * 20:
+        chunk = signal[start:start + size]
+        expected = resampler.output_length(len(chunk))
+        chunks.append(resampler.process(chunk).copy())
+        assert len(chunks[-1]) == expected
+        start += size
+    assert np.array_equal(np.concatenate(chunks), whole)
+
+
+def test_resampler_preserves_a_voice_band_tone():
+    signal = _sine(8000, 440, seconds=1.0)
+    up = Resampler(8000, 16000).process(signal).copy()
+    down = Resampler(16000, 8000).process(up).copy()
+    # Skip the filter delay at the start, then compare levels
+    steady = slice(200, None)
+    assert np.isclose(np.sqrt(np.mean(down[steady].astype(float) ** 2)),
+                      np.sqrt(np.mean(signal[steady].astype(float) ** 2)), rtol=0.05)
+
+
+def test_resampler_removes_content_above_the_output_nyquist():
+    # 6 kHz is above 4 kHz, the Nyquist limit at 8 kHz
+    down = Resampler(16000, 8000).process(_sine(16000, 6000, seconds=1.0))
+    assert np.abs(down[200:]).max() < 8000 * 0.05
+
+
+def test_pcm_to_telephony_carries_an_odd_byte():
+    pcm = _sine(16000, 300).astype("<i2").tobytes()
+    whole = PCMToTelephony(16000).feed(pcm)
+    converter = PCMToTelephony(16000)
+    pieces = [converter.feed(pcm[i:i + 321]) for i in range(0, len(pcm), 321)]
+    assert b"".join(pieces) == whole
+    assert len(whole) == len(pcm) // 4
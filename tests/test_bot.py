@@ -0,0 +1,168 @@
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+import bot as bot_module
+from bot import TTS_ENCODING, TTS_SAMPLE_RATE, VoiceBot, tts_voice
+from faq import FAQIndex
+from providers.twilio import TwilioProvider
+from tts_cache import TTSCache
+from vad import vad_stats
+
+ENTRIES = [
+    (["Where does he work"], "He works at Acme."),
+    (["Where did he study"], "He studied at State University."),
+]
+# Two seconds of the first answer, one of the second, told apart by their bytes
+AUDIO = {"He works at Acme.": b"\x11" * 16000, "He studied at State University.": b"\x22" * 8000}
+
+
+class _TelephonySocket:
+    """Records what the bot sends; the caller hangs up when `hangup` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.hangup = asyncio.Event()
+
+    async def send_text(self, message):
+        self.sent.append(json.loads(message))
+
+    async def iter_text(self):
+        yield json.dumps({"event": "start", "start": {"streamSid": "MZ1"}})
+        await self.hangup.wait()
+        yield json.dumps({"event": "stop"})
+
+    def frames(self):
+        """The sent stream as "clear" and the first byte of each audio frame."""
+        return [
+            "clear" if message["event"] == "clear" else base64.b64decode(message["media"]["payload"])[0]
+            for message in self.sent if message["event"] in ("media", "clear")
+        ]
+
+
+class _STTSocket:
+    def __init__(self):
+        self._closed = asyncio.Event()
+
+    async def send(self, chunk):
+        pass
+
+    async def close(self):
+        self._closed.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._closed.wait()
+        raise StopAsyncIteration
+
+
+class _STTPool:
+    async def claim(self, key):
+        return _STTSocket()
+
+
+async def _bot(socket):
+    cache = TTSCache()
+    for text, audio in AUDIO.items():
+        await cache.put(TTSCache.key(text, tts_voice(), TTS_ENCODING, TTS_SAMPLE_RATE), audio)
+    bot = VoiceBot(
+        TwilioProvider(),
+        clients=SimpleNamespace(groq=None, http=None),
+        tts_cache=cache,
+        stt_pool=_STTPool(),
+        faq=FAQIndex(ENTRIES),
+    )
+    call = asyncio.create_task(bot.start(socket))
+    while bot.stream_sid is None:
+        await asyncio.sleep(0.01)
+    return bot, call
+
+
+def test_a_new_turn_clears_the_superseded_answer():
+    async def run():
+        socket = _TelephonySocket()
+        bot, call = await _bot(socket)
+        bot._on_turn("Where does he work")
+        # (long enough to hear part of it, or its question is merged into the next turn)
+        await asyncio.sleep(0.6)
+        bot._on_turn("Where did he study")
+        await asyncio.sleep(0.3)
+        socket.hangup.set()
+        await call
+        return socket.frames()
+
+    frames = asyncio.run(run())
+    first_new = frames.index(0x22)
+    assert 0x11 in frames[:first_new]
+    # The provider's buffer is flushed before the new answer, and no old frame follows it
+    assert frames[first_new - 1] == "clear"
+    assert 0x11 not in frames[first_new:]
+
+
+def test_hang_up_stops_the_response_in_flight():
+    async def run():
+        socket = _TelephonySocket()
+        bot, call = await _bot(socket)
+        bot._on_turn("Where does he work")
+        await asyncio.sleep(0.2)
+        socket.hangup.set()
+        await call
+        assert bot._current_response_task is None
+        sent = len(socket.sent)
+        await asyncio.sleep(0.2)
+        # The frame pump stopped with the call
+        assert len(socket.sent) == sent
+        assert sent < 16000 // 160
+
+    asyncio.run(run())
+
+
+def test_unconfirmed_vad_onset_resumes_playback(monkeypatch):
+    monkeypatch.setattr(bot_module, "VAD_CONFIRM_MS", 200)
+
+    async def run():
+        socket = _TelephonySocket()
+        bot, call = await _bot(socket)
+        false_alarms = vad_stats.false_alarms
+        bot._on_turn("Where does he work")
+        await asyncio.sleep(0.3)
+        await bot._vad_barge_in()
+        held = len(socket.frames())
+        assert socket.frames()[-1] == "clear"
+        await asyncio.sleep(0.1)
+        # Held: nothing more goes out while the transcript may still confirm it
+        assert len(socket.frames()) == held
+        await asyncio.sleep(0.3)
+        # No transcript followed, so playback picked up where the caller was cut off
+        assert vad_stats.false_alarms == false_alarms + 1
+        assert len(socket.frames()) > held
+        assert set(socket.frames()[held:]) == {0x11}
+        socket.hangup.set()
+        await call
+
+    asyncio.run(run())
+
+
+def test_confirmed_vad_onset_stays_stopped(monkeypatch):
+    monkeypatch.setattr(bot_module, "VAD_CONFIRM_MS", 200)
+
+    async def run():
+        socket = _TelephonySocket()
+        bot, call = await _bot(socket)
+        confirmed, false_alarms = vad_stats.confirmed, vad_stats.false_alarms
+        bot._on_turn("Where does he work")
+        await asyncio.sleep(0.3)
+        await bot._vad_barge_in()
+        held = len(socket.frames())
+        # The transcript arrives inside the hold
+        await bot._interrupt()
+        await asyncio.sleep(0.4)
+        assert (vad_stats.confirmed, vad_stats.false_alarms) == (confirmed + 1, false_alarms)
+        assert 0x11 not in socket.frames()[held:]
+        socket.hangup.set()
+        await call
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from bot import VoiceBot
+from deadline import CircuitBreaker, TurnDeadline
+from tracing import TurnTrace
+
+
+def _deadline(elapsed_ms, budget_ms=1000, **kwargs):
+    return TurnDeadline(budget_ms, time.monotonic() - elapsed_ms / 1000, **kwargs)
+
+
+def test_stages_share_the_remaining_budget():
+    deadline = _deadline(0, min_stage_ms=0)
+    assert deadline.stage_ms("stt") == pytest.approx(200, abs=5)
+    assert deadline.finish("stt")
+    # With STT done, the LLM gets 0.5 / (0.5 + 0.3) of what is left
+    assert deadline.stage_ms("llm") == pytest.approx(625, abs=5)
+
+
+def test_a_slow_stage_shrinks_the_stages_after_it():
+    deadline = _deadline(600, min_stage_ms=0)
+    # STT used 600 ms against a 200 ms share
+    assert not deadline.finish("stt")
+    assert deadline.overruns == ["stt"]
+    assert deadline.stage_ms("llm") == pytest.approx(400 * 0.5 / 0.8, abs=5)
+
+
+def test_stage_time_never_drops_below_the_minimum():
+    deadline = _deadline(5000)
+    assert deadline.remaining_ms() < 0
+    assert deadline.stage_ms("tts") == 250
+
+
+def test_finish_checks_the_cumulative_share():
+    deadline = _deadline(650)
+    # 650 ms is past STT's 200 ms but within STT + LLM's 700 ms
+    assert deadline.finish("llm")
+    assert deadline.overruns == []
+
+
+def test_overrun_records_the_fallback():
+    deadline = _deadline(0)
+    deadline.overrun("llm", "faq")
+    assert (deadline.overruns, deadline.fallbacks) == (["llm"], ["faq"])
+    # The skipped stage no longer takes a share of what is left
+    assert deadline.stage_ms("tts") == pytest.approx(deadline.remaining_ms() * 0.3 / 0.5, abs=5)
+
+
+def test_budget_leaves_out_the_endpointing_hold():
+    trace = TurnTrace(1)
+    trace.mark("audio_last", 10.0)
+    trace.mark("stt_proposed", 10.3)
+    # The endpointer held the turn 0.8 s for a possible continuation
+    trace.mark("transcript_final", 11.1)
+    assert VoiceBot._budget_start(trace) == pytest.approx(10.8)
+
+    unrecorded = TurnTrace(2)
+    unrecorded.mark("transcript_final", 5.0)
+    assert VoiceBot._budget_start(unrecorded) == 5.0
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("groq", failure_threshold=3, reset_after_s=15)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats() == {"state": "open", "open": True, "failures": 3, "opens": 1, "skipped": 1}
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker("groq", failure_threshold=1, reset_after_s=15)
+    breaker.failure()
+    breaker.opened_at -= 15
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed probe keeps the circuit open for another cool-down
+    breaker.failure()
+    assert breaker.state == "open" and breaker.opens == 1
+
+    breaker.opened_at -= 15
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
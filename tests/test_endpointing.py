@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from endpointing import EndOfTurnPredictor, endpointing_stats
+from turns import TurnAssembler
+
+
+def _speak(predictor, start, pauses_ms, frame_ms=20):
+    """Voiced frames from `start`, with the given pauses between words; returns the last frame time."""
+    now = start
+    predictor.on_audio(True, now)
+    for pause_ms in pauses_ms:
+        now += pause_ms / 1000
+        predictor.on_audio(True, now)
+        now += frame_ms / 1000
+        predictor.on_audio(True, now)
+    return now
+
+
+def test_transcript_cues_adjust_the_initial_hold():
+    predictor = EndOfTurnPredictor(initial_hold_ms=400)
+    assert predictor.hold_ms("I'm calling about the role.") == 400
+    assert predictor.hold_ms("Where does he work?") == pytest.approx(240)
+    # A trailing comma, conjunction or filler: the caller is probably still going
+    assert predictor.hold_ms("I was wondering,") == 1000
+    assert predictor.hold_ms("He worked at Ford and") == 1000
+    assert predictor.hold_ms("So um") == 1000
+    assert EndOfTurnPredictor(initial_hold_ms=300, min_hold_ms=200).hold_ms("Yes?") == 200
+
+
+def test_hold_is_learned_from_the_callers_pauses():
+    predictor = EndOfTurnPredictor(margin_ms=100, min_samples=3)
+    # Word gaps under min_pause_ms don't count as pauses
+    _speak(predictor, 100.0, [50, 300, 50, 500, 700, 600])
+    # p90 of [300, 500, 600, 700] is 700
+    assert predictor.hold_ms("That's all.") == pytest.approx(800, abs=1)
+
+    slow = EndOfTurnPredictor(max_hold_ms=1500)
+    _speak(slow, 100.0, [2000, 2500, 3000])
+    assert slow.hold_ms("That's all.") == 1500
+
+
+def test_speech_right_after_a_closed_turn_is_a_false_cutoff():
+    predictor = EndOfTurnPredictor(cutoff_window_ms=1500)
+    before = endpointing_stats.false_cutoffs
+    _speak(predictor, time.monotonic() - 1, [])
+    predictor.turn_ended()
+    predictor.on_audio(True, predictor._ended_at + 0.8)
+    assert predictor.false_cutoffs == 1
+    assert endpointing_stats.false_cutoffs == before + 1
+    # The pause that closed the turn too early now counts towards the hold
+    assert len(predictor._pauses) == 1
+
+
+def test_end_delay_counts_from_the_last_voiced_frame():
+    predictor = EndOfTurnPredictor(initial_hold_ms=400)
+    predictor.on_audio(True, time.monotonic() - 0.3)
+    # 300 ms of silence already: wait about 100 ms more
+    assert predictor.end_delay_ms("I'm calling about the role.") == pytest.approx(100, abs=20)
+    quiet = EndOfTurnPredictor(initial_hold_ms=400)
+    quiet.on_audio(True, time.monotonic() - 0.5)
+    assert quiet.end_delay_ms("I'm calling about the role.") == 0.0
+
+
+def test_assembler_holds_the_turn_for_the_endpointer():
+    turns = []
+
+    async def run():
+        predictor = EndOfTurnPredictor(initial_hold_ms=200, min_hold_ms=100)
+        assembler = TurnAssembler(turns.append, endpointer=predictor)
+        assembler.add_final("I was wondering,", speech_final=True)
+        await asyncio.sleep(0.3)
+        # The trailing comma holds the turn open past the initial 200 ms
+        assert turns == []
+        # The caller goes on: the proposal is withdrawn
+        assembler.add_interim("where he")
+        predictor.on_audio(True)
+        assembler.add_final("where he works.", speech_final=True)
+        await asyncio.sleep(0.35)
+        assert turns == ["I was wondering, where he works."]
+        assert assembler.proposed_at is not None
+
+    asyncio.run(run())
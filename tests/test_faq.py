@@ -0,0 +1,54 @@
+import pytest
+
+from faq import FAQIndex
+from system_prompt import FAQ_ENTRIES
+
+ENTRIES = [
+    (["Where does he work", "Who is his current employer"], "He works at Acme."),
+    (["Where did he study", "What degree does he have"], "He studied at State University."),
+]
+
+
+def test_paraphrase_is_answered_locally():
+    index = FAQIndex(ENTRIES)
+    # Contractions are expanded, so "who's" matches "who is"
+    match = index.lookup("who's his employer")
+    assert match is not None and match.answer == "He works at Acme."
+    assert match.question == "Who is his current employer"
+    assert index.lookup("where does he work?").score == pytest.approx(1.0)
+
+
+def test_unrelated_questions_go_to_the_llm():
+    index = FAQIndex(ENTRIES)
+    assert index.lookup("Does he work at Google") is None
+    assert index.lookup("What are his salary expectations") is None
+    assert index.lookup("") is None
+    stats = index.stats()
+    assert (stats["lookups"], stats["hits"], stats["hit_rate"]) == (3, 0, 0.0)
+
+
+def test_trigrams_rank_a_misheard_word_with_its_phrasing():
+    index = FAQIndex(ENTRIES, threshold=0.0)
+    assert index.lookup("where does he wrok").answer == "He works at Acme."
+
+
+def test_matches_does_not_count_as_a_lookup():
+    index = FAQIndex(ENTRIES)
+    assert index.matches("where did he study")
+    assert index.lookups == 0
+
+
+def test_saved_time_follows_the_llm_first_token_latency():
+    index = FAQIndex(ENTRIES)
+    index.observe_llm(1500.0)
+    assert index.llm_first_token_ms == pytest.approx(700.0)
+    match = index.lookup("What degree does he have")
+    assert index.stats()["saved_ms_total"] == pytest.approx(700.0 - match.lookup_ms, abs=0.1)
+
+
+def test_every_curated_phrasing_matches_its_own_answer():
+    index = FAQIndex(FAQ_ENTRIES)
+    for phrasings, answer in FAQ_ENTRIES:
+        for phrasing in phrasings:
+            match = index.lookup(phrasing)
+            assert match is not None and match.answer == answer, phrasing
@@ -0,0 +1,47 @@
+from history import ConversationHistory, count_tokens, MESSAGE_OVERHEAD_TOKENS
+from tracing import CallSummary, TurnTrace
+
+
+def test_count_tokens_approximates_word_pieces():
+    assert count_tokens("") == 0
+    # Words are split into pieces of up to 4 characters; punctuation counts on its own
+    assert count_tokens("Hi there!") == 4
+    assert count_tokens("internationalization") == 5
+
+
+def test_prompt_tokens_are_recorded_per_user_turn():
+    history = ConversationHistory("You are helpful.", max_turns=10, token_budget=10_000)
+    system = count_tokens("You are helpful.") + MESSAGE_OVERHEAD_TOKENS
+    history.append("user", "Hello")
+    history.append("assistant", "Hi, how can I help?")
+    history.append("user", "Where does he work")
+    first = system + count_tokens("Hello") + MESSAGE_OVERHEAD_TOKENS
+    assert history.turn_prompt_tokens[0] == first
+    assert history.turn_prompt_tokens[1] == history.prompt_tokens()
+    assert history.stats()["turn_prompt_tokens"] == history.turn_prompt_tokens
+
+
+def test_old_turns_are_evicted_to_stay_within_the_budget():
+    history = ConversationHistory("System.", max_turns=2, token_budget=10_000)
+    for i in range(5):
+        history.append("user", f"question {i}")
+        history.append("assistant", f"answer {i}")
+    contents = [m["content"] for m in history.messages()[1:]]
+    assert contents == ["question 3", "answer 3", "question 4", "answer 4"]
+
+    tight = ConversationHistory("System.", max_turns=10, token_budget=40)
+    for i in range(5):
+        tight.append("user", "a fairly long question about the candidate " * 2)
+        tight.append("assistant", "a fairly long answer about the candidate " * 2)
+        # The latest turn is always kept, whatever the budget
+        assert tight.messages()[-1]["role"] == "assistant"
+    assert len(tight.messages()) == 3
+
+
+def test_call_summary_reports_prompt_tokens():
+    summary = CallSummary()
+    for turn, tokens in enumerate([120, 180, None], start=1):
+        trace = TurnTrace(turn)
+        trace.prompt_tokens = tokens
+        summary.add(trace)
+    assert "prompt_tokens p50=180 max=180" in summary.format()
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_router import LLMRouter, Route
+
+
+class _Stream:
+    def __init__(self, deltas, delay):
+        self._deltas = list(deltas)
+        self._delay = delay
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # The first delta after `delay`, the rest a few milliseconds apart
+        await asyncio.sleep(self._delay)
+        self._delay = 0.005
+        if not self._deltas:
+            raise StopAsyncIteration
+        delta = self._deltas.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        pass
+
+
+class _Groq:
+    """Per model: (seconds before the first delta, deltas), or an exception to raise."""
+
+    def __init__(self, models):
+        self.models = models
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages, stream, model, **params):
+        self.requests.append(model)
+        behaviour = self.models[model]
+        if isinstance(behaviour, Exception):
+            raise behaviour
+        delay, deltas = behaviour
+        return _Stream(deltas, delay)
+
+
+HEDGED = Route("big", "complex", "small", 50)
+
+
+async def _answer(router, groq, route=HEDGED):
+    return [delta async for delta in router.stream(groq, [{"role": "user", "content": "hi"}], {}, route)]
+
+
+def _samples(router, model):
+    return [ms for _, ms in router.models[model]._samples]
+
+
+def test_routes_by_complexity_and_primary_latency():
+    router = LLMRouter(primary="big", fallback="small")
+    assert router.choose("Where does he work?", 700).model == "small"
+    route = router.choose("How did he design the pipeline and why did he pick Kafka?", 700)
+    assert (route.model, route.hedge_model) == ("big", "small")
+    assert router.min_hedge_ms <= route.hedge_after_ms <= 700
+
+    for _ in range(5):
+        router.models["big"].observe(900)
+    route = router.choose("How did he design the pipeline and why did he pick Kafka?", 700)
+    assert (route.model, route.reason) == ("small", "primary_slow")
+
+
+def test_fast_primary_is_not_hedged_and_streams_to_the_end():
+    async def run():
+        router = LLMRouter(primary="big", fallback="small")
+        groq = _Groq({"big": (0.01, ["He ", "designed it."]), "small": (0.01, ["No."])})
+        assert await _answer(router, groq) == ["He ", "designed it."]
+        assert groq.requests == ["big"]
+        assert (router.hedges, router.models["big"].wins) == (0, 1)
+
+    asyncio.run(run())
+
+
+def test_slow_primary_is_hedged_and_the_loser_still_measured():
+    async def run():
+        router = LLMRouter(primary="big", fallback="small")
+        groq = _Groq({"big": (0.3, ["Slow."]), "small": (0.01, ["Fast ", "answer."])})
+        assert await _answer(router, groq) == ["Fast ", "answer."]
+        assert groq.requests == ["big", "small"]
+        assert (router.hedges, router.models["small"].wins, router.models["big"].wins) == (1, 1, 0)
+        # The primary runs on to its first token, so its real latency is learned
+        await asyncio.sleep(0.4)
+        assert _samples(router, "big") == [pytest.approx(300, abs=60)]
+        assert router.models["big"].errors == 0
+
+    asyncio.run(run())
+
+
+def test_loser_without_a_first_token_is_capped():
+    async def run():
+        router = LLMRouter(primary="big", fallback="small", loser_timeout_ms=100)
+        groq = _Groq({"big": (10, ["Never."]), "small": (0.01, ["Fast."])})
+        assert await _answer(router, groq) == ["Fast."]
+        await asyncio.sleep(0.2)
+        assert _samples(router, "big") == [100]
+
+    asyncio.run(run())
+
+
+def test_failed_primary_falls_back_without_waiting_for_the_deadline():
+    async def run():
+        router = LLMRouter(primary="big", fallback="small")
+        groq = _Groq({"big": RuntimeError("503"), "small": (0.01, ["Fallback."])})
+        started = asyncio.get_running_loop().time()
+        assert await _answer(router, groq, Route("big", "complex", "small", 1000)) == ["Fallback."]
+        assert asyncio.get_running_loop().time() - started < 0.5
+        assert (router.models["big"].errors, router.models["small"].wins) == (1, 1)
+
+    asyncio.run(run())
+
+
+def test_both_models_failing_raises():
+    async def run():
+        router = LLMRouter(primary="big", fallback="small")
+        groq = _Groq({"big": RuntimeError("503"), "small": RuntimeError("429")})
+        with pytest.raises(RuntimeError):
+            await _answer(router, groq)
+        assert (router.models["big"].errors, router.models["small"].errors) == (1, 1)
+        assert router.models["small"].wins == 0
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+import time
+import logging
+import contextvars
+
+import pytest
+
+import log
+from log import bind_call, get_logger, log_stats
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records(monkeypatch):
+    monkeypatch.setattr(log, "_limiter", log._RateLimiter(2, window_s=0.05))
+    handler = _Records()
+    root = logging.getLogger("voicebot")
+    root.addHandler(handler)
+    yield handler.records
+    root.removeHandler(handler)
+
+
+def _in_call(call_id, fn):
+    def run():
+        bind_call(call_id)
+        fn()
+
+    contextvars.copy_context().run(run)
+
+
+def test_noisy_call_does_not_silence_other_calls(records):
+    logger = get_logger("test")
+    _in_call("noisy", lambda: [logger.warning("deadline_overrun", "late") for _ in range(20)])
+    time.sleep(0.06)
+    _in_call("quiet", lambda: logger.warning("deadline_overrun", "late"))
+    by_call = [record.call_id for record in records if record.event == "deadline_overrun"]
+    assert by_call.count("noisy") == 2
+    assert by_call.count("quiet") == 1
+    # The noisy call's burst is reported once its window is over
+    summary = [record for record in records if record.event == "log_suppressed"]
+    assert len(summary) == 1
+    assert summary[0].call_id == "noisy"
+    assert summary[0].fields == {"suppressed_event": "deadline_overrun", "suppressed": 18}
+
+
+def test_errors_are_never_rate_limited(records):
+    logger = get_logger("test")
+    before = log_stats.rate_limited
+    _in_call("call", lambda: [logger.error("telephony_error", "boom") for _ in range(10)])
+    assert sum(record.event == "telephony_error" for record in records) == 10
+    assert log_stats.rate_limited == before
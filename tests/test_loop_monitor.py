@@ -0,0 +1,28 @@
+import time
+import asyncio
+
+from loop_monitor import LoopMonitor
+
+
+async def _blocking_work():
+    await asyncio.sleep(0.1)
+    time.sleep(0.3)
+
+
+def test_slow_callback_names_the_blocking_task_and_line():
+    async def run():
+        monitor = LoopMonitor(slow_callback_ms=100)
+        monitor.start()
+        try:
+            await asyncio.create_task(_blocking_work(), name="blocker")
+            await asyncio.sleep(0.2)
+        finally:
+            await monitor.close()
+        stats = monitor.stats()
+        assert stats["slow_callbacks"] >= 1
+        stall = stats["recent_slow"][-1]
+        assert stall["task"].startswith("blocker (_blocking_work)")
+        assert stall["where"].startswith("_blocking_work (test_loop_monitor.py:")
+        assert stats["lag_max_ms"] >= 200
+
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from providers import media_path_stats
+from providers.twilio import TwilioProvider
+from providers.telnyx import TelnyxProvider
+
+PAYLOAD = "fn5+/v7+fn5+fv7+/n5+fn7+/v7+fn5+fv7+/n5+fn7+/v7+fn5+fv7+/n5+fn7+/v7+fn5+fv7+/n5+fn7+/v7+"
+
+# Media frames as each provider sends them on the wire (compact JSON)
+TWILIO_MEDIA = (
+    '{"event":"media","sequenceNumber":"3","media":{"track":"inbound","chunk":"1",'
+    '"timestamp":"5","payload":"' + PAYLOAD + '"},"streamSid":"MZ18ad3ab5a668481ce02b83e7395059f0"}'
+)
+TELNYX_MEDIA = (
+    '{"event":"media","sequence_number":"4","media":{"track":"inbound","chunk":"2",'
+    '"timestamp":"5","payload":"' + PAYLOAD + '"},"stream_id":"32de0dea-53cb-4b21-89a4-9610ca9a4ab8"}'
+)
+
+# The same frames pretty-printed, as in the providers' documentation
+TWILIO_MEDIA_SPACED = json.dumps(json.loads(TWILIO_MEDIA), indent=2)
+TELNYX_MEDIA_SPACED = json.dumps(json.loads(TELNYX_MEDIA))
+
+OTHER_EVENTS = [
+    '{"event":"connected","protocol":"Call","version":"1.0.0"}',
+    '{"event":"start","sequenceNumber":"1","start":{"accountSid":"AC1","streamSid":"MZ1","callSid":"CA1",'
+    '"tracks":["inbound"],"mediaFormat":{"encoding":"audio/x-mulaw","sampleRate":8000,"channels":1}},"streamSid":"MZ1"}',
+    '{"event":"mark","sequenceNumber":"4","streamSid":"MZ1","mark":{"name":"response_end:1"}}',
+    '{"event": "stop", "sequence_number": "5", "stop": {"call_control_id": "v3:1"}, "stream_id": "1"}',
+]
+
+PROVIDERS = [(TwilioProvider(), TWILIO_MEDIA, TWILIO_MEDIA_SPACED), (TelnyxProvider(), TELNYX_MEDIA, TELNYX_MEDIA_SPACED)]
+
+
+@pytest.mark.parametrize("provider, compact, spaced", PROVIDERS)
+def test_compact_frame_takes_the_marker_scan(provider, compact, spaced):
+    before = media_path_stats.compact
+    assert provider.extract_media_payload(compact) == PAYLOAD
+    assert media_path_stats.compact == before + 1
+    assert provider.parse_event(compact) == ("media", {"payload": PAYLOAD})
+
+
+@pytest.mark.parametrize("provider, compact, spaced", PROVIDERS)
+def test_spaced_frame_is_still_found_and_counted(provider, compact, spaced):
+    assert '"event": "media"' in spaced
+    before = media_path_stats.spaced
+    assert provider.extract_media_payload(spaced) == PAYLOAD
+    assert media_path_stats.spaced == before + 1
+    assert provider.parse_event(spaced) == ("media", {"payload": PAYLOAD})
+
+
+@pytest.mark.parametrize("provider", [TwilioProvider(), TelnyxProvider()])
+@pytest.mark.parametrize("message", OTHER_EVENTS)
+def test_other_events_fall_through(provider, message):
+    assert provider.extract_media_payload(message) is None
+
+
+@pytest.mark.parametrize("message", [TWILIO_MEDIA, TWILIO_MEDIA_SPACED])
+def test_escaped_payload_is_left_to_the_json_parser(message):
+    provider = TwilioProvider()
+    escaped = message.replace(PAYLOAD, PAYLOAD.replace("/", "\\/"))
+    assert provider.extract_media_payload(escaped) is None
+    assert provider.parse_event(escaped) == ("media", {"payload": PAYLOAD})
+
+
+def test_mark_name_is_parsed():
+    assert TwilioProvider().parse_event(OTHER_EVENTS[2]) == ("mark", {"name": "response_end:1"})
@@ -0,0 +1,111 @@
+import json
+import asyncio
+
+import personas
+from personas import PersonaRegistry, persona_key
+
+
+async def _synthesize(text, persona):
+    return b"\x7f" * 1600
+
+
+def _write_persona(directory, number, **fields):
+    data = {"system_prompt": f"You answer for {number}.", **fields}
+    (directory / f"{persona_key(number)}.json").write_text(json.dumps(data))
+
+
+def test_persona_key_keeps_digits_only():
+    assert persona_key("+1 (555) 010-2000") == "15550102000"
+    assert persona_key(None) == ""
+
+
+def test_persona_is_loaded_once_for_concurrent_calls(tmp_path):
+    _write_persona(tmp_path, "+15550102000", greeting="Hello!", llm_model="llama-3.1-8b-instant")
+
+    async def run():
+        registry = PersonaRegistry(str(tmp_path), _synthesize, faq_threshold=None)
+        for i in range(5):
+            registry.assign(f"call-{i}", "+1 555 010 2000")
+        loaded = await asyncio.gather(*(registry.claim(f"call-{i}") for i in range(5)))
+        assert all(persona is loaded[0] for persona in loaded)
+        assert loaded[0].llm_model == "llama-3.1-8b-instant"
+        assert loaded[0].greeting_audio and loaded[0].apology_audio
+        assert registry.loads == 1
+
+    asyncio.run(run())
+
+
+def test_unknown_numbers_are_negatively_cached(tmp_path, monkeypatch):
+    reads = []
+    read = personas._read
+    monkeypatch.setattr(personas, "_read", lambda key, path: reads.append(key) or read(key, path))
+
+    async def run():
+        registry = PersonaRegistry(str(tmp_path), _synthesize, faq_threshold=None)
+        for i in range(3):
+            registry.assign(f"call-{i}", "+15550109999")
+            assert await registry.claim(f"call-{i}") is registry.default
+        assert reads == ["15550109999"]
+        assert registry.unknown == 1
+
+        # Once the entry expires, the file is looked up again
+        monkeypatch.setattr(personas, "UNKNOWN_TTL", 0.0)
+        registry._unknown.clear()
+        await registry.get("15550109999")
+        await registry.get("15550109999")
+        assert len(reads) == 3
+
+    asyncio.run(run())
+
+
+def test_lru_is_bounded_by_bytes(tmp_path):
+    for n in range(3):
+        _write_persona(tmp_path, f"+1555010000{n}")
+
+    async def run():
+        registry = PersonaRegistry(str(tmp_path), _synthesize, max_memory_bytes=4000, faq_threshold=None)
+        for n in range(3):
+            await registry.get(f"1555010000{n}")
+        assert registry.evicted >= 1
+        assert registry.stats()["memory_bytes"] <= 4000 or registry.stats()["cached"] == 1
+
+    asyncio.run(run())
+
+
+def test_slow_clips_do_not_hold_up_the_call(tmp_path):
+    _write_persona(tmp_path, "+15550102000", greeting="Hello!")
+    release = asyncio.Event()
+
+    async def slow_synthesize(text, persona):
+        await release.wait()
+        return b"\x7f" * 1600
+
+    async def run():
+        registry = PersonaRegistry(str(tmp_path), slow_synthesize, faq_threshold=None, clip_timeout_s=0.05)
+        persona = await asyncio.wait_for(registry.get("15550102000"), 1.0)
+        assert persona.greeting_audio is None and persona.apology_audio is None
+        size = registry.stats()["memory_bytes"]
+
+        # The clips finish in the background and later calls get them
+        release.set()
+        await asyncio.sleep(0.01)
+        assert persona.greeting_audio and persona.apology_audio
+        assert registry.stats()["memory_bytes"] == size + 3200 == persona.memory_bytes()
+
+    asyncio.run(run())
+
+
+def test_broken_persona_files_are_negatively_cached(tmp_path, monkeypatch):
+    (tmp_path / "15550102000.json").write_text("{not json")
+    reads = []
+    read = personas._read
+    monkeypatch.setattr(personas, "_read", lambda key, path: reads.append(key) or read(key, path))
+
+    async def run():
+        registry = PersonaRegistry(str(tmp_path), _synthesize, faq_threshold=None)
+        for _ in range(3):
+            assert await registry.get("15550102000") is registry.default
+        assert reads == ["15550102000"]
+        assert registry.failed == 1
+
+    asyncio.run(run())
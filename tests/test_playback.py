@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from playback import FRAME_BYTES, FRAME_MS, MULAW_SILENCE, AudioSender
+from providers.twilio import TwilioProvider
+
+
+class _Socket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, message):
+        self.frames.append(base64.b64decode(json.loads(message)["media"]["payload"]))
+
+
+def _numbered(frames):
+    """Audio whose n-th 20 ms frame is filled with the byte n."""
+    return b"".join(bytes([n]) * FRAME_BYTES for n in range(frames))
+
+
+def _sender(socket, **kwargs):
+    return AudioSender(TwilioProvider(), socket, "MZ1", **kwargs)
+
+
+def test_frames_are_paced_in_real_time():
+    async def run():
+        socket = _Socket()
+        sender = _sender(socket, lead_ms=100)
+        started = time.monotonic()
+        sender.write(_numbered(25))
+        await asyncio.sleep(0.2)
+        # 200 ms in, the sender is no more than lead_ms ahead of the caller
+        assert 10 <= len(socket.frames) <= 16
+        await sender.finish()
+        elapsed_ms = (time.monotonic() - started) * 1000
+        assert elapsed_ms == pytest.approx(500 - 100, abs=60)
+        assert [frame[0] for frame in socket.frames] == list(range(25))
+        assert all(len(frame) == FRAME_BYTES for frame in socket.frames)
+        assert (sender.queued_ms, sender.sent_ms) == (500, 500)
+        assert sender.played_ms <= sender.sent_ms
+
+    asyncio.run(run())
+
+
+def test_finish_pads_the_tail_with_silence():
+    async def run():
+        socket = _Socket()
+        sender = _sender(socket)
+        sender.write(b"\x01" * (FRAME_BYTES + 10))
+        await asyncio.sleep(0.01)
+        # Only whole frames go out until the response is finished
+        assert len(socket.frames) == 1
+        await sender.finish()
+        assert socket.frames[1] == b"\x01" * 10 + bytes([MULAW_SILENCE]) * (FRAME_BYTES - 10)
+
+    asyncio.run(run())
+
+
+def test_resume_replays_from_what_the_caller_heard():
+    async def run():
+        socket = _Socket()
+        sender = _sender(socket, lead_ms=100)
+        sender.write(_numbered(50))
+        await asyncio.sleep(0.3)
+        assert sender.pause()
+        heard_frames = sender.played_ms // FRAME_MS
+        # Rewound: "sent" is back to the frame being played
+        assert sender.sent_ms == heard_frames * FRAME_MS
+        paused_at = len(socket.frames)
+        await asyncio.sleep(0.1)
+        assert len(socket.frames) == paused_at
+
+        sender.resume()
+        await sender.finish()
+        # The frames the clear message discarded are sent again, then the rest
+        assert [frame[0] for frame in socket.frames[paused_at:]] == list(range(heard_frames, 50))
+
+    asyncio.run(run())
+
+
+def test_pause_after_everything_was_sent_holds_nothing():
+    async def run():
+        sender = _sender(_Socket())
+        sender.write(_numbered(2))
+        await sender.finish()
+        assert not sender.pause()
+
+    asyncio.run(run())
+
+
+def test_stop_cancels_the_pump():
+    async def run():
+        socket = _Socket()
+        sender = _sender(socket, lead_ms=100)
+        sender.write(_numbered(50))
+        await asyncio.sleep(0.2)
+        heard_ms = sender.stop()
+        assert heard_ms == pytest.approx(200, abs=40)
+        sent = len(socket.frames)
+        await asyncio.sleep(0.1)
+        assert len(socket.frames) == sent
+        assert sender._pump_task.done()
+        # The heard position is frozen, and finish() returns at once
+        assert sender.played_ms == heard_ms
+        await asyncio.wait_for(sender.finish(), 0.1)
+
+    asyncio.run(run())
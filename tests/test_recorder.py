@@ -0,0 +1,87 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+
+import recorder
+from recorder import CallRecorder, RecordingTransport, bind_recorder, read_recording
+
+
+def _records(path):
+    return [(kind, channel, payload) for kind, channel, _, payload in read_recording(str(path))]
+
+
+def test_records_round_trip_through_a_file(tmp_path):
+    path = tmp_path / "calls" / "call-1.vbrec"
+    call = CallRecorder("Twilio")
+    call.telephony('{"event":"start"}')
+    call.media(memoryview(b"\xff" * 160))
+    call.stt(b'{"type":"Results"}')
+    asyncio.run(call.save(str(path)))
+
+    records = _records(path)
+    kind, channel, meta = records[0]
+    assert (kind, channel) == (recorder.META, 0)
+    assert json.loads(meta)["provider"] == "Twilio"
+    assert json.loads(meta)["version"] == recorder.FORMAT_VERSION
+    assert records[1:] == [
+        (recorder.TELEPHONY, 0, b'{"event":"start"}'),
+        (recorder.MEDIA, 0, b"\xff" * 160),
+        (recorder.STT, 0, b'{"type":"Results"}'),
+    ]
+    timestamps = [t_ms for _, _, t_ms, _ in read_recording(str(path))]
+    assert timestamps == sorted(timestamps)
+
+
+def test_recording_stops_at_the_size_limit(tmp_path):
+    call = CallRecorder("Twilio", max_bytes=1000)
+    for _ in range(10):
+        call.media(b"\xff" * 160)
+    assert call.truncated
+    path = tmp_path / "call.vbrec"
+    asyncio.run(call.save(str(path)))
+    # Whole records only: the file still reads back cleanly
+    media = [payload for kind, _, payload in _records(path) if kind == recorder.MEDIA]
+    assert 0 < len(media) < 10 and all(len(payload) == 160 for payload in media)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "not.vbrec"
+    with gzip.open(path, "wb") as f:
+        f.write(b"RIFF....")
+    with pytest.raises(ValueError):
+        list(read_recording(str(path)))
+
+
+def test_transport_records_the_calling_tasks_exchanges(tmp_path):
+    def upstream(request):
+        return httpx.Response(200, headers={"content-type": "text/plain"}, content=b"hello")
+
+    async def run():
+        client = httpx.AsyncClient(transport=RecordingTransport(httpx.MockTransport(upstream)))
+        # No recorder bound: nothing is copied
+        await client.post("https://api.groq.com/x", content=b"{}")
+
+        call = CallRecorder("Twilio")
+        bind_recorder(call)
+        response = await client.post("https://api.groq.com/openai/v1/chat/completions", content=b'{"a":1}')
+        assert response.content == b"hello"
+        await client.aclose()
+        path = tmp_path / "call.vbrec"
+        await call.save(str(path))
+        return _records(path)
+
+    records = asyncio.run(run())[1:]
+    assert [(kind, channel) for kind, channel, _ in records] == [
+        (recorder.HTTP_REQUEST, 1),
+        (recorder.HTTP_RESPONSE, 1),
+        (recorder.HTTP_BODY, 1),
+        (recorder.HTTP_END, 1),
+    ]
+    request = json.loads(records[0][2])
+    assert (request["method"], request["body"]) == ("POST", '{"a":1}')
+    assert request["url"].endswith("/chat/completions")
+    assert json.loads(records[1][2])["status"] == 200
+    assert records[2][2] == b"hello"
@@ -0,0 +1,51 @@
+import re
+
+from segmenter import SentenceSegmenter
+
+ANSWER = (
+    "Omkar works at Acme as a backend engineer. He builds real-time voice systems for phone calls, "
+    "mostly in Python and Go, and he has shipped several of them to production! Anything else?"
+)
+
+
+def _stream(text, segmenter):
+    """Feed text the way Groq streams it: word-sized deltas with their trailing space."""
+    segments = []
+    for delta in re.findall(r"\S+\s*", text):
+        segments.extend(segmenter.feed(delta))
+    return segments + segmenter.flush()
+
+
+def test_sentences_are_emitted_as_soon_as_they_end():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("Hello there.") == []
+    # The sentence is complete once whitespace follows its punctuation
+    assert segmenter.feed(" How") == ["Hello there."]
+    assert segmenter.feed(' are you?" ') == ['How are you?"']
+    assert segmenter.flush() == []
+
+
+def test_long_sentences_are_cut_at_clauses():
+    segments = _stream(ANSWER, SentenceSegmenter(min_clause_chars=60, first_clause_chars=25))
+    assert segments == [
+        "Omkar works at Acme as a backend engineer.",
+        # (the comma after "calls" comes before 60 characters: too short a clause)
+        "He builds real-time voice systems for phone calls, mostly in Python and Go,",
+        "and he has shipped several of them to production!",
+        "Anything else?",
+    ]
+    assert " ".join(segments) == ANSWER
+
+
+def test_first_segment_may_be_a_short_clause():
+    segmenter = SentenceSegmenter(min_clause_chars=60, first_clause_chars=25)
+    segments = _stream("Sure, happy to help with that question, let me think about it, then answer", segmenter)
+    # "Sure," is under 25 characters; after that, clauses must reach 60
+    assert segments == ["Sure, happy to help with that question,", "let me think about it, then answer"]
+
+
+def test_flush_returns_the_unterminated_tail():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("No punctuation at all") == []
+    assert segmenter.flush() == ["No punctuation at all"]
+    assert segmenter.flush() == []
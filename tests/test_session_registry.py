@@ -0,0 +1,128 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from providers.twilio import TwilioProvider
+from session_registry import MemoryRegistry, SQLiteRegistry, WORKER_TIMEOUT, create_registry
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def registries(request, tmp_path):
+    """Two workers sharing one registry backend."""
+    if request.param == "memory":
+        shared = MemoryRegistry("a", "a.example")
+        other = MemoryRegistry("b", "b.example")
+        # One process: both workers see the same tables
+        other._workers, other._sessions = shared._workers, shared._sessions
+        return shared, other
+    path = str(tmp_path / "registry.db")
+    return SQLiteRegistry(path, "a", "a.example"), SQLiteRegistry(path, "b", "b.example")
+
+
+def _capacity(spare, draining=False):
+    return lambda: {"active": 1, "spare": spare, "draining": draining}
+
+
+def test_sessions_are_owned_by_the_reserving_worker(registries):
+    a, b = registries
+
+    async def run():
+        await a.reserve("key-1")
+        assert await b.owner("key-1") == "a"
+        # The stream landed on the other worker: still served, but counted
+        await b.attach("key-1", "MZ1")
+        assert b.misrouted == 1
+        assert await a.owner("MZ1") == "b"
+        await b.release("key-1")
+        assert await a.owner("key-1") is None
+
+    asyncio.run(run())
+
+
+def test_best_peer_has_the_most_spare_room(registries):
+    a, b = registries
+
+    async def run():
+        await a.start(_capacity(spare=5))
+        await b.start(_capacity(spare=2))
+        assert (await a.best_peer())["worker_id"] == "b"
+        assert (await b.best_peer())["worker_id"] == "a"
+        assert b.cluster["workers"] == 2
+
+        # Draining and full peers take no redirects
+        b._capacity = _capacity(spare=2, draining=True)
+        await b._beat()
+        assert await a.best_peer() is None
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_dead_workers_and_their_sessions_are_dropped(registries):
+    a, b = registries
+
+    async def run():
+        await b.start(_capacity(spare=3))
+        b._heartbeat.cancel()
+        await b.reserve("key-1")
+        b._put_worker("b", "b.example", 1, 3, False, time.time() - 2 * WORKER_TIMEOUT)
+        await a.start(_capacity(spare=1))
+        assert await a.best_peer() is None
+        assert await a.owner("key-1") is None
+        await a.close()
+
+    asyncio.run(run())
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_registry("redis://localhost", "a")
+
+
+class _Registry:
+    """best_peer() answers with `peer`, or raises it if it is an exception."""
+
+    def __init__(self, peer):
+        self.peer = peer
+        self.redirected = 0
+        self.lookups = 0
+
+    async def best_peer(self):
+        self.lookups += 1
+        if isinstance(self.peer, Exception):
+            raise self.peer
+        return self.peer
+
+    async def reserve(self, session_key):
+        raise self.peer
+
+
+def _request(registry, query):
+    return SimpleNamespace(
+        query_params=query,
+        url=SimpleNamespace(path="/incoming-call/twilio"),
+        app=SimpleNamespace(state=SimpleNamespace(registry=registry)),
+    )
+
+
+def test_full_worker_redirects_once():
+    registry = _Registry({"worker_id": "b", "host": "b.example", "spare": 3})
+    response = asyncio.run(main.busy_response(_request(registry, {}), TwilioProvider()))
+    assert "https://b.example/incoming-call/twilio?redirected=1" in response.body.decode()
+    assert registry.redirected == 1
+
+    # A redirected call is not bounced again
+    response = asyncio.run(main.busy_response(_request(registry, {"redirected": "1"}), TwilioProvider()))
+    assert "<Redirect" not in response.body.decode()
+    assert registry.lookups == 1
+
+
+def test_registry_errors_fall_back_to_local_routing():
+    registry = _Registry(TimeoutError("database is locked"))
+    response = asyncio.run(main.busy_response(_request(registry, {}), TwilioProvider()))
+    assert '<Reject reason="busy"/>' in response.body.decode()
+    assert asyncio.run(main.registry_call(registry.reserve, "key-1")) is None
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+from history import ConversationHistory
+from speculation import SpeculationStats, Speculator, normalize_transcript
+
+
+class _Stream:
+    def __init__(self, deltas):
+        self._deltas = list(deltas)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._deltas:
+            raise StopAsyncIteration
+        delta = self._deltas.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        pass
+
+
+class _Groq:
+    """Answers every streamed completion with the same deltas."""
+
+    def __init__(self, deltas):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._deltas = deltas
+
+    async def _create(self, messages, stream, **params):
+        self.requests.append(messages)
+        return _Stream(self._deltas)
+
+
+def _speculator(history, stats):
+    return Speculator(
+        _Groq(["He works ", "at Acme."]),
+        lambda text: history.messages(pending_user=text),
+        {"model": "llama-3.1-8b-instant"},
+        window_ms=10,
+        stats=stats,
+        context_version=lambda: history.version,
+    )
+
+
+async def _speculate(speculator, transcript):
+    speculator.observe(transcript)
+    await asyncio.sleep(0.05)
+    return speculator.claim(transcript.upper() + "?")
+
+
+def test_normalize_transcript_ignores_case_and_punctuation():
+    assert normalize_transcript("Where does he WORK?") == "where does he work"
+
+
+def test_matching_speculation_is_adopted():
+    async def run():
+        history = ConversationHistory("System.")
+        stats = SpeculationStats()
+        speculator = _speculator(history, stats)
+        speculation = await _speculate(speculator, "where does he work")
+        assert speculation is not None
+        assert speculation.context_version == history.version
+        adopted = speculator.adopt(speculation)
+        assert adopted is speculation
+        assert [delta async for delta in adopted.stream()] == ["He works ", "at Acme."]
+        assert (stats.hits, stats.misses, stats.stale) == (1, 0, 0)
+
+    asyncio.run(run())
+
+
+def test_speculation_on_changed_history_is_discarded():
+    async def run():
+        history = ConversationHistory("System.")
+        history.append("user", "hello")
+        history.append("assistant", "Hi! I can tell you about Omkar's work and projects.")
+        stats = SpeculationStats()
+        speculator = _speculator(history, stats)
+        speculation = await _speculate(speculator, "where does he work")
+        # A barge-in trims the last answer to what the caller heard
+        history.set_last_content("Hi! I can tell you—")
+        assert speculator.adopt(speculation) is None
+        assert (stats.hits, stats.misses, stats.stale) == (0, 1, 1)
+
+    asyncio.run(run())
+
+
+def test_different_final_transcript_cancels_the_speculation():
+    async def run():
+        history = ConversationHistory("System.")
+        stats = SpeculationStats()
+        speculator = _speculator(history, stats)
+        speculator.observe("where does he work")
+        await asyncio.sleep(0.05)
+        assert speculator.claim("what did he study") is None
+        assert stats.misses == 1
+
+    asyncio.run(run())
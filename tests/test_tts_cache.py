@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+import pytest
+
+from tts_cache import TTSCache, normalize_text
+
+
+def test_key_ignores_typography_and_spacing():
+    assert normalize_text("It’s  “fine”\n") == "It's \"fine\""
+    assert TTSCache.key("It’s fine", "aura", "mulaw", 8000) == TTSCache.key("It's   fine", "aura", "mulaw", 8000)
+    assert TTSCache.key("It's fine", "aura", "mulaw", 8000) != TTSCache.key("It's fine", "luna", "mulaw", 8000)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    async def run():
+        key = TTSCache.key("hello", "aura", "mulaw", 8000)
+        await TTSCache(disk_dir=str(tmp_path)).put(key, b"\x7f" * 800)
+        cache = TTSCache(disk_dir=str(tmp_path))
+        audio = await cache.get(key)
+        assert bytes(audio) == b"\x7f" * 800
+        assert await cache.get(key) is audio
+        assert (cache.disk_hits, cache.memory_hits) == (1, 1)
+        assert await cache.get(TTSCache.key("other", "aura", "mulaw", 8000)) is None
+
+    asyncio.run(run())
+
+
+def test_concurrent_writers_of_one_key_count_it_once(tmp_path):
+    async def run():
+        cache = TTSCache(disk_dir=str(tmp_path))
+        key = TTSCache.key("hello", "aura", "mulaw", 8000)
+        await asyncio.gather(*(cache.put(key, b"\x7f" * 800) for _ in range(8)))
+        assert cache.stats()["disk_bytes"] == 800
+
+    asyncio.run(run())
+
+
+def test_disk_eviction_stays_under_the_cap(tmp_path):
+    async def run():
+        cache = TTSCache(disk_dir=str(tmp_path), max_disk_bytes=4000)
+        for i in range(10):
+            await cache.put(TTSCache.key(f"line {i}", "aura", "mulaw", 8000), b"\x7f" * 1000)
+        assert cache.stats()["disk_bytes"] <= 4000
+        assert cache.stats()["disk_bytes"] == sum(size for _, size, _ in cache._disk_entries())
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_promoted_disk_hits_hold_no_file_descriptors(tmp_path):
+    async def run():
+        keys = [TTSCache.key(f"line {i}", "aura", "mulaw", 8000) for i in range(50)]
+        writer = TTSCache(disk_dir=str(tmp_path))
+        for key in keys:
+            await writer.put(key, b"\x7f" * 800)
+        cache = TTSCache(disk_dir=str(tmp_path))
+        open_fds = len(os.listdir("/proc/self/fd"))
+        audio = [await cache.get(key) for key in keys]
+        assert all(isinstance(clip, bytes) for clip in audio)
+        assert cache.stats()["memory_entries"] == 50
+        assert len(os.listdir("/proc/self/fd")) <= open_fds
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+import numpy as np
+
+from audio import G711Codec
+from vad import VoiceActivityDetector
+
+FRAME_BYTES = 160
+_codec = G711Codec("mulaw", max_samples=8000)
+
+
+def _frames(pcm):
+    audio = _codec.encode(pcm.astype(np.int16)).tobytes()
+    return [audio[i:i + FRAME_BYTES] for i in range(0, len(audio), FRAME_BYTES)]
+
+
+def _speech(ms, level=1.0):
+    """Voiced speech stand-in: a 150 Hz fundamental with two harmonics."""
+    t = np.arange(ms * 8) / 8000
+    return _frames(level * (3000 * np.sin(2 * np.pi * 150 * t) + 1500 * np.sin(2 * np.pi * 450 * t)
+                            + 800 * np.sin(2 * np.pi * 900 * t)))
+
+
+def _noise(ms, sigma, seed=0):
+    return _frames(np.random.default_rng(seed).normal(0, sigma, ms * 8))
+
+
+def _hiss(ms, sigma, seed=0):
+    """Steady broadband line noise, tilted to the high frequencies like fan or line hiss."""
+    return _frames(np.diff(np.random.default_rng(seed).normal(0, sigma, ms * 8 + 1)))
+
+
+def _events(vad, frames):
+    """(index, event) for every state change."""
+    return [(i, event) for i, frame in enumerate(frames) if (event := vad.process(frame))]
+
+
+def test_speech_onset_within_onset_ms():
+    vad = VoiceActivityDetector(onset_ms=40)
+    frames = _noise(500, 20) + _speech(500)
+    # Two 20 ms frames of speech make an onset
+    assert _events(vad, frames) == [(25 + 1, "start")]
+    assert vad.is_speech
+
+
+def test_single_click_is_not_an_onset():
+    vad = VoiceActivityDetector(onset_ms=40)
+    frames = _noise(200, 20) + _speech(20) + _noise(200, 20)
+    assert _events(vad, frames) == []
+
+
+def test_speech_ends_after_the_hangover():
+    vad = VoiceActivityDetector(hangover_ms=300)
+    frames = _speech(400) + _noise(100, 20) + _speech(100) + _noise(600, 20)
+    events = _events(vad, frames)
+    # A 100 ms pause is inside the hangover; the end comes 300 ms into the final silence
+    assert [event for _, event in events] == ["start", "end"]
+    assert events[1][0] == 20 + 5 + 5 + 15 - 1
+
+
+def test_steady_broadband_noise_is_rejected():
+    vad = VoiceActivityDetector()
+    assert _events(vad, _hiss(2000, 2500)) == []
+    # The noise floor rose to the background level
+    assert vad.noise_floor_db > 55
+
+
+def test_noise_floor_adapts_to_the_line():
+    quiet_line = VoiceActivityDetector()
+    _events(quiet_line, _noise(1000, 20))
+    noisy_line = VoiceActivityDetector()
+    _events(noisy_line, _hiss(3000, 2500))
+    soft_speech = _speech(200, level=0.5)
+    # The same soft speech stands out on a quiet line but not over loud background noise
+    assert noisy_line.noise_floor_db > quiet_line.noise_floor_db + 20
+    assert _events(quiet_line, soft_speech) == [(1, "start")]
+    assert _events(noisy_line, soft_speech) == []
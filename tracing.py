@@ -0,0 +1,197 @@
+"""
+Per-turn latency tracing.
+Each user turn gets a TurnTrace of timestamped marks (last speech audio received,
+final transcript, LLM request / first token / done, TTS first byte, first audio
+frame sent, playback mark). Stage durations are aggregated into process-wide
+histograms (rendered in Prometheus text format) and into a per-call summary.
+"""
+
+import time
+import bisect
+from collections import deque
+from typing import Dict, List, Optional
+
+# Marks, in the order they normally happen during a turn
+MARKS = (
+    "audio_last",         # last inbound audio frame of the user's speech arrived
+    "stt_proposed",       # STT proposed the end of the turn (the endpointing hold started)
+    "transcript_final",   # the assembled final transcript closed the turn
+    "llm_request",        # Groq request sent (earlier than transcript_final on a speculation hit)
+    "faq_answer",         # answered from the local FAQ index instead of Groq
+    "llm_first_token",
+    "llm_done",
+    "tts_request",
+    "tts_first_byte",
+    "filler_sent",        # filler audio queued because the answer was late
+    "apology_sent",       # canned apology queued because the turn ran out of budget
+    "audio_first_sent",   # first 20 ms frame written to the telephony socket
+    "playback_mark",      # provider confirmed playback finished
+)
+
+# Stage name → (start mark, end mark)
+STAGES = {
+    "stt_finalize": ("audio_last", "transcript_final"),
+    "endpoint_hold": ("stt_proposed", "transcript_final"),
+    "llm_first_token": ("llm_request", "llm_first_token"),
+    "llm_total": ("llm_request", "llm_done"),
+    "tts_first_byte": ("tts_request", "tts_first_byte"),
+    "first_audio": ("transcript_final", "audio_first_sent"),
+    "turn_latency": ("audio_last", "audio_first_sent"),
+    "playback": ("audio_first_sent", "playback_mark"),
+}
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+
+class TurnTrace:
+    """Timestamped marks for one user turn (first write wins)."""
+
+    def __init__(self, turn: int):
+        self.turn = turn
+        self.marks: Dict[str, float] = {}
+        self.outcome = None
+        # Prompt size sent to the LLM for this turn (None = answered without one)
+        self.prompt_tokens = None
+
+    def mark(self, name: str, at: Optional[float] = None):
+        if name not in self.marks:
+            self.marks[name] = time.monotonic() if at is None else at
+
+    def durations(self) -> Dict[str, float]:
+        result = {}
+        for stage, (start, end) in STAGES.items():
+            if start in self.marks and end in self.marks:
+                result[stage] = max(self.marks[end] - self.marks[start], 0.0)
+        return result
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Bucket-resolution quantile estimate (upper bound of the matching bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Process-wide stage histograms and turn counters."""
+
+    def __init__(self):
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.turns = {}
+
+    def observe_turn(self, trace: TurnTrace):
+        for stage, seconds in trace.durations().items():
+            self.stages[stage].observe(seconds)
+        outcome = trace.outcome or "completed"
+        self.turns[outcome] = self.turns.get(outcome, 0) + 1
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP voicebot_stage_seconds Per-turn latency of each pipeline stage.",
+            "# TYPE voicebot_stage_seconds histogram",
+        ]
+        for stage, hist in self.stages.items():
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'voicebot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'voicebot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'voicebot_stage_seconds_sum{{stage="{stage}"}} {hist.sum:.6f}')
+            lines.append(f'voicebot_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+
+        lines.append("# HELP voicebot_turns_total User turns by outcome.")
+        lines.append("# TYPE voicebot_turns_total counter")
+        for outcome, count in self.turns.items():
+            lines.append(f'voicebot_turns_total{{outcome="{outcome}"}} {count}')
+
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def flatten_stats(prefix: str, stats: dict) -> Dict[str, float]:
+    """Turn nested /stats dictionaries into flat numeric gauge names."""
+    gauges = {}
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            gauges.update(flatten_stats(name, value))
+        elif isinstance(value, (bool, int, float)):
+            gauges[name] = float(value)
+    return gauges
+
+
+class CallSummary:
+    """Collects a call's finished turn traces for the summary printed at hang-up."""
+
+    def __init__(self):
+        self.traces: List[TurnTrace] = []
+
+    def add(self, trace: TurnTrace):
+        self.traces.append(trace)
+
+    def format(self) -> str:
+        if not self.traces:
+            return "no turns"
+        parts = [f"{len(self.traces)} turns"]
+        for stage in STAGES:
+            values = sorted(t.durations()[stage] for t in self.traces if stage in t.durations())
+            if values:
+                median = values[len(values) // 2]
+                parts.append(f"{stage} p50={median * 1000:.0f}ms max={values[-1] * 1000:.0f}ms")
+        tokens = sorted(t.prompt_tokens for t in self.traces if t.prompt_tokens is not None)
+        if tokens:
+            parts.append(f"prompt_tokens p50={tokens[len(tokens) // 2]} max={tokens[-1]}")
+        return " | ".join(parts)
+
+
+class AudioTimeline:
+    """Maps inbound audio position (seconds of caller audio) to wall-clock arrival time."""
+
+    def __init__(self, sample_rate: int = 8000, bytes_per_sample: int = 1, history: int = 1500):
+        self.bytes_per_second = sample_rate * bytes_per_sample
+        self._received = 0
+        # (audio position in seconds at the end of a chunk, monotonic arrival time)
+        self._positions = deque(maxlen=history)
+
+    def add(self, num_bytes: int, at: Optional[float] = None):
+        self._received += num_bytes
+        self._positions.append((self._received / self.bytes_per_second, time.monotonic() if at is None else at))
+
+    def arrival_time(self, audio_seconds: float) -> Optional[float]:
+        """When the chunk containing this audio position arrived (None if too old / unknown)."""
+        if not self._positions:
+            return None
+        positions = [p for p, _ in self._positions]
+        index = bisect.bisect_left(positions, audio_seconds)
+        if index >= len(positions):
+            return self._positions[-1][1]
+        return self._positions[index][1]
@@ -0,0 +1,187 @@
+"""
+Content-addressed TTS audio cache.
+Tier 1 is an in-memory LRU bounded by bytes; tier 2 is an on-disk store, so
+cached audio survives restarts. A disk hit is read into memory and promoted
+to the LRU (a memory-mapped entry would hold a file descriptor for as long
+as it stays cached). All disk I/O runs in worker threads, off the event
+loop. Keys hash (normalized text, voice model, encoding, sample rate).
+"""
+
+import os
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from log import get_logger
+
+log = get_logger("tts_cache")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a TTS input: NFKC, straight quotes, single spaces."""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("’", "'").replace("‘", "'").replace("“", '"').replace("”", '"')
+    return " ".join(text.split())
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) cache of synthesized audio."""
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # Updated from worker threads (writes, eviction) under the lock
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self._evicting = False
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @staticmethod
+    def key(text: str, model: str, encoding: str, sample_rate: int) -> str:
+        raw = "\x1f".join((normalize_text(text), model, encoding, str(sample_rate)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str):
+        """Return cached audio bytes or None."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+
+        audio = await asyncio.to_thread(self._read_disk, key) if self.disk_dir else None
+        if audio is not None:
+            self.disk_hits += 1
+            # Promote, so the next hit skips the disk
+            self._remember(key, audio)
+            return audio
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, audio: bytes):
+        """Store audio in memory now and on disk off the event loop."""
+        if not audio:
+            return
+        self._remember(key, audio)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, audio)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            # (a single int read: no need to wait on a writer holding the lock)
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # ── Memory tier ────────────────────────────────────────────
+
+    def _remember(self, key: str, audio):
+        size = len(audio)
+        if size > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # ── Disk tier ──────────────────────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".audio")
+
+    def _read_disk(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # Bump mtime so disk eviction is least-recently-used
+            os.utime(path)
+        except OSError:
+            return None
+        return audio or None
+
+    def _write_disk(self, key: str, audio: bytes):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so a crash never leaves a truncated entry behind
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            # Two writers of one key: only the one that created the entry counts its size
+            with self._disk_lock:
+                existed = os.path.exists(path)
+                os.replace(tmp_path, path)
+                if not existed:
+                    self._disk_bytes += len(audio)
+                evict = self._disk_bytes > self.max_disk_bytes and not self._evicting
+                self._evicting = self._evicting or evict
+        except OSError as e:
+            log.warning("cache_write_failed", f"⚠️ TTS cache write failed: {e}")
+            return
+        if evict:
+            self._evict_disk()
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".audio"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict_disk(self):
+        # Drop least-recently-used files until we're back under 90% of the cap
+        # (one eviction at a time; writes landing meanwhile are counted by delta)
+        target = int(self.max_disk_bytes * 0.9)
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total - removed <= target:
+                break
+            try:
+                os.remove(path)
+                removed += size
+            except OSError:
+                pass
+        with self._disk_lock:
+            self._disk_bytes -= removed
+            self._evicting = False
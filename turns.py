@@ -0,0 +1,96 @@
+"""
+Utterance / turn assembler.
+Deepgram can split one spoken sentence into several `is_final` segments.
+This merges them into a single user turn, closed by `speech_final` (after a
+short debounce) or by an `UtteranceEnd` message, so each turn produces
+exactly one response. With an endpointer (endpointing.py), both only propose
+the end of the turn and the endpointer decides how long to wait.
+"""
+
+import time
+import asyncio
+from typing import Callable, List
+
+
+class TurnAssembler:
+    """Collects final transcript segments and emits one complete turn at a time."""
+
+    def __init__(self, on_turn: Callable[[str], None], debounce_ms: int = 150, endpointer=None, max_wait_ms: int = 3000):
+        self.on_turn = on_turn
+        # Grace period after speech_final in case the caller keeps going
+        self.debounce_ms = debounce_ms
+        # EndOfTurnPredictor (or None for the fixed debounce), and the longest it may hold a turn open
+        self.endpointer = endpointer
+        self.max_wait_ms = max_wait_ms
+        self._segments: List[str] = []
+        self._flush_timer = None
+        self._proposed_at = None
+        # When STT first proposed the end of the turn just emitted (None = closed without a hold)
+        self.proposed_at = None
+
+    @property
+    def pending_text(self) -> str:
+        return " ".join(self._segments)
+
+    def text_with(self, interim: str) -> str:
+        """Finalized segments so far plus the current interim hypothesis."""
+        return " ".join(self._segments + [interim]) if interim else self.pending_text
+
+    def add_interim(self, transcript: str):
+        # The caller is still talking: hold back any pending flush
+        if transcript and self._flush_timer:
+            self._cancel_flush()
+            self._proposed_at = None
+            if self.endpointer:
+                self.endpointer.proposal_withdrawn()
+
+    def add_final(self, transcript: str, speech_final: bool = False):
+        if transcript:
+            self._segments.append(transcript)
+        if speech_final:
+            self._schedule_flush()
+
+    def utterance_end(self):
+        """Deepgram saw a long enough gap in speech: the turn is over (or, with an endpointer, may be)."""
+        self._cancel_flush()
+        if self.endpointer:
+            self._schedule_flush()
+        else:
+            self._flush()
+
+    def reset(self):
+        self._cancel_flush()
+        self._segments = []
+        self._proposed_at = None
+
+    def _schedule_flush(self):
+        self._cancel_flush()
+        if self._proposed_at is None:
+            self._proposed_at = time.monotonic()
+        delay_ms = self.endpointer.end_delay_ms(self.pending_text) if self.endpointer else self.debounce_ms
+        self._flush_timer = asyncio.get_running_loop().call_later(delay_ms / 1000, self._check_flush)
+
+    def _check_flush(self):
+        self._flush_timer = None
+        if self.endpointer and self._proposed_at is not None:
+            waited_ms = (time.monotonic() - self._proposed_at) * 1000
+            # The caller made a sound since: the silence starts over (within max_wait_ms)
+            if waited_ms < self.max_wait_ms and self.endpointer.end_delay_ms(self.pending_text) >= 1:
+                self._schedule_flush()
+                return
+        self._flush()
+
+    def _cancel_flush(self):
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _flush(self):
+        self._flush_timer = None
+        self.proposed_at, self._proposed_at = self._proposed_at, None
+        text = self.pending_text.strip()
+        self._segments = []
+        if text:
+            if self.endpointer:
+                self.endpointer.turn_ended()
+            self.on_turn(text)
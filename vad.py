@@ -0,0 +1,121 @@
+"""
+Local voice-activity detection on inbound 8 kHz mulaw frames.
+Lets barge-in react within a few frames of the caller starting to talk,
+instead of waiting for Deepgram's first interim transcript. Features are
+frame energy and zero-crossing rate, computed with NumPy table lookups on
+the raw mulaw bytes (no per-sample Python); a hangover state machine turns
+noisy per-frame decisions into speech start/end events.
+"""
+
+import math
+import numpy as np
+from typing import Optional
+from audio import MULAW_TO_PCM
+
+# 8 kHz mulaw: 8 bytes per millisecond
+BYTES_PER_MS = 8
+
+# Largest inbound frame we expect (Telnyx/Twilio send 20 ms = 160 bytes)
+MAX_FRAME_BYTES = 1600
+
+# Squared sample per mulaw byte, so frame energy needs no decode pass
+_SQUARE = MULAW_TO_PCM.astype(np.float64) ** 2
+# The sign is bit 7 of the mulaw byte itself (set = positive)
+_SIGN_BIT = 0x7F
+
+
+class VADStats:
+    """Process-wide counters for local barge-in detection."""
+
+    def __init__(self):
+        self.onsets = 0
+        self.barge_ins = 0
+        self.confirmed = 0
+        self.false_alarms = 0
+
+    def as_dict(self) -> dict:
+        decided = self.confirmed + self.false_alarms
+        return {
+            "onsets": self.onsets,
+            "barge_ins": self.barge_ins,
+            "confirmed": self.confirmed,
+            "false_alarms": self.false_alarms,
+            "false_alarm_rate": round(self.false_alarms / decided, 4) if decided else 0.0,
+        }
+
+
+vad_stats = VADStats()
+
+
+class VoiceActivityDetector:
+    """Energy + zero-crossing VAD with onset/hangover smoothing for one call."""
+
+    def __init__(
+        self,
+        onset_ms: int = 40,
+        hangover_ms: int = 300,
+        margin_db: float = 12.0,
+        min_speech_db: float = 45.0,
+        max_zcr: float = 0.45,
+    ):
+        # Speech must last this long to count (skips clicks), and silence this long to end it
+        self.onset_ms = onset_ms
+        self.hangover_ms = hangover_ms
+        # A frame is speech if it is this much louder than the noise floor, and loud enough at all
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        # Broadband noise crosses zero on about half the samples; voiced speech far less
+        self.max_zcr = max_zcr
+
+        self.noise_floor_db = 30.0
+        self.is_speech = False
+        # Raw decision for the latest frame (before onset/hangover smoothing)
+        self.voiced = False
+        self._run_ms = 0
+        self._signs = np.empty(MAX_FRAME_BYTES, dtype=bool)
+        self._crossings = np.empty(MAX_FRAME_BYTES, dtype=bool)
+
+    def features(self, frame) -> tuple:
+        """(energy in dB re 1 LSB, zero-crossing rate) of a mulaw frame."""
+        n = min(len(frame), MAX_FRAME_BYTES)
+        if n < 2:
+            return 0.0, 0.0
+        samples = np.frombuffer(frame, dtype=np.uint8, count=n)
+        energy = _SQUARE.take(samples).sum() / n
+        signs = np.greater(samples, _SIGN_BIT, out=self._signs[:n])
+        crossings = np.count_nonzero(np.not_equal(signs[1:], signs[:-1], out=self._crossings[:n - 1]))
+        return 10 * math.log10(energy + 1.0), crossings / (n - 1)
+
+    def process(self, frame) -> Optional[str]:
+        """Feed one inbound frame; returns "start" or "end" on a state change, else None."""
+        energy_db, zcr = self.features(frame)
+        frame_ms = len(frame) // BYTES_PER_MS
+        voiced = self.voiced = (
+            energy_db > max(self.noise_floor_db + self.margin_db, self.min_speech_db)
+            and zcr < self.max_zcr
+        )
+
+        if not self.is_speech:
+            if not voiced:
+                # Track the background level: follow drops quickly, rises slowly
+                rate = 0.2 if energy_db < self.noise_floor_db else 0.02
+                self.noise_floor_db += rate * (energy_db - self.noise_floor_db)
+                self._run_ms = 0
+                return None
+            self._run_ms += frame_ms
+            if self._run_ms >= self.onset_ms:
+                self.is_speech = True
+                self._run_ms = 0
+                vad_stats.onsets += 1
+                return "start"
+            return None
+
+        if voiced:
+            self._run_ms = 0
+            return None
+        self._run_ms += frame_ms
+        if self._run_ms >= self.hangover_ms:
+            self.is_speech = False
+            self._run_ms = 0
+            return "end"
+        return None
@@ -0,0 +1,155 @@
+"""
+Worker warm-up, and the DNS / TLS state it leaves for per-call connections.
+Everything a call would otherwise pay for the first time on a live call is
+done once, while the worker reports not-ready: upstream DNS lookups, the TLS
+context (~40 ms of CA loading, on the event loop, for every wss:// connect
+that builds its own), the Groq SDK's first request and websockets' client
+code path, connections to Deepgram and Groq, and the static audio (apology,
+fillers, FAQ answers). Steps run with a shared deadline; one that fails is
+logged and skipped, so a flaky upstream delays readiness at most by the
+timeout instead of keeping the worker out of rotation.
+"""
+
+import ssl
+import time
+import socket
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from log import get_logger
+
+log = get_logger("warmup")
+
+# Cached upstream addresses are re-resolved this often
+DNS_TTL = 60.0
+
+
+class DNSCache:
+    """Upstream host → address, resolved ahead of time and refreshed in the background."""
+
+    def __init__(self, ttl: float = DNS_TTL):
+        self.ttl = ttl
+        self._addresses = {}
+        self._refresh_task = None
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def lookup(self, host: str) -> Optional[str]:
+        address = self._addresses.get(host)
+        if address is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return address
+
+    def forget(self, host: str):
+        """The cached address stopped working: resolve it normally until the next refresh."""
+        self._addresses.pop(host, None)
+
+    async def resolve(self, *urls: str):
+        """Resolve the hosts of these URLs now (and keep them fresh once start() ran)."""
+        loop = asyncio.get_running_loop()
+        for url in urls:
+            parsed = httpx.URL(url)
+            host = parsed.host
+            self._addresses.setdefault(host, None)
+            try:
+                infos = await loop.getaddrinfo(host, parsed.port or 443, type=socket.SOCK_STREAM)
+            except OSError as e:
+                self.failures += 1
+                log.warning("dns_failed", f"⚠️ Could not resolve {host} ({e})")
+                continue
+            self._addresses[host] = infos[0][4][0]
+
+    def start(self):
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "hosts": {host: address or "-" for host, address in self._addresses.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl)
+            hosts = list(self._addresses)
+            await self.resolve(*(f"https://{host}" for host in hosts))
+
+
+dns_cache = DNSCache()
+
+_tls_context = None
+
+
+def tls_context() -> ssl.SSLContext:
+    """One default client TLS context per process (building one loads every CA certificate)."""
+    global _tls_context
+    if _tls_context is None:
+        _tls_context = ssl.create_default_context()
+    return _tls_context
+
+
+class Warmup:
+    """Named warm-up steps with timings; `ready` is set once they have all finished (or timed out)."""
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self.ready = asyncio.Event()
+        self.steps_ms: Dict[str, float] = {}
+        self.failed = []
+        self.timed_out = False
+        self.started_at = None
+        self.duration_ms = None
+
+    async def run(self, *stages: Dict[str, Callable[[], Awaitable]]):
+        """Run each stage's steps concurrently, stage after stage, within the timeout."""
+        self.started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._run_stages(stages), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            log.warning("warmup_timeout", f"⚠️ Warm-up still running after {self.timeout:.0f} s; serving anyway")
+        self.duration_ms = (time.monotonic() - self.started_at) * 1000
+        self.ready.set()
+        slowest = sorted(self.steps_ms.items(), key=lambda item: -item[1])[:3]
+        log.info(
+            "warmup_done",
+            f"🔥 Warm-up done in {self.duration_ms:.0f} ms (slowest: "
+            + ", ".join(f"{name} {ms:.0f} ms" for name, ms in slowest) + ")",
+            duration_ms=round(self.duration_ms, 1),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+            "steps_ms": {name: round(ms, 1) for name, ms in self.steps_ms.items()},
+            "failed": list(self.failed),
+            "timed_out": self.timed_out,
+        }
+
+    async def _run_stages(self, stages):
+        for stage in stages:
+            await asyncio.gather(*(self._step(name, step) for name, step in stage.items()))
+
+    async def _step(self, name: str, step: Callable[[], Awaitable]):
+        started = time.monotonic()
+        try:
+            await step()
+        except Exception as e:
+            self.failed.append(name)
+            log.warning("warmup_step_failed", f"⚠️ Warm-up step {name} failed ({e})", step=name)
+        finally:
+            self.steps_ms[name] = (time.monotonic() - started) * 1000